@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Tables, DepartmentTables, Departments, Rows, RowDatas
+
+YEARS = range(4)
+NEEDS_COLUMNS = [f"financial_needs_{year}" for year in YEARS]
+LIMIT_COLUMNS = [f"expenditure_limit_{year}" for year in YEARS]
+TOTAL_COLUMNS = NEEDS_COLUMNS + LIMIT_COLUMNS
+
+
+async def department_totals(db: AsyncSession, table_id: int) -> dict[str, dict[str, Decimal]]:
+    # sumy liczone w bazie, tylko po najnowszej wersji każdego wiersza
+    stmt = (
+        select(
+            Departments.type,
+            *[func.coalesce(func.sum(getattr(RowDatas, col)), 0).label(col) for col in TOTAL_COLUMNS],
+        )
+        .select_from(DepartmentTables)
+        .join(Departments, Departments.id == DepartmentTables.department_id)
+        .outerjoin(Rows, Rows.department_table_id == DepartmentTables.id)
+        .outerjoin(RowDatas, RowDatas.id == Rows.current_row_data_id)
+        .where(DepartmentTables.table_id == table_id)
+        .group_by(Departments.type)
+        .order_by(Departments.type)
+    )
+
+    result = await db.execute(stmt)
+    return {
+        row.type: {col: Decimal(getattr(row, col)) for col in TOTAL_COLUMNS}
+        for row in result
+    }
+
+
+async def department_column_totals(db: AsyncSession, table_id: int, column: str) -> dict[str, Decimal]:
+    totals = await department_totals(db, table_id)
+    return {dept: values[column] for dept, values in totals.items()}
+
+
+async def department_limits(db: AsyncSession, table_id: int, column: str = "expenditure_limit_0") -> dict[str, Decimal]:
+    # update_expenditure_limits wpisuje limit działu do każdego wiersza - suma dawałaby N x limit;
+    # limit działu to wartość z jego pierwszego wiersza (0 bez wierszy)
+    stmt = (
+        select(Departments.type, func.coalesce(getattr(RowDatas, column), 0).label("limit"))
+        .select_from(DepartmentTables)
+        .join(Departments, Departments.id == DepartmentTables.department_id)
+        .outerjoin(Rows, Rows.department_table_id == DepartmentTables.id)
+        .outerjoin(RowDatas, RowDatas.id == Rows.current_row_data_id)
+        .where(DepartmentTables.table_id == table_id)
+        .distinct(Departments.type)
+        .order_by(Departments.type, Rows.id)
+    )
+
+    result = await db.execute(stmt)
+    return {row.type: Decimal(row.limit) for row in result}
+
+
+async def table_budget(db: AsyncSession, table_id: int):
+    """(budget,) row of the table - None when the table does not exist, budget may be NULL."""
+    result = await db.execute(select(Tables.budget).where(Tables.id == table_id))
+    return result.one_or_none()
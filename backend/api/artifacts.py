@@ -0,0 +1,125 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import BinaryIO
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "zagrane-exports"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class ArtifactCache:
+    """Size-bounded LRU of generated files on local disk, addressed by a key hash.
+
+    get() is a dictionary lookup and an open(); put() copies the file and may
+    evict, so call it from a worker thread for large artifacts. Both return a
+    file opened under the lock: a concurrent eviction only unlinks the name,
+    the response keeps reading the open file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def digest(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def etag(self, key: str) -> str:
+        return f'"{self.digest(key)}"'
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def _load(self):
+        # po restarcie odtwórz indeks z plików, najstarsze użycie najpierw
+        files = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if len(name) == 64 and os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def get(self, key: str) -> BinaryIO | None:
+        digest = self.digest(key)
+        with self._lock:
+            if digest not in self._entries:
+                return None
+            try:
+                cached = open(self._path(digest), "rb")
+            except FileNotFoundError:
+                # plik usunięty spoza cache - traktuj jak brak
+                self.total_bytes -= self._entries.pop(digest)
+                return None
+            self._entries.move_to_end(digest)
+        return cached
+
+    def put(self, key: str, fileobj) -> BinaryIO:
+        digest = self.digest(key)
+        path = self._path(digest)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            fileobj.seek(0)
+            shutil.copyfileobj(fileobj, tmp)
+            size = tmp.tell()
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            cached = open(path, "rb")
+            self.total_bytes += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            self._evict()
+        return cached
+
+    def put_bytes(self, key: str, content: bytes) -> BinaryIO:
+        return self.put(key, BytesIO(content))
+
+    def _evict(self):
+        # ostatnio dodany/użyty wpis zostaje nawet jeśli sam przekracza limit
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            digest, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+
+def cached_file_response(cached: BinaryIO, media_type: str, headers: dict) -> StreamingResponse:
+    """Stream a file returned by ArtifactCache.get()/put() and close it afterwards."""
+
+    async def chunks():
+        with cached:
+            while chunk := await run_in_threadpool(cached.read, CHUNK_SIZE):
+                yield chunk
+
+    headers = {**headers, "Content-Length": str(os.fstat(cached.fileno()).st_size)}
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+artifact_cache = ArtifactCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES)
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import insert, update, values, column, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.deltas import encode_superseded
+from db.models import Rows, RowDatas
+
+ROW_DATA_COLUMNS = set(RowDatas.__table__.columns.keys()) - {"id"}
+
+
+async def write_revisions(
+    db: AsyncSession,
+    revisions: list[tuple[int | None, int, dict]],
+    now: datetime,
+) -> list[int]:
+    """Save one new RowDatas revision per (row_id, department_table_id, data) item.
+
+    row_id None creates a new row. Set-based: one UPDATE touching existing
+    rows, one multi-row INSERT ... RETURNING for new rows, batched multi-row
+    INSERTs for the revisions and one UPDATE ... FROM (VALUES ...) moving the
+    current-revision pointers. The revisions that stopped being current are
+    then stored as deltas (db.deltas). Returns the row id of every item, in
+    order. The caller commits.
+    """
+    existing_ids = {row_id for row_id, _, _ in revisions if row_id is not None}
+    previous = {}
+    if existing_ids:
+        # current_row_data_id jeszcze sprzed zapisu - poprzednia bieżąca wersja
+        result = await db.execute(
+            update(Rows)
+            .where(Rows.id.in_(existing_ids))
+            .values(last_update=now)
+            .returning(Rows.id, Rows.current_row_data_id)
+        )
+        previous = dict(result.all())
+        missing = existing_ids - set(previous)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Row {min(missing)} not found")
+
+    new_rows = [dept_table_id for row_id, dept_table_id, _ in revisions if row_id is None]
+    new_ids = iter([])
+    if new_rows:
+        result = await db.execute(
+            insert(Rows).returning(Rows.id, sort_by_parameter_order=True),
+            [
+                {"department_table_id": dept_table_id, "last_update": now, "next_year": False}
+                for dept_table_id in new_rows
+            ],
+        )
+        new_ids = iter(result.scalars().all())
+
+    row_ids = [row_id if row_id is not None else next(new_ids) for row_id, _, _ in revisions]
+    if not row_ids:
+        return row_ids
+
+    result = await db.execute(
+        insert(RowDatas).returning(RowDatas.id, sort_by_parameter_order=True),
+        [
+            {**{k: v for k, v in data.items() if k in ROW_DATA_COLUMNS}, "row_id": row_id, "last_update": now}
+            for row_id, (_, _, data) in zip(row_ids, revisions)
+        ],
+    )
+    revision_ids = result.scalars().all()
+    # ten sam wiersz kilka razy w paczce - wygrywa ostatnia wersja
+    current = dict(zip(row_ids, revision_ids))
+
+    pointers = values(
+        column("row_id", Integer),
+        column("row_data_id", Integer),
+        name="current_revisions",
+    ).data(list(current.items()))
+    await db.execute(
+        update(Rows)
+        .where(Rows.id == pointers.c.row_id)
+        .values(current_row_data_id=pointers.c.row_data_id)
+    )
+
+    # poprzednia bieżąca wersja -> różnica względem pierwszej nowej wersji wiersza z paczki
+    superseded = {}
+    for row_id, revision_id in zip(row_ids, revision_ids):
+        if previous.get(row_id) is not None:
+            superseded[previous.pop(row_id)] = revision_id
+    await encode_superseded(db, superseded)
+
+    return row_ids
@@ -0,0 +1,61 @@
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.records import current_rows_select, row_record, table_record
+from db.models import Rows, Tables
+
+# watermark = najstarsza transakcja aktywna w chwili odczytu (pg_snapshot_xmin): wszystko, co
+# zatwierdzono wcześniej, klient już dostał; zmiany z transakcji >= watermark mogą przyjść ponownie
+WATERMARK = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+
+# starszy watermark nie da się porównać z xmin (32-bitowe xid, zawijanie) - pełna synchronizacja
+MAX_WATERMARK_AGE = 1_000_000_000
+
+ROW_XMIN = literal_column("rows.xmin")
+
+
+def parse_watermark(since: str | None) -> int | None:
+    if since is None or since == "":
+        return None
+    if not since.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid watermark")
+    return int(since)
+
+
+async def table_changes(
+    db: AsyncSession,
+    table_id: int,
+    since: str | None,
+    department_id: int | None = None,
+) -> dict | None:
+    """Rows of a table whose current revision changed since the watermark, plus a new watermark.
+
+    Without since (or with a watermark too old to compare) every row is
+    returned and "full" is true. A row may be sent again in the next
+    response; clients replace rows by id. None if the table is missing.
+    """
+    since_xid = parse_watermark(since)
+    watermark = (await db.execute(WATERMARK)).scalar_one()
+
+    table = await db.get(Tables, table_id)
+    if not table:
+        return None
+
+    # since nowszy od watermarku (np. odczyt z opóźnionej repliki) - nic nie pasuje, a klient dostaje
+    # starszy watermark i pobierze te zmiany przy następnym odpytaniu
+    full = since_xid is None or int(watermark) - since_xid > MAX_WATERMARK_AGE
+    stmt = current_rows_select(table_id, department_id).order_by(Rows.id)
+    if not full:
+        # rows.xmin zmienia się przy każdej zmianie wiersza (nowa wersja, last_update, nowy wiersz);
+        # age() liczy względem bieżącej transakcji, więc porównanie jest odporne na zawijanie xid
+        since_xmin = literal_column(f"'{since_xid % 2**32}'::xid")
+        stmt = stmt.where(func.age(ROW_XMIN) <= func.age(since_xmin))
+
+    result = await db.execute(stmt)
+    return {
+        **table_record(table),
+        "watermark": watermark,
+        "full": full,
+        "rows": [row_record(m) for m in result.mappings()],
+    }
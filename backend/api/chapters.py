@@ -4,9 +4,10 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from typing import List
 
-from db.database import get_db
+from db.database import get_read_db
 from db.models import Paragraphs, Chapters
 from api.schemas import ParagraphRead 
+from api.dictionaries import dictionary_cache
 
 router = APIRouter(prefix="/api/chapters", tags=["Chapters"])
 
@@ -17,26 +18,14 @@ router = APIRouter(prefix="/api/chapters", tags=["Chapters"])
 )
 async def get_paragraphs_by_chapter(
     chapter_value: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> List[ParagraphRead]:
-    stmt = select(Chapters).where(Chapters.value == chapter_value)
-    result = await db.execute(stmt)
-    chapter = result.scalars().first()
-    if not chapter:
+    dicts = await dictionary_cache.get(db)
+    chapter_id = dicts.chapter_ids.get(chapter_value)
+    if chapter_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"Chapter with ID {chapter_value} not found"
         )
 
-    stmt = (
-        select(Paragraphs)
-        .options(
-            selectinload(Paragraphs.expense_group)
-        )
-        .where(Paragraphs.chapter_id == chapter.id)
-        .order_by(Paragraphs.value)
-    )
-
-    result = await db.execute(stmt)
-    paragraphs_orm = result.scalars().all()
-    return [ParagraphRead.model_validate(p) for p in paragraphs_orm]
\ No newline at end of file
+    return dicts.paragraphs_by_chapter.get(chapter_id, [])
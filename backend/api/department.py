@@ -1,78 +1,120 @@
 from api.schemas import TableFullDTO, DepartmentRead
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func
 from sqlalchemy.orm import selectinload, joinedload, with_loader_criteria
 from typing import List
 from api.schemas import HEADERS, DeptLimitUpdateRequest
 from api.excel import generete_excel
-from db.database import get_db, AsyncSessionLocal
+from api.notifications import notify_changes
+from db.deltas import preserve_delta_bases
+from db.database import get_db, get_read_db, AsyncSessionLocal
 from db.models import Tables, DepartmentTables, Rows, RowDatas, Divisions, Chapters, Paragraphs, ExpenseGroups, Departments
 from fastapi.responses import StreamingResponse
 from io import BytesIO
 from decimal import Decimal
+from datetime import datetime
 
 router = APIRouter(prefix="/api/departments", tags=["departments"])
 
-@router.put("/update_expenditure_limits")
-async def update_expenditure_limits(req: DeptLimitUpdateRequest, db: AsyncSession = Depends(get_db)):
-    for dept_name, new_limit in req.updates:
-        result = await db.execute(select(Departments).where(Departments.type == dept_name))
-        department = result.scalars().first()
-        if not department:
-            continue
+def current_limits_select(table_id: int, department_id: int):
+    # aktualne wersje wierszy działu w danej tabeli
+    return (
+        select(
+            RowDatas.id,
+            RowDatas.row_id,
+            RowDatas.expenditure_limit_0.label("old_limit"),
+        )
+        .join(Rows, Rows.current_row_data_id == RowDatas.id)
+        .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+        .where(
+            DepartmentTables.table_id == table_id,
+            DepartmentTables.department_id == department_id,
+        )
+    )
+
+async def assign_department_limit(
+    db: AsyncSession,
+    table_id: int,
+    department_id: int,
+    new_limit: Decimal,
+    dry_run: bool = False,
+) -> tuple[int, Decimal]:
+    """Set expenditure_limit_0 on the department's current revisions in one statement.
 
+    Returns (affected rows, old total). With dry_run nothing is written.
+    """
+    current = current_limits_select(table_id, department_id).subquery("current_limits")
+
+    if dry_run:
         result = await db.execute(
-            select(DepartmentTables).where(DepartmentTables.department_id == department.id)
+            select(func.count(), func.coalesce(func.sum(current.c.old_limit), 0))
         )
-        dept_tables = result.scalars().all()
+        count, old_total = result.one()
+        return count, Decimal(old_total)
+
+    # starsze wersje zapisane jako delty względem bieżących muszą zachować stary limit
+    await preserve_delta_bases(db, select(current.c.id), ["expenditure_limit_0"])
+    touched = (
+        update(RowDatas)
+        .where(RowDatas.id == current.c.id)
+        .values(expenditure_limit_0=new_limit)
+        .returning(current.c.row_id, current.c.old_limit)
+        .cte("touched")
+    )
+    result = await db.execute(
+        update(Rows)
+        .where(Rows.id == touched.c.row_id)
+        .values(last_update=datetime.now())
+        .returning(touched.c.old_limit)
+        .execution_options(synchronize_session=False)
+    )
+    old_limits = result.scalars().all()
+    return len(old_limits), sum(old_limits, Decimal(0))
 
-        for dt in dept_tables:
-            print(1)
-            result = await db.execute(select(Rows).where(Rows.department_table_id == dt.id))
-            rows = result.scalars().all()
+@router.put("/update_expenditure_limits")
+async def update_expenditure_limits(req: DeptLimitUpdateRequest, db: AsyncSession = Depends(get_db)):
+    names = [dept_name for dept_name, _ in req.updates]
+    result = await db.execute(select(Departments).where(Departments.type.in_(names)))
+    departments = {dep.type: dep.id for dep in result.scalars()}
+
+    report = []
+    for dept_name, new_limit in req.updates:
+        department_id = departments.get(dept_name)
+        if department_id is None:
+            continue
 
-            for row in rows:
-                print(2)
-                result = await db.execute(select(RowDatas).where(RowDatas.row_id == row.id))
-                row_datas = result.scalars().all()
+        new_limit = Decimal(str(new_limit))
+        count, old_total = await assign_department_limit(db, req.tableId, department_id, new_limit, req.dryRun)
+        if count and not req.dryRun:
+            await notify_changes(db, "limits", req.tableId, department_id)
+        report.append({
+            "department": dept_name,
+            "affected_rows": count,
+            "old_total": old_total,
+            "new_total": new_limit * count,
+        })
 
-                for rd in row_datas:
-                    print(3)
-                    rd.expenditure_limit_0 = Decimal(new_limit)
-                    print(new_limit)
-                    db.add(rd)
-                    await db.flush()        # ensure SQL is executed
-                    await db.refresh(rd) 
-                    
-    await db.commit()
-    return {"status": "success"}
+    if not req.dryRun:
+        await db.commit()
+    return {"status": "success", "dry_run": req.dryRun, "departments": report}
 
 @router.get("/get_all_departments")
-async def get_all_department_names(db: AsyncSession = Depends(get_db)):
+async def get_all_department_names(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Departments))
     departments = result.scalars().all()
 
     return set([dep.type for dep in departments])
 
 @router.get("/get_department_dates")
-async def get_department_dates(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(DepartmentTables))
-    dept_tables = result.scalars().all()
-
-    output = []
-
-    for dt in dept_tables:
-        dep_result = await db.execute(
-            select(Departments).where(Departments.id == dt.department_id)
-        )
-        department = dep_result.scalars().first()
-
-        output.append([
-            department.type if department else None,
-            dt.end,
-            dt.start
-        ])
+async def get_department_dates(db: AsyncSession = Depends(get_read_db)):
+    # jedno zapytanie zamiast osobnego SELECT Departments dla każdego wiersza
+    result = await db.execute(
+        select(Departments.type, DepartmentTables.end, DepartmentTables.start)
+        .select_from(DepartmentTables)
+        .outerjoin(Departments, Departments.id == DepartmentTables.department_id)
+        .order_by(DepartmentTables.id)
+    )
 
-    return output
+    return [list(row) for row in result.all()]
 
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from api.schemas import DivisionRead, ChapterRead, ParagraphRead, ExpenseGroupRead, TaskRead
+from db.models import Divisions, Chapters, Paragraphs, ExpenseGroups, Tasks
+
+DICTIONARY_CACHE_TTL = float(os.getenv("DICTIONARY_CACHE_TTL", "300"))
+# wymuszone przeładowanie (nieznana wartość w zapisie) najwyżej raz na tyle sekund
+DICTIONARY_FORCE_RELOAD_SECONDS = float(os.getenv("DICTIONARY_FORCE_RELOAD_SECONDS", "10"))
+
+
+@dataclass
+class Dictionaries:
+    """Snapshot of the reference tables with value -> id and id -> object indexes."""
+    version: int
+    loaded_at: float
+    divisions: dict[int, DivisionRead] = field(default_factory=dict)
+    chapters: dict[int, ChapterRead] = field(default_factory=dict)
+    paragraphs: dict[int, ParagraphRead] = field(default_factory=dict)
+    expense_groups: dict[int, ExpenseGroupRead] = field(default_factory=dict)
+    tasks: dict[int, TaskRead] = field(default_factory=dict)
+
+    division_ids: dict[str, int] = field(default_factory=dict)
+    chapter_ids: dict[str, int] = field(default_factory=dict)
+    paragraph_ids: dict[str, int] = field(default_factory=dict)
+    expense_group_ids: dict[str, int] = field(default_factory=dict)
+    task_ids: dict[str, int] = field(default_factory=dict)
+
+    chapters_by_division: dict[int, list[ChapterRead]] = field(default_factory=dict)
+    paragraphs_by_chapter: dict[int, list[ParagraphRead]] = field(default_factory=dict)
+
+
+class DictionaryCache:
+    """Process-wide cache of Divisions, Chapters, Paragraphs, ExpenseGroups and Tasks.
+
+    Reloaded after ttl seconds or after invalidate() (call it after writing
+    any of these tables). get(force=True) reloads a fresh snapshot at most
+    once per min_reload seconds, so repeated unknown values cannot trigger a
+    reload per request. Values repeated in the database resolve to the
+    lowest id.
+    """
+
+    def __init__(self, ttl: float, min_reload: float = DICTIONARY_FORCE_RELOAD_SECONDS):
+        self.ttl = ttl
+        self.min_reload = min_reload
+        self.version = 0
+        self._snapshot: Dictionaries | None = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    def _fresh(self) -> bool:
+        snapshot = self._snapshot
+        return (
+            snapshot is not None
+            and snapshot.version == self.version
+            and time.monotonic() - snapshot.loaded_at < self.ttl
+        )
+
+    def _reload(self, force: bool) -> bool:
+        if not self._fresh():
+            return True
+        return force and time.monotonic() - self._snapshot.loaded_at >= self.min_reload
+
+    async def get(self, db: AsyncSession, force: bool = False) -> Dictionaries:
+        if not self._reload(force):
+            return self._snapshot
+
+        async with self._lock:
+            if self._reload(force):
+                self._snapshot = await self._load(db)
+        return self._snapshot
+
+    async def _load(self, db: AsyncSession) -> Dictionaries:
+        version = self.version
+        divisions = (await db.execute(select(Divisions).order_by(Divisions.id))).scalars().all()
+        chapters = (await db.execute(select(Chapters).order_by(Chapters.id))).scalars().all()
+        paragraphs = (await db.execute(
+            select(Paragraphs).options(selectinload(Paragraphs.expense_group)).order_by(Paragraphs.id)
+        )).scalars().all()
+        expense_groups = (await db.execute(select(ExpenseGroups).order_by(ExpenseGroups.id))).scalars().all()
+        tasks = (await db.execute(select(Tasks).order_by(Tasks.id))).scalars().all()
+
+        d = Dictionaries(version=version, loaded_at=time.monotonic())
+        for o in divisions:
+            d.divisions[o.id] = DivisionRead.model_validate(o)
+            d.division_ids.setdefault(o.value, o.id)
+        for o in chapters:
+            chapter = ChapterRead.model_validate(o)
+            d.chapters[o.id] = chapter
+            d.chapter_ids.setdefault(o.value, o.id)
+            d.chapters_by_division.setdefault(o.division_id, []).append(chapter)
+        for o in paragraphs:
+            paragraph = ParagraphRead.model_validate(o)
+            d.paragraphs[o.id] = paragraph
+            d.paragraph_ids.setdefault(o.value, o.id)
+            d.paragraphs_by_chapter.setdefault(o.chapter_id, []).append(paragraph)
+        for o in expense_groups:
+            d.expense_groups[o.id] = ExpenseGroupRead.model_validate(o)
+            d.expense_group_ids.setdefault(o.definition, o.id)
+        for o in tasks:
+            d.tasks[o.id] = TaskRead.model_validate(o)
+            d.task_ids.setdefault(o.value, o.id)
+
+        for items in d.chapters_by_division.values():
+            items.sort(key=lambda c: c.value)
+        for items in d.paragraphs_by_chapter.values():
+            items.sort(key=lambda p: p.value)
+        return d
+
+
+dictionary_cache = DictionaryCache(DICTIONARY_CACHE_TTL)
@@ -3,9 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
-from db.database import get_db
+from db.database import get_read_db
 from db.models import Chapters, Divisions
 from api.schemas import ChapterRead, DivisionRead 
+from api.dictionaries import dictionary_cache
 
 router = APIRouter(prefix="/api/divisions", tags=["Divisions"])
 
@@ -15,13 +16,10 @@ router = APIRouter(prefix="/api/divisions", tags=["Divisions"])
     summary="Get all Divisions"
 )
 async def get_divisions(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> List[DivisionRead]:
-    stmt = select(Divisions)
-    result = await db.execute(stmt)
-    divisions_orm = result.scalars().all()
-
-    return [DivisionRead.model_validate(d) for d in divisions_orm]
+    dicts = await dictionary_cache.get(db)
+    return list(dicts.divisions.values())
 
 @router.get(
     "/{division_value}/chapters",
@@ -30,19 +28,14 @@ async def get_divisions(
 )
 async def get_chapters_by_division(
     division_value: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> List[ChapterRead]:
-    stmt = select(Divisions).where(Divisions.value == division_value)
-    result = await db.execute(stmt)
-    division = result.scalars().first()
-    if not division:
+    dicts = await dictionary_cache.get(db)
+    division_id = dicts.division_ids.get(division_value)
+    if division_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"Division with ID {division_value} not found"
         )
 
-    stmt = select(Chapters).where(Chapters.division_id == division.id).order_by(Chapters.value)
-    result = await db.execute(stmt)
-    chapters_orm = result.scalars().all()
-
-    return [ChapterRead.model_validate(c) for c in chapters_orm]
+    return dicts.chapters_by_division.get(division_id, [])
@@ -1,109 +1,131 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import Depends
 
-from api.schemas import TableFullDTO, HEADERS
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from api.schemas import HEADERS
+from api.records import current_rows_select, NDJSON_CHUNK_SIZE
 
 from db.database import get_db
-from db.models import Tables, DepartmentTables, Rows, RowDatas, Divisions, Chapters, Paragraphs, ExpenseGroups
-import pandas as pd
+from db.models import DepartmentTables, Rows
 
-from datetime import datetime
-import os
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_SPOOL_MAX_SIZE = int(os.getenv("EXPORT_SPOOL_MAX_SIZE", str(8 * 1024 * 1024)))
 
-# wczytać tabele po id tabeli
-# na podstawoe danych tabeli zrobić excela
+# openpyxl pracuje synchronicznie - osobna, ograniczona pula, żeby nie blokować pętli zdarzeń
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+
+# kolumny arkusza w kolejności HEADERS, jako klucze z current_rows_select()
+EXCEL_COLUMNS = [
+    "budget_part",
+    "division__value",
+    "chapter__value",
+    "paragraph__value",
+    "funding_source",
+    "expense_group__definition",
+    "task_budget_full__value",
+    "task_budget_function__value",
+    "program_project_name",
+    "organizational_unit_name",
+    "plan_wi",
+    "fund_distributor",
+    "budget_code",
+    "task_name",
+    "task_justification",
+    "expenditure_purpose",
+    *[
+        f"{field}_{year}"
+        for year in range(4)
+        for field in ("financial_needs", "expenditure_limit", "unallocated_task_funds", "contract_amount", "contract_number")
+    ],
+    "subsidy_agreement_party",
+    "legal_basis_for_subsidy",
+    "notes",
+]
 
 '''
 by wywołać:
 async with AsyncSessionLocal() as db:
-    await generete_excel(1, db)
+    xlsx = await generete_excel(1, db)
 '''
-def dto_to_rows(dto):
+def excel_rows(records):
+    # wiersz danych (aktualna wersja) + pusty wiersz odstępu
     rows = []
-    for dept_table in dto.department_tables:
-        rows.append({HEADERS[i]: i for i in range(len(HEADERS))})
-        for row in dept_table.rows:
-            for row_data in row.row_datas[::-1]:
-                rows.append({
-                    HEADERS[0]: row_data.budget_part,
-                    HEADERS[1]: row_data.division.value,
-                    HEADERS[2]: row_data.chapter.value,
-                    HEADERS[3]: row_data.paragraph.value,
-                    HEADERS[4]: row_data.funding_source,
-                    HEADERS[5]: row_data.expense_group.definition,
-                    HEADERS[6]: row_data.task_budget_full.value,
-                    HEADERS[7]: row_data.task_budget_function.value,
-                    HEADERS[8]: row_data.program_project_name,
-                    HEADERS[9]: row_data.organizational_unit_name,
-                    HEADERS[10]: row_data.plan_wi,
-                    HEADERS[11]: row_data.fund_distributor,
-                    HEADERS[12]: row_data.budget_code,
-                    HEADERS[13]: row_data.task_name,
-                    HEADERS[14]: row_data.task_justification,
-                    HEADERS[15]: row_data.expenditure_purpose,
-
-                    HEADERS[16]: row_data.financial_needs_0,
-                    HEADERS[17]: row_data.expenditure_limit_0,
-                    HEADERS[18]: row_data.unallocated_task_funds_0,
-                    HEADERS[19]: row_data.contract_amount_0,
-                    HEADERS[20]: row_data.contract_number_0,
-                 
-                    HEADERS[21]: row_data.financial_needs_1,
-                    HEADERS[22]: row_data.expenditure_limit_1,
-                    HEADERS[23]: row_data.unallocated_task_funds_1,
-                    HEADERS[24]: row_data.contract_amount_1,
-                    HEADERS[25]: row_data.contract_number_1,
-                 
-                    HEADERS[26]: row_data.financial_needs_2,
-                    HEADERS[27]: row_data.expenditure_limit_2,
-                    HEADERS[28]: row_data.unallocated_task_funds_2,
-                    HEADERS[29]: row_data.contract_amount_2,
-                    HEADERS[30]: row_data.contract_number_2,
-                 
-                    HEADERS[31]: row_data.financial_needs_3,
-                    HEADERS[32]: row_data.expenditure_limit_3,
-                    HEADERS[33]: row_data.unallocated_task_funds_3,
-                    HEADERS[34]: row_data.contract_amount_3,
-                    HEADERS[35]: row_data.contract_number_3,
-
-                    HEADERS[36]: row_data.subsidy_agreement_party,
-                    HEADERS[37]: row_data.legal_basis_for_subsidy,
-                    HEADERS[38]: row_data.notes,
-                })
-                break
-            rows.append({HEADERS[i]: None for i in range(len(HEADERS))})
+    for m in records:
+        if m["id"] is not None:
+            rows.append([m[col] for col in EXCEL_COLUMNS])
+        rows.append([])
     return rows
 
-async def generete_excel(table_id: int, db: AsyncSession = Depends(get_db)):
-    query = (
-        select(Tables)
-        .where(Tables.id == table_id)
-        .options(
-            selectinload(Tables.department_tables).options(
-                joinedload(DepartmentTables.department),
-                joinedload(DepartmentTables.status),
-                selectinload(DepartmentTables.rows).options(
-                    selectinload(Rows.row_datas).options(
-                        joinedload(RowDatas.division),
-                        joinedload(RowDatas.chapter),
-                        joinedload(RowDatas.paragraph),
-                        joinedload(RowDatas.expense_group),
-                        joinedload(RowDatas.task_budget_full),
-                        joinedload(RowDatas.task_budget_function),
-                    )
-                )
-            )
-        )
+def numbering_row():
+    # wiersz z numerami kolumn otwierający tabelę działu
+    return list(range(len(HEADERS)))
+
+def append_rows(ws, rows):
+    for row in rows:
+        ws.append(row)
+
+def save_workbook(wb, out):
+    wb.save(out)
+    out.seek(0)
+
+async def generete_excel(table_id: int, db: AsyncSession = Depends(get_db), chunk_size: int = NDJSON_CHUNK_SIZE):
+    """XLSX of the current revisions, written row by row into a spooled temp file.
+
+    Returns None when the table has no department tables.
+    """
+    result = await db.execute(
+        select(DepartmentTables.id)
+        .where(DepartmentTables.table_id == table_id)
+        .order_by(DepartmentTables.id)
+    )
+    dept_table_ids = result.scalars().all()
+    if not dept_table_ids:
+        return None
+
+    loop = asyncio.get_running_loop()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    header = []
+    for heading in HEADERS:
+        cell = WriteOnlyCell(ws, value=heading)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    pending = [header]
+
+    # jedno zapytanie dla całej tabeli - wiersz numeracji przy każdej zmianie tabeli działu
+    stmt = (
+        current_rows_select(table_id)
+        .order_by(Rows.department_table_id, Rows.id)
+        .execution_options(yield_per=chunk_size)
     )
+    departments = iter(dept_table_ids)
+    opened = None
+    stream = await db.stream(stmt)
+    async for partition in stream.mappings().partitions():
+        for record in partition:
+            # tabele działów bez wierszy też dostają swój wiersz numeracji
+            while opened != record["row__department_table_id"]:
+                opened = next(departments)
+                pending.append(numbering_row())
+            pending.extend(excel_rows([record]))
+        await loop.run_in_executor(export_executor, append_rows, ws, pending)
+        pending = []
 
-    result = await db.execute(query)
-    table = result.scalars().first()
-    dto = TableFullDTO.model_validate(table)
-    print(dto.model_dump_json())
-    rows = dto_to_rows(dto)
-    df = pd.DataFrame(rows)
+    pending.extend(numbering_row() for _ in departments)
+    if pending:
+        await loop.run_in_executor(export_executor, append_rows, ws, pending)
 
-    return df
+    out = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    await loop.run_in_executor(export_executor, save_workbook, wb, out)
+    return out
@@ -0,0 +1,278 @@
+import hmac
+import logging
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from api.notifications import change_hub
+from api.passwords import password_pool
+from api.user import COOKIE_NAME, get_current_user
+from db.compaction import history_compactor
+from db.database import get_db, pool_status
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_TOP_QUERIES = int(os.getenv("SLOW_REQUEST_TOP_QUERIES", "5"))
+# scraper (Prometheus) podaje "Authorization: Bearer <METRICS_TOKEN>"; bez tokenu - tylko zalogowany admin
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+logger = logging.getLogger("api.metrics")
+router = APIRouter(tags=["metrics"])
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+    serialize_seconds: float = 0.0
+    # zapytanie (skrócone) -> [liczba, czas] - do logu wolnych żądań
+    queries: dict = field(default_factory=lambda: defaultdict(lambda: [0, 0.0]))
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.status = defaultdict(int)
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.response_bytes = 0
+        self.slow = 0
+
+
+class Metrics:
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+        self.statements_outside_requests = 0
+        self.engines: dict[str, AsyncEngine] = {}
+
+    def record(
+        self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats,
+        streaming: bool = False,
+    ):
+        metrics = self.routes[(method, route)]
+        metrics.latency.observe(seconds)
+        metrics.statements.observe(stats.statements)
+        metrics.status[status] += 1
+        metrics.db_seconds += stats.db_seconds
+        metrics.rows += stats.rows
+        metrics.serialize_seconds += stats.serialize_seconds
+        metrics.response_bytes += size
+
+        # strumienie zdarzeń (SSE) trwają z definicji długo
+        if seconds >= SLOW_REQUEST_SECONDS and not streaming:
+            metrics.slow += 1
+            log_slow_request(method, route, status, seconds, size, stats)
+
+    def render(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, labels: str, hist: Histogram):
+            cumulative = 0
+            for bound, bucket_count in zip((*hist.buckets, "+Inf"), hist.counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        routes = sorted(self.routes.items())
+        label = {key: f'method="{key[0]}",route="{key[1]}"' for key, _ in routes}
+
+        metric("http_request_duration_seconds", "histogram", "Request latency by route template.")
+        for key, m in routes:
+            histogram("http_request_duration_seconds", label[key], m.latency)
+
+        metric("http_requests_total", "counter", "Requests by route template and status.")
+        for key, m in routes:
+            for status, total in sorted(m.status.items()):
+                lines.append(f'http_requests_total{{{label[key]},status="{status}"}} {total}')
+
+        metric("http_request_sql_statements", "histogram", "SQL statements issued per request.")
+        for key, m in routes:
+            histogram("http_request_sql_statements", label[key], m.statements)
+
+        counters = [
+            ("http_request_db_seconds_total", "Time spent executing SQL.", "db_seconds"),
+            ("http_request_db_rows_total", "Rows returned by SQL statements.", "rows"),
+            ("http_response_serialize_seconds_total", "Time spent rendering response bodies.", "serialize_seconds"),
+            ("http_response_bytes_total", "Response body bytes sent.", "response_bytes"),
+            ("http_slow_requests_total", f"Requests slower than {SLOW_REQUEST_SECONDS} s.", "slow"),
+        ]
+        for name, help_text, attr in counters:
+            metric(name, "counter", help_text)
+            for key, m in routes:
+                lines.append(f"{name}{{{label[key]}}} {getattr(m, attr)}")
+
+        metric("sql_statements_outside_requests_total", "counter", "SQL statements issued outside HTTP requests.")
+        lines.append(f"sql_statements_outside_requests_total {self.statements_outside_requests}")
+
+        pools = {pool: pool_status(engine) for pool, engine in self.engines.items()}
+        for name in dict.fromkeys(name for status in pools.values() for name in status):
+            kind = "counter" if name.endswith("_total") else "gauge"
+            metric(f"db_pool_{name}", kind, f"Database connection pool: {name.replace('_', ' ')}.")
+            for pool, status in pools.items():
+                if name in status:
+                    lines.append(f'db_pool_{name}{{pool="{pool}"}} {status[name]}')
+
+        metric("notifications_subscribers", "gauge", "Open SSE / WebSocket change subscriptions.")
+        lines.append(f"notifications_subscribers {len(change_hub.subscribers)}")
+        metric("notifications_delivered_total", "counter", "Change events queued for subscribers.")
+        lines.append(f"notifications_delivered_total {change_hub.delivered}")
+
+        metric("history_compaction_runs_total", "counter", "Completed background history compactions.")
+        lines.append(f"history_compaction_runs_total {history_compactor.runs}")
+        metric("history_archived_revisions_total", "counter", "Revisions moved to row_datas_archive.")
+        lines.append(f"history_archived_revisions_total {history_compactor.archived}")
+        metric("history_freed_bytes_total", "counter", "Revision data removed from row_datas / row_data_deltas.")
+        lines.append(f"history_freed_bytes_total {history_compactor.freed_bytes}")
+
+        for name, value in password_pool.snapshot().items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            metric(f"password_pool_{name}", kind, f"Argon2 worker pool: {name.replace('_', ' ')}.")
+            lines.append(f"password_pool_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_key(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()[:160]
+
+
+def log_slow_request(method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats):
+    top = sorted(stats.queries.items(), key=lambda item: item[1][1], reverse=True)[:SLOW_REQUEST_TOP_QUERIES]
+    breakdown = "\n".join(
+        f"    {count:4d}x {total * 1000:9.1f} ms  {sql}" for sql, (count, total) in top
+    )
+    logger.warning(
+        "slow request %s %s -> %s in %.0f ms: %d SQL statements (%.0f ms, %d rows), "
+        "serialization %.0f ms, %d bytes\n%s",
+        method, route, status, seconds * 1000, stats.statements, stats.db_seconds * 1000,
+        stats.rows, stats.serialize_seconds * 1000, size, breakdown,
+    )
+
+
+def record_serialization(seconds: float):
+    stats = current_request.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+def instrument_engine(engine: AsyncEngine, pool: str = "primary"):
+    metrics.engines[pool] = engine
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = current_request.get()
+        if stats is None:
+            metrics.statements_outside_requests += 1
+            return
+
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        if cursor.description is not None and cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+        query = stats.queries[query_key(statement)]
+        query[0] += 1
+        query[1] += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # zapytanie zakończone błędem nie dochodzi do after_cursor_execute
+        connection = context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+class MetricsMiddleware:
+    """ASGI middleware: latency until the last body chunk, response size and SQL stats per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        response = {"status": 500, "size": 0, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                response["streaming"] = content_type.startswith(b"text/event-stream")
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            metrics.record(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                response["status"],
+                time.perf_counter() - started,
+                response["size"],
+                stats,
+                response["streaming"],
+            )
+
+
+@router.get("/api/metrics", include_in_schema=False)
+async def get_metrics(request: Request, db: AsyncSession = Depends(get_db)):
+    authorization = request.headers.get("authorization", "")
+    if not (METRICS_TOKEN and hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}")):
+        user = await get_current_user(request.cookies.get(COOKIE_NAME), db)
+        if user.user_type.type != "admin":
+            raise HTTPException(status_code=403, detail="Admin only")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,204 @@
+"""Change notifications: writers NOTIFY inside their transaction, one shared LISTEN connection
+fans the events out to SSE / WebSocket subscribers filtered by table and department.
+
+Events are hints ({"kind", "table_id", "department_id", "row_ids"}); clients
+fetch the data through /api/tables/{table_id}/changes. row_ids null means
+"many rows" and "resync" means events may have been lost.
+
+"principal" events (no table_id, so no subscriber sees them) carry a user_id
+and make every worker drop its cached principal of that user.
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+
+import asyncpg
+from pydantic_core import to_json
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.principals import principal_cache
+from db.database import DATABASE_DIRECT_URL, DATABASE_URL, DB_CONNECT_TIMEOUT
+from db.models import DepartmentTables, Rows
+
+NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "table_changes")
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))
+NOTIFY_RECONNECT_SECONDS = float(os.getenv("NOTIFY_RECONNECT_SECONDS", "2"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# payload NOTIFY ma limit 8000 bajtów - przy większych paczkach bez listy wierszy
+NOTIFY_MAX_ROW_IDS = 500
+
+logger = logging.getLogger("api.notifications")
+
+
+async def notify_changes(
+    db: AsyncSession,
+    kind: str,
+    table_id: int,
+    department_id: int | None = None,
+    row_ids: list[int] | None = None,
+):
+    """Queue a notification in the current transaction (delivered on commit, dropped on rollback)."""
+    payload = {"kind": kind, "table_id": table_id, "department_id": department_id, "row_ids": row_ids}
+    await db.execute(select(func.pg_notify(NOTIFY_CHANNEL, to_json(payload).decode())))
+
+
+async def notify_principal(db: AsyncSession, user_id: int):
+    """Queue a cache invalidation of user_id's principal for all workers (delivered on commit)."""
+    payload = {"kind": "principal", "table_id": None, "department_id": None, "row_ids": None, "user_id": user_id}
+    await db.execute(select(func.pg_notify(NOTIFY_CHANNEL, to_json(payload).decode())))
+
+
+async def notify_row_changes(db: AsyncSession, row_ids: list[int]):
+    """One notification per (table, department) of the given rows, grouped in a single statement."""
+    if not row_ids:
+        return
+    listed = len(set(row_ids)) <= NOTIFY_MAX_ROW_IDS
+    grouped = (
+        select(
+            DepartmentTables.table_id,
+            DepartmentTables.department_id,
+            func.array_agg(func.distinct(Rows.id)).label("row_ids"),
+        )
+        .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+        .where(Rows.id.in_(set(row_ids)))
+        .group_by(DepartmentTables.table_id, DepartmentTables.department_id)
+        .subquery()
+    )
+    payload = func.json_build_object(
+        "kind", "rows",
+        "table_id", grouped.c.table_id,
+        "department_id", grouped.c.department_id,
+        "row_ids", grouped.c.row_ids if listed else None,
+    )
+    await db.execute(select(func.pg_notify(NOTIFY_CHANNEL, cast(payload, Text))))
+
+
+@dataclass(eq=False)
+class Subscription:
+    table_id: int
+    department_id: int | None = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(NOTIFY_QUEUE_SIZE))
+
+    def matches(self, event: dict) -> bool:
+        if event.get("table_id") != self.table_id:
+            return False
+        return self.department_id is None or event.get("department_id") in (None, self.department_id)
+
+    def push(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # wolny klient: zamiast gubić zdarzenia po cichu - jedno "resync"
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"kind": "resync", "table_id": self.table_id})
+
+
+class ChangeHub:
+    """A single LISTEN connection shared by all subscribers of this process.
+
+    Opened by start() at application startup (and on first subscription), so
+    principal invalidations reach workers that have no subscribers.
+    """
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL):
+        self.channel = channel
+        self.subscribers: set[Subscription] = set()
+        self.delivered = 0
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+
+    @staticmethod
+    def dsn() -> str:
+        # LISTEN wymaga sesji - przy PgBouncerze w trybie transakcyjnym przez DATABASE_DIRECT_URL
+        url = make_url(DATABASE_DIRECT_URL or DATABASE_URL).set(drivername="postgresql")
+        return url.render_as_string(hide_password=False)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._listen())
+
+    async def subscribe(self, table_id: int, department_id: int | None = None) -> Subscription:
+        self.start()
+        await asyncio.wait_for(self._ready.wait(), DB_CONNECT_TIMEOUT)
+        subscription = Subscription(table_id, department_id)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("ignoring malformed notification: %.200s", payload)
+            return
+        if event.get("kind") == "principal":
+            principal_cache.invalidate_user(event["user_id"])
+            return
+        for subscription in list(self.subscribers):
+            if subscription.matches(event):
+                subscription.push(event)
+                self.delivered += 1
+
+    def _broadcast_resync(self):
+        for subscription in list(self.subscribers):
+            subscription.push({"kind": "resync", "table_id": subscription.table_id})
+
+    async def _listen(self):
+        while True:
+            lost = asyncio.Event()
+            try:
+                connection = await asyncpg.connect(self.dsn())
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("LISTEN connection failed (%s), retrying", e)
+                await asyncio.sleep(NOTIFY_RECONNECT_SECONDS)
+                continue
+
+            try:
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                if self._ready.is_set():
+                    # zdarzenia z czasu bez połączenia przepadły
+                    self._broadcast_resync()
+                    principal_cache.clear()
+                self._ready.set()
+                await lost.wait()
+                logger.warning("LISTEN connection lost, reconnecting")
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+change_hub = ChangeHub()
+
+
+async def sse_events(subscription: Subscription):
+    """text/event-stream body: ready, then change / resync events and heartbeat comments."""
+    try:
+        yield b"event: ready\ndata: {}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+            name = "resync" if event.get("kind") == "resync" else "change"
+            yield f"event: {name}\ndata: ".encode() + to_json(event) + b"\n\n"
+    finally:
+        change_hub.unsubscribe(subscription)
@@ -0,0 +1,58 @@
+from fastapi import Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.schemas import RowPageQuery
+from db.models import DepartmentTables, Rows, RowDatas, Divisions, Chapters, Paragraphs
+
+
+def row_page_query(
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    cursor: int | None = Query(default=None, description="Last row id of the previous page"),
+    division: str | None = None,
+    chapter: str | None = None,
+    paragraph: str | None = None,
+) -> RowPageQuery:
+    return RowPageQuery(limit=limit, cursor=cursor, division=division, chapter=chapter, paragraph=paragraph)
+
+
+async def page_rows(
+    db: AsyncSession,
+    table_id: int,
+    page: RowPageQuery,
+    department_id: int | None = None,
+) -> tuple[list[tuple[int, int]], int | None]:
+    """One keyset page of (row id, department table id) pairs plus the next cursor."""
+    stmt = (
+        select(Rows.id, Rows.department_table_id)
+        .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+        .where(DepartmentTables.table_id == table_id)
+        .order_by(Rows.id)
+    )
+    if department_id is not None:
+        stmt = stmt.where(DepartmentTables.department_id == department_id)
+    if page.cursor is not None:
+        stmt = stmt.where(Rows.id > page.cursor)
+
+    # filtry działają na aktualnej wersji wiersza
+    if page.division or page.chapter or page.paragraph:
+        stmt = stmt.join(RowDatas, RowDatas.id == Rows.current_row_data_id)
+    if page.division:
+        stmt = stmt.join(Divisions, Divisions.id == RowDatas.division_id).where(Divisions.value == page.division)
+    if page.chapter:
+        stmt = stmt.join(Chapters, Chapters.id == RowDatas.chapter_id).where(Chapters.value == page.chapter)
+    if page.paragraph:
+        stmt = stmt.join(Paragraphs, Paragraphs.id == RowDatas.paragraph_id).where(Paragraphs.value == page.paragraph)
+
+    if page.limit is not None:
+        stmt = stmt.limit(page.limit + 1)
+
+    result = await db.execute(stmt)
+    rows = [(row.id, row.department_table_id) for row in result]
+
+    next_cursor = None
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = rows[-1][0]
+
+    return rows, next_cursor
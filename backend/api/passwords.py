@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.hash import argon2
+
+# parametry Argon2 - niepodane zostają domyślne z passlib
+ARGON2_SETTINGS = {
+    key: int(os.environ[env])
+    for key, env in (
+        ("rounds", "ARGON2_TIME_COST"),
+        ("memory_cost", "ARGON2_MEMORY_COST"),
+        ("parallelism", "ARGON2_PARALLELISM"),
+    )
+    if os.getenv(env)
+}
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+hasher = argon2.using(**ARGON2_SETTINGS)
+
+
+class PasswordPool:
+    """Runs Argon2 hash/verify on a fixed thread pool (argon2-cffi releases the GIL).
+
+    At most workers + queue_limit calls may be in flight; beyond that the
+    request fails fast with 503 instead of queueing behind the burst.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.capacity = workers + queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self.in_flight = 0
+        self.stats = {
+            "workers": workers,
+            "queue_limit": queue_limit,
+            "hash_total": 0,
+            "verify_total": 0,
+            "rehash_total": 0,
+            "rejected_total": 0,
+            "wait_seconds_total": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    async def run(self, kind: str, fn, *args):
+        if self.in_flight >= self.capacity:
+            self.stats["rejected_total"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Serwer jest przeciążony, spróbuj ponownie za chwilę",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+        queued_at = time.perf_counter()
+
+        # wątek zapisuje tylko swoje znaczniki czasu; statystyki zmienia wyłącznie pętla zdarzeń
+        timing = []
+
+        def timed():
+            timing.append(time.perf_counter())
+            try:
+                return fn(*args)
+            finally:
+                timing.append(time.perf_counter())
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.in_flight -= 1
+            self.stats[f"{kind}_total"] += 1
+            # przy anulowaniu wątek może jeszcze liczyć - wtedy bez czasów
+            if len(timing) == 2:
+                started_at, finished_at = timing
+                self.stats["wait_seconds_total"] += started_at - queued_at
+                self.stats["run_seconds_total"] += finished_at - started_at
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "in_flight": self.in_flight}
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run("hash", hasher.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await password_pool.run("verify", hasher.verify, password, password_hash)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return hasher.needs_update(password_hash)
+
+
+async def rehash_password(password: str) -> str:
+    # po zmianie parametrów Argon2 - nowy skrót przy udanym logowaniu
+    return await password_pool.run("rehash", hasher.hash, password)
@@ -1,10 +1,53 @@
+import re
+import threading
+from copy import deepcopy
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from datetime import date
 from io import BytesIO
+from xml.sax.saxutils import escape
+
+# znaki sterujące niedozwolone w XML (python-docx też by je odrzucił)
+_INVALID_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_local = threading.local()
+
+
+def _template():
+    # szablon parsowany raz na wątek roboczy, każdy raport to jego kopia
+    template = getattr(_local, "template", None)
+    if template is None:
+        template = _local.template = Document()
+    return deepcopy(template)
+
+
+def _cell_xml(value, tc_pr: str) -> str:
+    text = _INVALID_XML.sub("", str(value))
+    runs = []
+    for line_no, line in enumerate(text.split("\n")):
+        if line_no:
+            runs.append("<w:br/>")
+        for part_no, part in enumerate(line.split("\t")):
+            if part_no:
+                runs.append("<w:tab/>")
+            if part:
+                runs.append(f'<w:t xml:space="preserve">{escape(part)}</w:t>')
+    run = f"<w:r>{''.join(runs)}</w:r>" if runs else ""
+    return f"<w:tc>{tc_pr}<w:p>{run}</w:p></w:tc>"
+
+
+def _rows_xml(rows, tc_props) -> str:
+    # cały korpus tabeli jako jeden fragment XML zamiast wywołań API na komórkę
+    body = []
+    for row in rows:
+        cells = "".join(_cell_xml(value, tc_pr) for value, tc_pr in zip(row, tc_props))
+        body.append(f"<w:tr>{cells}</w:tr>")
+    return f"<w:tbl {nsdecls('w')}>{''.join(body)}</w:tbl>"
+
 
 def create_docx(data, comment, date):
-    doc = Document()
-    print(data)
+    doc = _template()
     doc.add_paragraph(f'Proszę edytować do: {date}')
     table = doc.add_table(rows=1, cols=len(data['headers']))
     table.style = "Table Grid"
@@ -15,11 +58,14 @@ def create_docx(data, comment, date):
         hdr_cells[i].text = heading
         hdr_cells[i].paragraphs[0].runs[0].bold = True
 
-    # Add remaining rows
-    for row in data["rows"]:
-        cells = table.add_row().cells
-        for i, value in enumerate(row):
-            cells[i].text = str(value)
+    # Add remaining rows - szerokości kolumn jak w nagłówku
+    tc_props = [
+        f'<w:tcPr><w:tcW w:w="{cell.width.twips}" w:type="dxa"/></w:tcPr>' if cell.width else ""
+        for cell in hdr_cells
+    ]
+    rows = [list(row) + [""] * (len(tc_props) - len(row)) for row in data["rows"]]
+    if rows:
+        table._tbl.extend(list(parse_xml(_rows_xml(rows, tc_props))))
 
     doc.add_paragraph(comment)
     buffer = BytesIO()
@@ -28,12 +74,14 @@ def create_docx(data, comment, date):
 
 
 if __name__ == '__main__':
-    data = [
-        ["col1", 'col2', 'col3', 'col4', 'col5'],
-        ['data1', 'data2', 'data3', 'data4', 'data5'],
-        [1, 2, 3, 4, 5],
-        ['odsao', ' ', 'dasdsadsa', '123', 12]
-    ]
+    data = {
+        'headers': ["col1", 'col2', 'col3', 'col4', 'col5'],
+        'rows': [
+            ['data1', 'data2', 'data3', 'data4', 'data5'],
+            [1, 2, 3, 4, 5],
+            ['odsao', ' ', 'dasdsadsa', '123', 12]
+        ]
+    }
 
     comment = 'Proszę bardzo o szybkie wykonanie zadania!'
     today = date.today()
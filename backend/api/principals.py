@@ -0,0 +1,93 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+
+@dataclass(frozen=True)
+class PrincipalType:
+    id: int
+    type: str
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only snapshot of an authenticated Users row (same attribute names)."""
+    id: int
+    user_name: str
+    name: str
+    surname: str
+    department_id: int
+    user_type_id: int
+    user_type: PrincipalType
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            user_name=user.user_name,
+            name=user.name,
+            surname=user.surname,
+            department_id=user.department_id,
+            user_type_id=user.user_type_id,
+            user_type=PrincipalType(id=user.user_type.id, type=user.user_type.type),
+        )
+
+
+class PrincipalCache:
+    """TTL-bounded LRU of principals keyed by (user id, token issue time).
+
+    invalidate_user() drops every cached token of a user by bumping its
+    generation, so entries cached before the change are never served again.
+    Read generation() before loading the user and pass it to put(): a load
+    that raced with an invalidation is then not cached at all.
+    The cache is per process: other workers invalidate on the "principal"
+    event from api.notifications.notify_principal(). The TTL bounds how long
+    a worker can serve a stale principal if that event is lost (LISTEN
+    connection down), so keep it short.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[int, int], tuple[float, int, Principal]] = OrderedDict()
+        self._generations: dict[int, int] = {}
+
+    def get(self, user_id: int, issued_at: int) -> Principal | None:
+        key = (user_id, issued_at)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, generation, principal = entry
+        if expires_at < time.monotonic() or generation != self._generations.get(user_id, 0):
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return principal
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    def put(self, user_id: int, issued_at: int, principal: Principal, generation: int):
+        if generation != self.generation(user_id):
+            # unieważniony w trakcie ładowania - dane mogą być sprzed zmiany
+            return
+        key = (user_id, issued_at)
+        self._entries[key] = (time.monotonic() + self.ttl, generation, principal)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
@@ -0,0 +1,157 @@
+"""N+1 detector: groups SQL statements by normalized text and flags repeated single-row lookups.
+
+In tests the query_watch fixture (tests/conftest.py) fails the test on N+1
+patterns and can bound the statement count:
+
+    def test_department_dates(client, query_watch):
+        client.get("/api/departments/get_department_dates")
+        query_watch.assert_max_statements(1)
+
+At runtime N_PLUS_ONE_WARN=1 adds QueryWatchMiddleware, which logs a warning
+for every request that repeats the same single-row SELECT at least
+N_PLUS_ONE_THRESHOLD times.
+"""
+import logging
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+N_PLUS_ONE_WARN = os.getenv("N_PLUS_ONE_WARN", "0") == "1"
+
+logger = logging.getLogger("api.query_watch")
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+(?:::[A-Z_]+(?:\[\])?)?"), "?"),
+    (re.compile(r"%\(\w+\)s|(?<!:):\w+\b"), "?"),
+    (re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement text with literals and bind parameters replaced by ?, IN lists collapsed."""
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@dataclass
+class StatementGroup:
+    sql: str
+    count: int = 0
+    # SELECT-y zwracające najwyżej jeden wiersz - typowy objaw N+1
+    single_row: int = 0
+    parameters: set = field(default_factory=set)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+class QueryWatch:
+    def __init__(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self.groups: dict[str, StatementGroup] = {}
+        self.count = 0
+
+    def record(self, statement: str, parameters, rows: int | None):
+        sql = normalize_sql(statement)
+        group = self.groups.get(sql)
+        if group is None:
+            group = self.groups[sql] = StatementGroup(sql)
+        group.count += 1
+        self.count += 1
+        if rows is not None and 0 <= rows <= 1 and sql.upper().startswith(("SELECT", "WITH")):
+            group.single_row += 1
+            group.parameters.add(repr(parameters))
+
+    def n_plus_one(self) -> list[StatementGroup]:
+        """Single-row lookups repeated with different parameters at least `threshold` times."""
+        return sorted(
+            (
+                g for g in self.groups.values()
+                if g.single_row >= self.threshold and len(g.parameters) > 1
+            ),
+            key=lambda g: g.single_row,
+            reverse=True,
+        )
+
+    def report(self) -> str:
+        return "\n".join(f"    {g.single_row:4d}x  {g.sql[:200]}" for g in self.n_plus_one())
+
+    def assert_no_n_plus_one(self):
+        if self.n_plus_one():
+            raise NPlusOneError(f"N+1 queries (threshold {self.threshold}):\n{self.report()}")
+
+    def assert_max_statements(self, limit: int):
+        if self.count > limit:
+            top = sorted(self.groups.values(), key=lambda g: g.count, reverse=True)[:5]
+            breakdown = "\n".join(f"    {g.count:4d}x  {g.sql[:200]}" for g in top)
+            raise NPlusOneError(f"{self.count} SQL statements, expected at most {limit}:\n{breakdown}")
+
+
+_active: ContextVar[tuple[QueryWatch, ...]] = ContextVar("query_watch", default=())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    watches = _active.get()
+    if not watches:
+        return
+    # rowcount -1: kursor po stronie serwera (stream), liczba wierszy nieznana
+    rows = cursor.rowcount if cursor.description is not None and not executemany else None
+    for watch in watches:
+        watch.record(statement, parameters, rows)
+
+
+def install(engines: list[AsyncEngine] | None = None):
+    # leniwie - normalize_sql i QueryWatch działają bez skonfigurowanej bazy
+    from db.database import all_engines
+
+    for engine in engines or all_engines().values():
+        sync_engine = engine.sync_engine
+        if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+            event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def watching(threshold: int = N_PLUS_ONE_THRESHOLD, engines: list[AsyncEngine] | None = None):
+    """Collect statements executed in this context (and tasks started from it), primary and replicas."""
+    install(engines)
+    watch = QueryWatch(threshold)
+    token = _active.set((*_active.get(), watch))
+    try:
+        yield watch
+    finally:
+        _active.reset(token)
+
+
+class QueryWatchMiddleware:
+    """Runtime warning mode: logs N+1 patterns per request (route template, statements)."""
+
+    def __init__(self, app, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with watching(self.threshold) as watch:
+            await self.app(scope, receive, send)
+
+        if watch.n_plus_one():
+            route = scope.get("route")
+            logger.warning(
+                "N+1 queries in %s %s (%d statements):\n%s",
+                scope["method"], route.path if route is not None else scope["path"],
+                watch.count, watch.report(),
+            )
+
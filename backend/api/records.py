@@ -0,0 +1,195 @@
+import os
+
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from api.schemas import RowDataDTO
+from db.models import (
+    Tables, DepartmentTables, Departments, Statuses, Rows, RowDatas,
+    Divisions, Chapters, Paragraphs, ExpenseGroups, Tasks,
+)
+
+NDJSON_CHUNK_SIZE = int(os.getenv("NDJSON_CHUNK_SIZE", "500"))
+
+ParagraphExpenseGroups = aliased(ExpenseGroups, name="paragraph_expense_groups")
+TasksFull = aliased(Tasks, name="tasks_full")
+TasksFunction = aliased(Tasks, name="tasks_function")
+
+# zagnieżdżone obiekty RowDataDTO: nazwa -> (encja, kolumny)
+NESTED = {
+    "division": (Divisions, ["id", "value"]),
+    "chapter": (Chapters, ["id", "value"]),
+    "paragraph": (Paragraphs, ["id", "value"]),
+    "paragraph_expense_group": (ParagraphExpenseGroups, ["id", "definition"]),
+    "expense_group": (ExpenseGroups, ["id", "definition"]),
+    "task_budget_full": (TasksFull, ["id", "value", "type", "description"]),
+    "task_budget_function": (TasksFunction, ["id", "value", "type", "description"]),
+}
+ROW_DATA_FIELDS = [name for name in RowDataDTO.model_fields if name not in NESTED]
+
+
+def current_rows_select(table_id: int, department_id: int | None = None):
+    """Core select of rows joined with their current revision and dictionaries, flat columns."""
+    nested_columns = [
+        getattr(entity, col).label(f"{name}__{col}")
+        for name, (entity, cols) in NESTED.items()
+        for col in cols
+    ]
+    stmt = (
+        select(
+            Rows.id.label("row__id"),
+            Rows.department_table_id.label("row__department_table_id"),
+            Rows.last_update.label("row__last_update"),
+            Rows.next_year.label("row__next_year"),
+            *[RowDatas.__table__.c[name] for name in ROW_DATA_FIELDS],
+            *nested_columns,
+        )
+        .select_from(Rows)
+        .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+        .outerjoin(RowDatas, RowDatas.id == Rows.current_row_data_id)
+        .outerjoin(Divisions, Divisions.id == RowDatas.division_id)
+        .outerjoin(Chapters, Chapters.id == RowDatas.chapter_id)
+        .outerjoin(Paragraphs, Paragraphs.id == RowDatas.paragraph_id)
+        .outerjoin(ParagraphExpenseGroups, ParagraphExpenseGroups.id == Paragraphs.expense_group_id)
+        .outerjoin(ExpenseGroups, ExpenseGroups.id == RowDatas.expense_group_id)
+        .outerjoin(TasksFull, TasksFull.id == RowDatas.task_budget_full_id)
+        .outerjoin(TasksFunction, TasksFunction.id == RowDatas.task_budget_function_id)
+        .where(DepartmentTables.table_id == table_id)
+    )
+    if department_id is not None:
+        stmt = stmt.where(DepartmentTables.department_id == department_id)
+    return stmt
+
+
+def _nested(m, name: str) -> dict | None:
+    _, cols = NESTED[name]
+    if m[f"{name}__id"] is None:
+        return None
+    return {col: m[f"{name}__{col}"] for col in cols}
+
+
+def row_record(m) -> dict:
+    """RowDTO-shaped dict (current revision only) from a current_rows_select() mapping."""
+    row_datas = []
+    if m["id"] is not None:
+        data = {name: m[name] for name in ROW_DATA_FIELDS}
+        for name in NESTED:
+            if name != "paragraph_expense_group":
+                data[name] = _nested(m, name)
+        if data["paragraph"] is not None:
+            data["paragraph"]["expense_group"] = _nested(m, "paragraph_expense_group")
+        row_datas.append(data)
+
+    return {
+        "id": m["row__id"],
+        "department_table_id": m["row__department_table_id"],
+        "last_update": m["row__last_update"],
+        "next_year": m["row__next_year"],
+        "row_datas": row_datas,
+    }
+
+
+def department_tables_select(table_id: int, department_id: int | None = None):
+    stmt = (
+        select(
+            DepartmentTables.id,
+            DepartmentTables.start,
+            DepartmentTables.end,
+            Statuses.id.label("status_id"),
+            Statuses.value.label("status_value"),
+            Departments.id.label("department_id"),
+            Departments.type.label("department_type"),
+        )
+        .join(Statuses, Statuses.id == DepartmentTables.status_id)
+        .join(Departments, Departments.id == DepartmentTables.department_id)
+        .where(DepartmentTables.table_id == table_id)
+        .order_by(DepartmentTables.id)
+    )
+    if department_id is not None:
+        stmt = stmt.where(DepartmentTables.department_id == department_id)
+    return stmt
+
+
+def department_table_record(m) -> dict:
+    return {
+        "id": m["id"],
+        "start": m["start"],
+        "end": m["end"],
+        "status": {"id": m["status_id"], "value": m["status_value"]},
+        "department": {"id": m["department_id"], "type": m["department_type"]},
+    }
+
+
+def table_record(table: Tables) -> dict:
+    return {
+        "id": table.id,
+        "year": float(table.year),
+        "version": table.version,
+        "isOpen": table.isOpen,
+        "budget": float(table.budget) if table.budget is not None else None,
+    }
+
+
+async def table_document(
+    db: AsyncSession,
+    table: Tables,
+    department_id: int | None = None,
+    department_table_ids: set[int] | None = None,
+    row_ids: list[int] | None = None,
+) -> dict:
+    """TableFullDTO-shaped dict (current revisions only) built from two Core queries.
+
+    department_table_ids / row_ids restrict the result to one page.
+    """
+    dept_stmt = department_tables_select(table.id, department_id)
+    if department_table_ids is not None:
+        dept_stmt = dept_stmt.where(DepartmentTables.id.in_(department_table_ids))
+    result = await db.execute(dept_stmt)
+    department_tables = {
+        m["id"]: {**department_table_record(m), "rows": []}
+        for m in result.mappings()
+    }
+
+    rows_stmt = current_rows_select(table.id, department_id).order_by(Rows.id)
+    if row_ids is not None:
+        rows_stmt = rows_stmt.where(Rows.id.in_(row_ids))
+    result = await db.execute(rows_stmt)
+    for m in result.mappings():
+        record = row_record(m)
+        department_table = department_tables.get(record.pop("department_table_id"))
+        if department_table is not None:
+            department_table["rows"].append(record)
+
+    return {**table_record(table), "department_tables": list(department_tables.values())}
+
+
+async def stream_table_ndjson(
+    db: AsyncSession,
+    table: Tables,
+    department_id: int | None = None,
+    chunk_size: int = NDJSON_CHUNK_SIZE,
+):
+    """NDJSON records for a table: table, department_table*, row*.
+
+    Rows come from a server-side cursor in chunks of chunk_size, so memory
+    does not grow with the table. The session is closed when the stream ends.
+    """
+    try:
+        yield to_json({"type": "table", **table_record(table)}) + b"\n"
+
+        result = await db.execute(department_tables_select(table.id, department_id))
+        for m in result.mappings():
+            yield to_json({"type": "department_table", **department_table_record(m)}) + b"\n"
+
+        stmt = (
+            current_rows_select(table.id, department_id)
+            .order_by(Rows.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        stream = await db.stream(stmt)
+        async for partition in stream.mappings().partitions():
+            yield b"".join(to_json({"type": "row", **row_record(m)}) + b"\n" for m in partition)
+    finally:
+        await db.close()
@@ -0,0 +1,34 @@
+import time
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from api.metrics import record_serialization
+
+
+class TimedJSONResponse(JSONResponse):
+    """Default JSON response; render time goes to the request metrics."""
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            record_serialization(time.perf_counter() - started)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core.
+
+    Accepts plain dicts/lists as well as already validated DTOs. Returning it
+    directly from an endpoint skips FastAPI's response_model re-validation,
+    so the payload is validated (or built from Core rows) exactly once.
+    """
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return to_json(content)
+        finally:
+            record_serialization(time.perf_counter() - started)
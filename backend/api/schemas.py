@@ -5,7 +5,9 @@ from datetime import datetime # <-- Imports the specific class
 from decimal import Decimal
 
 class DeptLimitUpdateRequest(BaseModel):
+    tableId: int
     updates: List[List] 
+    dryRun: bool = False
 
 class BudgetUpdateRequest(BaseModel):
     budget: Decimal
@@ -37,7 +39,7 @@ class TaskRead(BaseModel):
     id: int
     value: str
     type: str
-    description: str
+    description: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
 
 class DepartmentRead(BaseModel):
@@ -141,6 +143,19 @@ class TableFullDTO(BaseModel):
     department_tables: List[DepartmentTableDTO] = []
     model_config = ConfigDict(from_attributes=True)
 
+class TablePageDTO(TableFullDTO):
+    next_cursor: Optional[int] = None
+
+class RowPageQuery(BaseModel):
+    limit: Optional[int] = None
+    cursor: Optional[int] = None
+    division: Optional[str] = None
+    chapter: Optional[str] = None
+    paragraph: Optional[str] = None
+
+    def is_paged(self) -> bool:
+        return any(v is not None for v in self.model_dump().values())
+
 class ChapterWithParagraphsRead(BaseModel):
     id: int
     value: str
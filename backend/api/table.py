@@ -1,23 +1,156 @@
+import asyncio
 from datetime import date, datetime
 from api.mapper import RowDataMapper
+from api.aggregates import department_totals, department_column_totals, department_limits, table_budget
 from api.schemas import RowUpdateRequest, TableFullDTO
-from fastapi import APIRouter, Depends, HTTPException, Request
-from api.schemas import TableFullDTO, BudgetUpdateRequest
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from api.schemas import TableFullDTO, TablePageDTO, RowDTO, RowPageQuery, BudgetUpdateRequest
+from api.paging import page_rows, row_page_query
+from api.dictionaries import dictionary_cache
+from api.bulk import write_revisions
+from api.records import stream_table_ndjson, table_document
+from api.changes import table_changes
+from api.notifications import change_hub, notify_changes, notify_row_changes, sse_events
+from api.responses import FastJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload, joinedload, with_loader_criteria
 from api.user import get_current_user
 from api.schemas import HEADERS
-from api.excel import generete_excel
-from db.database import get_db, AsyncSessionLocal
+from api.excel import generete_excel, export_executor
+from api.artifacts import artifact_cache, cached_file_response, etag_matches
+from api.versions import table_version, read_etag
+from db.database import get_db, get_read_db, open_read_session, prefers_primary
+from db.deltas import attach_delta_revisions
+from db.revisions import table_tree_options, expose_current_revisions, row_data_options
 from db.models import Tables, DepartmentTables, Rows, RowDatas, Divisions, Chapters, Paragraphs, ExpenseGroups, Tasks, Users
-from fastapi.responses import RedirectResponse, StreamingResponse
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from io import BytesIO
 from typing import List
 from dateutil import parser
 
 router = APIRouter(prefix="/api/tables", tags=["tables"])
 
+async def load_table_tree(
+    db: AsyncSession,
+    table_id: int,
+    page: RowPageQuery,
+    history: bool = False,
+    department_id: int | None = None,
+) -> TablePageDTO | None:
+    options = [table_tree_options(history)]
+    next_cursor = None
+
+    if page.is_paged():
+        rows, next_cursor = await page_rows(db, table_id, page, department_id)
+        row_ids = [row_id for row_id, _ in rows]
+        dept_table_ids = {dept_table_id for _, dept_table_id in rows}
+        options += [
+            with_loader_criteria(DepartmentTables, DepartmentTables.id.in_(dept_table_ids), include_aliases=True),
+            with_loader_criteria(Rows, Rows.id.in_(row_ids), include_aliases=True),
+        ]
+    elif department_id is not None:
+        options.append(
+            with_loader_criteria(
+                DepartmentTables,
+                DepartmentTables.department_id == department_id,
+                include_aliases=True
+            )
+        )
+
+    result = await db.execute(select(Tables).where(Tables.id == table_id).options(*options))
+    table = result.scalars().first()
+    if not table:
+        return None
+
+    if history:
+        await attach_delta_revisions(
+            db, [row for dept_table in table.department_tables for row in dept_table.rows]
+        )
+    else:
+        expose_current_revisions(table)
+    dto = TablePageDTO.model_validate(table)
+    dto.next_cursor = next_cursor
+    return dto
+
+async def load_table_document(
+    db: AsyncSession,
+    table_id: int,
+    page: RowPageQuery,
+    department_id: int | None = None,
+) -> dict | None:
+    table = await db.get(Tables, table_id)
+    if not table:
+        return None
+
+    department_table_ids = row_ids = next_cursor = None
+    if page.is_paged():
+        rows, next_cursor = await page_rows(db, table_id, page, department_id)
+        row_ids = [row_id for row_id, _ in rows]
+        department_table_ids = {dept_table_id for _, dept_table_id in rows}
+
+    document = await table_document(db, table, department_id, department_table_ids, row_ids)
+    document["next_cursor"] = next_cursor
+    return document
+
+async def table_json_response(
+    db: AsyncSession,
+    table_id: int,
+    page: RowPageQuery,
+    history: bool,
+    headers: dict,
+    department_id: int | None = None,
+) -> FastJSONResponse:
+    # bieżące wersje prosto z Core, historia przez drzewo ORM - w obu przypadkach bez ponownej walidacji
+    if history:
+        content = await load_table_tree(db, table_id, page, history, department_id=department_id)
+    else:
+        content = await load_table_document(db, table_id, page, department_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    return FastJSONResponse(content, headers=headers)
+
+def wants_ndjson(request: Request) -> bool:
+    return (
+        request.query_params.get("format") == "ndjson"
+        or "application/x-ndjson" in request.headers.get("accept", "")
+    )
+
+async def read_headers(
+    db: AsyncSession,
+    request: Request,
+    table_id: int,
+    department_id: int | None = None,
+) -> dict:
+    version = await table_version(db, table_id, department_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    return {"ETag": read_etag(version, request), "Cache-Control": "private, no-cache"}
+
+async def ndjson_table_response(
+    table_id: int,
+    page: RowPageQuery,
+    history: bool,
+    department_id: int | None = None,
+    headers: dict | None = None,
+    prefer_primary: bool = False,
+) -> StreamingResponse:
+    if history or page.is_paged():
+        raise HTTPException(status_code=400, detail="Paging and history are not available in NDJSON mode")
+
+    # sesja żyje tak długo jak strumień, zamyka ją stream_table_ndjson
+    db = await open_read_session(prefer_primary)
+    table = await db.get(Tables, table_id)
+    if not table:
+        await db.close()
+        raise HTTPException(status_code=404, detail="Table not found")
+
+    return StreamingResponse(
+        stream_table_ndjson(db, table, department_id),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
 @router.put("/{table_id}/update_budget")
 async def update_table_budget(
     table_id: int,
@@ -33,6 +166,7 @@ async def update_table_budget(
     table.budget = req.budget
 
     db.add(table)
+    await notify_changes(db, "budget", table_id)
     await db.commit()
     await db.refresh(table)
 
@@ -40,186 +174,149 @@ async def update_table_budget(
 
 
 @router.get("/{table_id}/get_total_budget")
-async def get_limits_per_department(table_id: int, db: AsyncSession = Depends(get_db)):
-    query = (
-        select(Tables)
-        .where(Tables.id == table_id)
-        .options(
-            selectinload(Tables.department_tables).options(
-                joinedload(DepartmentTables.department),
-                joinedload(DepartmentTables.status),
-                
-                selectinload(DepartmentTables.rows).options(
-                    selectinload(Rows.row_datas).options(
-                        joinedload(RowDatas.division),
-                        joinedload(RowDatas.chapter),
-                        joinedload(RowDatas.paragraph),
-                        joinedload(RowDatas.expense_group),
-                        joinedload(RowDatas.task_budget_full),
-                        joinedload(RowDatas.task_budget_function),
-                    )
-                )
-            )
-        )
-    )
+async def get_total_budget(table_id: int, db: AsyncSession = Depends(get_read_db)):
+    table = await table_budget(db, table_id)
+    if table is None:
+        raise HTTPException(status_code=404, detail="Table not found")
 
-    result = await db.execute(query)
-    table = result.scalars().first()
-    dto = TableFullDTO.model_validate(table)
-        
-    return dto.budget
+    return table.budget
 
 @router.get("/{table_id}/get_limits_per_department")
 async def get_limits_per_department(
     table_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = (
-        select(Tables)
-        .where(Tables.id == table_id)
-        .options(
-            selectinload(Tables.department_tables).options(
-                joinedload(DepartmentTables.department),
-                joinedload(DepartmentTables.status),
-                selectinload(DepartmentTables.rows).options(
-                    selectinload(Rows.row_datas).options(
-                        joinedload(RowDatas.division),
-                        joinedload(RowDatas.chapter),
-                        joinedload(RowDatas.paragraph),
-                        joinedload(RowDatas.expense_group),
-                        joinedload(RowDatas.task_budget_full),
-                        joinedload(RowDatas.task_budget_function),
-                    )
-                ),
-            )
-        )
-    )
-
-    result = await db.execute(query)
-    table = result.scalars().first()
-    if table is None:
-        return {}
+    return await department_limits(db, table_id)
 
-    dto = TableFullDTO.model_validate(table)
-
-    sums_per_dept: dict[str, float] = {}
-
-    for dept_table in dto.department_tables:
-        dept_key = dept_table.department.type  # z modelu Departments
+@router.get("/{table_id}/get_needs_per_department")
+async def get_needs_per_department(table_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await department_column_totals(db, table_id, "financial_needs_0")
 
-        # 1. Zgrupuj wiersze po row.id i wybierz najnowszy Row po last_update
-        latest_rows_by_id: dict[int, any] = {}
-        for row in dept_table.rows:
-            existing = latest_rows_by_id.get(row.id)
-            if existing is None or row.last_update > existing.last_update:
-                latest_rows_by_id[row.id] = row
+@router.get("/{table_id}/get_totals_per_department")
+async def get_totals_per_department(table_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await department_totals(db, table_id)
 
-        partial_sum = 0.0
+@router.get("/{table_id}/departments/{department_id}", response_model=TablePageDTO, response_class=FastJSONResponse)
+async def get_department_from_table(
+    table_id: int,
+    department_id: int,
+    request: Request,
+    page: RowPageQuery = Depends(row_page_query),
+    history: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    headers = await read_headers(db, request, table_id, department_id)
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if wants_ndjson(request):
+        return await ndjson_table_response(table_id, page, history, department_id, headers, prefers_primary(request))
+
+    return await table_json_response(db, table_id, page, history, headers, department_id)
+
+def department_scope(current_user: Users, department_id: int | None) -> int | None:
+    # użytkownik działu widzi tylko swój dział
+    if current_user.user_type.type == "admin":
+        return department_id
+    if not current_user.department_id:
+        raise HTTPException(status_code=403, detail="User has no assigned department")
+    if department_id not in (None, current_user.department_id):
+        raise HTTPException(status_code=403, detail="Not allowed to read other departments")
+    return current_user.department_id
+
+async def subscribe_changes(table_id: int, department_id: int | None):
+    try:
+        return await change_hub.subscribe(table_id, department_id)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Change notifications unavailable")
+
+@router.get("/{table_id}/events")
+async def get_table_events(
+    table_id: int,
+    department_id: int | None = None,
+    current_user: Users = Depends(get_current_user)
+):
+    """Server-sent events for changes in a table (ready, change, resync)."""
+    subscription = await subscribe_changes(table_id, department_scope(current_user, department_id))
+    return StreamingResponse(
+        sse_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
 
-        # 2. Dla każdego "najnowszego" Row wybierz najnowsze RowDatas
-        for row in latest_rows_by_id.values():
-            if not row.row_datas:
+@router.websocket("/{table_id}/ws")
+async def table_events_websocket(
+    websocket: WebSocket,
+    table_id: int,
+    department_id: int | None = None,
+    current_user: Users = Depends(get_current_user)
+):
+    """The same events as /events, as JSON messages over a WebSocket."""
+    subscription = await subscribe_changes(table_id, department_scope(current_user, department_id))
+    await websocket.accept()
+    receiving = asyncio.ensure_future(websocket.receive())
+    try:
+        await websocket.send_json({"kind": "ready", "table_id": table_id})
+        while True:
+            event = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait({event, receiving}, return_when=asyncio.FIRST_COMPLETED)
+            if receiving in done:
+                event.cancel()
+                if receiving.result()["type"] == "websocket.disconnect":
+                    break
+                receiving = asyncio.ensure_future(websocket.receive())
                 continue
+            await websocket.send_json(event.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiving.cancel()
+        change_hub.unsubscribe(subscription)
+
+@router.get("/{table_id}/changes", response_class=FastJSONResponse)
+async def get_table_changes(
+    table_id: int,
+    since: str | None = None,
+    department_id: int | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Users = Depends(get_current_user)
+):
+    department_id = department_scope(current_user, department_id)
+    content = await table_changes(db, table_id, since, department_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    return FastJSONResponse(content, headers={"Cache-Control": "private, no-store"})
 
-            newest_row_data = max(
-                row.row_datas,
-                key=lambda rd: rd.last_update,
-            )
-
-            value = newest_row_data.expenditure_limit_0 or 0
-            partial_sum += float(value)
-            break
-
-        if dept_key in sums_per_dept:
-            # sums_per_dept[dept_key] += partial_sum
-            pass
-        else:
-            sums_per_dept[dept_key] = partial_sum
-
-    return sums_per_dept
-
-@router.get("/{table_id}/get_needs_per_department")
-async def get_needs_per_department(table_id: int, db: AsyncSession = Depends(get_db)):
-    query = (
-        select(Tables)
-        .where(Tables.id == table_id)
-        .options(
-            selectinload(Tables.department_tables).options(
-                joinedload(DepartmentTables.department),
-                joinedload(DepartmentTables.status),
-                
-                selectinload(DepartmentTables.rows).options(
-                    selectinload(Rows.row_datas).options(
-                        joinedload(RowDatas.division),
-                        joinedload(RowDatas.chapter),
-                        joinedload(RowDatas.paragraph),
-                        joinedload(RowDatas.expense_group),
-                        joinedload(RowDatas.task_budget_full),
-                        joinedload(RowDatas.task_budget_function),
-                    )
-                )
-            )
-        )
-    )
-
-    result = await db.execute(query)
-    table = result.scalars().first()
-    dto = TableFullDTO.model_validate(table)
-
-    sums_per_dept = {}
-    for dept_table in dto.department_tables:
-        id = dept_table.department.type
-        partial = 0
-        for row in dept_table.rows:
-            for row_data in row.row_datas:
-                value = row_data.financial_needs_0 or 0
-                partial += int(value)
-        if id in sums_per_dept:
-            sums_per_dept[id] += partial
-        else:
-            sums_per_dept[id] = partial
-        
-    return sums_per_dept
-
-@router.get("/{table_id}/departments/{department_id}")
-async def get_department_from_table(table_id: int, department_id: int, db: AsyncSession = Depends(get_db)):
-    query = (
-        select(Tables)
-        .where(Tables.id == table_id)
-        .options(
-            with_loader_criteria(
-                DepartmentTables,
-                DepartmentTables.department_id == department_id,
-                include_aliases=True
-            ),
-
-            selectinload(Tables.department_tables).options(
-                joinedload(DepartmentTables.department),
-                joinedload(DepartmentTables.status),
-                selectinload(DepartmentTables.rows).options(
-                    selectinload(Rows.row_datas).options(
-                        joinedload(RowDatas.division),
-                        joinedload(RowDatas.chapter),
-                        joinedload(RowDatas.paragraph),
-                        joinedload(RowDatas.expense_group),
-                        joinedload(RowDatas.task_budget_full),
-                        joinedload(RowDatas.task_budget_function),
-                    )
-                )
-            )
-        )
+@router.get("/{table_id}/rows/{row_id}/history", response_model=RowDTO, response_class=FastJSONResponse)
+async def get_row_history(
+    table_id: int,
+    row_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """Every revision of a single row, newest first (the grid itself loads only current ones)."""
+    result = await db.execute(
+        select(Rows, DepartmentTables.department_id)
+        .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+        .where(Rows.id == row_id, DepartmentTables.table_id == table_id)
+        .options(selectinload(Rows.row_datas).options(*row_data_options()))
     )
+    found = result.first()
+    if found is None:
+        raise HTTPException(status_code=404, detail="Row not found")
+    row, department_id = found
+    department_scope(current_user, department_id)
 
-    result = await db.execute(query)
-    table = result.scalars().first()
-    dto = TableFullDTO.model_validate(table)
-    return dto
+    await attach_delta_revisions(db, [row])
+    dto = RowDTO.model_validate(row)
+    dto.row_datas.sort(key=lambda revision: (revision.last_update, revision.id), reverse=True)
+    return FastJSONResponse(dto, headers={"Cache-Control": "private, no-store"})
 
 @router.get("/{table_id}/departments/{department_id}/endDate")
 async def get_department_end_date(
     table_id: int, 
     department_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> datetime:
     stmt = (
         select(DepartmentTables.end)
@@ -238,21 +335,35 @@ async def get_department_end_date(
     return end_date
 
 @router.get("/{table_id}/generate_spreadsheet")
-async def get_excel(table_id: int):
-    async with AsyncSessionLocal() as db:
-        df = await generete_excel(table_id, db)
-
-    if df is None or df.empty:
-        raise HTTPException(status_code=404, detail="No data to generate Excel")
-
-    stream = BytesIO()
-    df.to_excel(stream, index=False, engine='openpyxl')
-    stream.seek(0)
-    
-    return StreamingResponse(
-        stream,
+async def get_excel(table_id: int, request: Request):
+    async with await open_read_session(prefers_primary(request)) as db:
+        version = await table_version(db, table_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Table not found")
+        key = f"xlsx:{version}"
+        etag = artifact_cache.etag(key)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            "Content-Disposition": f"attachment; filename=table_{table_id}.xlsx",
+        }
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        cached = artifact_cache.get(key)
+        if cached is None:
+            xlsx = await generete_excel(table_id, db)
+            if xlsx is None:
+                raise HTTPException(status_code=404, detail="No data to generate Excel")
+
+            loop = asyncio.get_running_loop()
+            with xlsx:
+                cached = await loop.run_in_executor(export_executor, artifact_cache.put, key, xlsx)
+
+    return cached_file_response(
+        cached,
         media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={"Content-Disposition": f"attachment; filename=table_{table_id}.xlsx"}
+        headers=headers,
     )
     
 
@@ -260,50 +371,32 @@ async def get_excel(table_id: int):
 async def get_table_headers():
     return HEADERS
 
-@router.get("/{table_id}", response_model=TableFullDTO)
+@router.get("/{table_id}", response_model=TablePageDTO, response_class=FastJSONResponse)
 async def get_table_hierarchy(
     table_id: int, 
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    page: RowPageQuery = Depends(row_page_query),
+    history: bool = False,
+    db: AsyncSession = Depends(get_read_db),
     current_user: Users = Depends(get_current_user)
 ):
     if current_user.user_type.type != "admin":
         if not current_user.department_id:
             raise HTTPException(status_code=403, detail="User has no assigned department")
         
-        return RedirectResponse(
-            url=f"/api/tables/{table_id}/departments/{current_user.department_id}", 
-            status_code=307
-        )
+        url = f"/api/tables/{table_id}/departments/{current_user.department_id}"
+        if request.url.query:
+            url += f"?{request.url.query}"
+        return RedirectResponse(url=url, status_code=307)
 
-    query = (
-        select(Tables)
-        .where(Tables.id == table_id)
-        .options(
-            selectinload(Tables.department_tables).options(
-                joinedload(DepartmentTables.department),
-                joinedload(DepartmentTables.status),
-                
-                selectinload(DepartmentTables.rows).options(
-                    selectinload(Rows.row_datas).options(
-                        joinedload(RowDatas.division),
-                        joinedload(RowDatas.chapter),
-                        joinedload(RowDatas.paragraph),
-                        joinedload(RowDatas.expense_group),
-                        joinedload(RowDatas.task_budget_full),
-                        joinedload(RowDatas.task_budget_function),
-                    )
-                )
-            )
-        )
-    )
+    headers = await read_headers(db, request, table_id)
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    result = await db.execute(query)
-    table = result.scalars().first()
+    if wants_ndjson(request):
+        return await ndjson_table_response(table_id, page, history, headers=headers, prefer_primary=prefers_primary(request))
 
-    if not table:
-        raise HTTPException(status_code=404, detail="Table not found")
-
-    return table
+    return await table_json_response(db, table_id, page, history, headers)
 
 
 from sqlalchemy import select, and_
@@ -339,32 +432,25 @@ async def batch_update_rows(
 
         pending_rows.append((item, mapped_data))
 
-    div_map = {}
-    if div_values:
-        res = await db.execute(select(Divisions).where(Divisions.value.in_(div_values)))
-        div_map = {row.value: row.id for row in res.scalars()}
-
-    chap_map = {}
-    if chap_values:
-        res = await db.execute(select(Chapters).where(Chapters.value.in_(chap_values)))
-        chap_map = {row.value: row.id for row in res.scalars()}
-
-    par_map = {}
-    if par_values:
-        res = await db.execute(select(Paragraphs).where(Paragraphs.value.in_(par_values)))
-        par_map = {row.value: row.id for row in res.scalars()}
-
-    exp_map = {}
-    if exp_values:
-        res = await db.execute(select(ExpenseGroups).where(ExpenseGroups.definition.in_(exp_values)))
-        exp_map = {row.definition: row.id for row in res.scalars()}
-
-    task_map = {}
-    if task_values:
-        res = await db.execute(select(Tasks).where(Tasks.value.in_(task_values)))
-        task_map = {row.value: row.id for row in res.scalars()}
-
-    processed_ids = []
+    # słowniki z pamięci; przy nieznanej wartości przeładowanie (najwyżej raz na
+    # DICTIONARY_FORCE_RELOAD_SECONDS), a jeśli wartości dalej brak - 400
+    dicts = await dictionary_cache.get(db)
+    if not (
+        div_values <= dicts.division_ids.keys()
+        and chap_values <= dicts.chapter_ids.keys()
+        and par_values <= dicts.paragraph_ids.keys()
+        and exp_values <= dicts.expense_group_ids.keys()
+        and task_values <= dicts.task_ids.keys()
+    ):
+        dicts = await dictionary_cache.get(db, force=True)
+
+    div_map = dicts.division_ids
+    chap_map = dicts.chapter_ids
+    par_map = dicts.paragraph_ids
+    exp_map = dicts.expense_group_ids
+    task_map = dicts.task_ids
+
+    revisions = []
     
     for item, mapped_data in pending_rows:
         
@@ -386,36 +472,12 @@ async def batch_update_rows(
         mapped_data["expense_group_id"] = get_id("expense_group_value", exp_map, "Expense Group")
         mapped_data["task_budget_full_id"] = get_id("task_budget_full_value", task_map, "Task Full")
         mapped_data["task_budget_function_id"] = get_id("task_budget_function_value", task_map, "Task Function")
-
-        if item.rowId is None:
-            new_row = Rows(
-                department_table_id=item.departmentTableId,
-                last_update=now,
-                next_year=False 
-            )
-            db.add(new_row)
-            await db.flush()
-            target_row_id = new_row.id
-        else:
-            target_row_id = item.rowId
-            stmt = select(Rows).where(Rows.id == target_row_id)
-            result = await db.execute(stmt)
-            existing_row = result.scalar_one_or_none()
-            if not existing_row:
-                raise HTTPException(status_code=404, detail=f"Row {target_row_id} not found")
-            existing_row.last_update = now
-
-        mapped_data["row_id"] = target_row_id
         mapped_data["last_user_id"] = item.lastUserId
-        mapped_data["last_update"] = now
 
-        valid_columns = RowDatas.__table__.columns.keys()
-        filtered_data = {k: v for k, v in mapped_data.items() if k in valid_columns}
-        
-        db.add(RowDatas(**filtered_data))
-        processed_ids.append(target_row_id)
+        revisions.append((item.rowId, item.departmentTableId, mapped_data))
+
+    processed_ids = await write_revisions(db, revisions, now)
+    await notify_row_changes(db, processed_ids)
 
     await db.commit()
     return {"status": "success", "processed_row_ids": processed_ids}
-
-
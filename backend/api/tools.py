@@ -6,24 +6,45 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload, joinedload, with_loader_criteria
 from api.user import get_current_user
 from api.schemas import HEADERS
-from api.excel import generete_excel
+from api.excel import generete_excel, export_executor
 from db.database import get_db, AsyncSessionLocal
 from db.models import Tables, DepartmentTables, Rows, RowDatas, Divisions, Chapters, Paragraphs, ExpenseGroups, Users
-from fastapi.responses import RedirectResponse, StreamingResponse
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from io import BytesIO
 from typing import Dict
 from api.pdf import create_docx
+from api.artifacts import artifact_cache, cached_file_response, etag_matches
+import asyncio
+import json
 
 
 router = APIRouter(prefix="/api/tools", tags=["tools"])
 
-@router.post("/get_docx")
-async def get_docx(payload: Dict):
+def render_docx(key: str, payload: Dict):
+    # w puli eksportu - renderowanie i zapis nie blokują pętli zdarzeń
     docx = create_docx(payload['data'], payload['comment'], payload['date'])
-    return Response(
-        content=docx,
+    return artifact_cache.put_bytes(key, docx)
+
+@router.post("/get_docx")
+async def get_docx(payload: Dict, request: Request):
+    # raport zależy tylko od treści zapytania - klucz to jej skrót
+    key = "docx:" + json.dumps(payload, sort_keys=True, default=str)
+    etag = artifact_cache.etag(key)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": 'attachment; filename="raport.docx"'
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = artifact_cache.get(key)
+    if cached is None:
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(export_executor, render_docx, key, payload)
+
+    return cached_file_response(
+        cached,
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={
-            "Content-Disposition": 'attachment; filename="raport.docx"'
-        }
+        headers=headers
     )
@@ -13,11 +13,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload,joinedload
 from sqlalchemy.exc import IntegrityError
-from passlib.hash import argon2
 
 # Adjust these imports to point to your actual file location
-from db.database import get_db
+from db.database import get_db, get_read_db
 from db.models import Users, Authentication, Departments, UserTypes
+from api.passwords import hash_password, verify_password, needs_rehash, rehash_password
+from api.principals import Principal, principal_cache
+from api.notifications import notify_principal
 
 SECRET_KEY = os.getenv("JWT_SECRET", "jakis-ciag-znakow")
 ALGORITHM = "HS256"
@@ -25,12 +27,6 @@ ACCESS_TOKEN_EXPIRE_MIN = int(os.getenv("ACCESS_TOKEN_EXPIRE_MIN", "60"))
 COOKIE_NAME = "access_token" 
 
 # --- UTILS ---
-def hash_password(password: str) -> str:
-    return argon2.hash(password)
-
-def verify_password(password: str, password_hash: str) -> bool:
-    return argon2.verify(password, password_hash)
-
 def validate_password(password: str) -> str | None:
     if len(password) < 8:
         return "Hasło musi mieć min. 8 znaków"
@@ -60,6 +56,7 @@ def create_access_token(user_id: int, user_data: dict | None = None, expires_min
     
     payload ={
         "sub": str(user_id), 
+        "iat": int(now.timestamp()),
         "exp": int(exp.timestamp()),
         **(user_data or {})
     }
@@ -148,7 +145,7 @@ async def make_new_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
 
     try:
         # 5. Create auth record
-        new_password_hash = hash_password(user.password)
+        new_password_hash = await hash_password(user.password)
         new_auth = Authentication(password=new_password_hash)
         db.add(new_auth)
 
@@ -221,11 +218,15 @@ async def change_details(
     db_user.surname = surname_clean
 
     try:
+        # pozostałe workery unieważnią swój cache po commicie
+        await notify_principal(db, db_user.id)
         await db.commit()
         await db.refresh(db_user)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=500, detail="Błąd zapisu danych")
+
+    principal_cache.invalidate_user(db_user.id)
     
     return {
         "ok": True,
@@ -239,7 +240,7 @@ async def change_details(
 
 
 @router.get("/all-users", response_model=list[UserRead])
-async def get_all_users(db: AsyncSession = Depends(get_db)):
+async def get_all_users(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(
         select(Users).options(
             selectinload(Users.department),
@@ -284,8 +285,12 @@ async def login_user(user: UserValidate, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Nieprawidłowy login lub hasło.")
     
     # Verify password
-    if not verify_password(user.password, db_user.auth.password):
+    if not await verify_password(user.password, db_user.auth.password):
          raise HTTPException(status_code=401, detail="Nieprawidłowy login lub hasło.")
+
+    if needs_rehash(db_user.auth.password):
+        db_user.auth.password = await rehash_password(user.password)
+        await db.commit()
      
     # Helper variables
     user_role = db_user.user_type.type if db_user.user_type else "unknown"
@@ -389,11 +394,20 @@ async def get_current_user(
     except jwt.InvalidTokenError:
         raise credentials_exception
 
-    # 3. Fetch User from DB
+    user_id = int(user_id_str)
+    issued_at = int(payload.get("iat", 0))
+
+    # 3. Cached principal - no DB round trip for a token seen recently
+    principal = principal_cache.get(user_id, issued_at)
+    if principal is not None:
+        return principal
+
+    # 4. Fetch User from DB
     # We load 'user_type' because the redirection logic needs to check if they are admin
+    generation = principal_cache.generation(user_id)
     query = (
         select(Users)
-        .where(Users.id == int(user_id_str))
+        .where(Users.id == user_id)
         .options(joinedload(Users.user_type)) 
     )
     result = await db.execute(query)
@@ -401,5 +415,7 @@ async def get_current_user(
 
     if not user:
         raise credentials_exception
-        
-    return user
\ No newline at end of file
+
+    principal = Principal.from_user(user)
+    principal_cache.put(user_id, issued_at, principal, generation)
+    return principal
@@ -0,0 +1,49 @@
+import hashlib
+
+from fastapi import Request
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import DepartmentTables, Rows, Tables
+
+
+async def table_version(db: AsyncSession, table_id: int, department_id: int | None = None) -> str | None:
+    """Cheap data version of a table (or one department of it), None if the table is missing.
+
+    One grouped query over the table header and its rows: changes whenever
+    the budget is edited, a row is added, a new revision is saved (current
+    revision id watermark) or a row is touched (last_update).
+    """
+    dept_filter = DepartmentTables.table_id == Tables.id
+    if department_id is not None:
+        dept_filter = and_(dept_filter, DepartmentTables.department_id == department_id)
+
+    stmt = (
+        select(
+            Tables.budget,
+            Tables.isOpen,
+            Tables.version,
+            func.count(Rows.id),
+            func.max(Rows.current_row_data_id),
+            func.max(Rows.last_update),
+        )
+        .select_from(Tables)
+        .outerjoin(DepartmentTables, dept_filter)
+        .outerjoin(Rows, Rows.department_table_id == DepartmentTables.id)
+        .where(Tables.id == table_id)
+        .group_by(Tables.id)
+    )
+
+    result = (await db.execute(stmt)).one_or_none()
+    if result is None:
+        return None
+
+    budget, is_open, version, count, watermark, last_update = result
+    stamp = int(last_update.timestamp() * 1_000_000) if last_update else 0
+    return f"{table_id}-{department_id or 0}-{count}-{watermark or 0}-{stamp}-{budget}-{int(is_open)}-{version}"
+
+
+def read_etag(version: str, request: Request) -> str:
+    # ten sam stan danych, ale inna strona / historia / format to inna odpowiedź
+    variant = f"{version}|{request.url.query}|{request.headers.get('accept', '')}"
+    return '"' + hashlib.sha256(variant.encode()).hexdigest()[:32] + '"'
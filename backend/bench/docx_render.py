@@ -0,0 +1,72 @@
+"""Render time of /api/tools/get_docx reports per 1000 rows.
+
+    cd backend && python -m bench.docx_render --rows 1000 5000 --repeat 5
+"""
+import argparse
+import json
+import time
+from io import BytesIO
+
+from docx import Document
+
+from api.pdf import create_docx
+
+HEADERS = ["Dział", "Rozdział", "Paragraf", "Zadanie", "Opis", "Kwota"]
+
+
+def sample(rows: int) -> dict:
+    return {
+        "headers": HEADERS,
+        "rows": [
+            ["750", "75001", "4010", f"Zadanie {i}", "wydatki bieżące jednostek budżetowych", f"{i * 10}.00"]
+            for i in range(rows)
+        ],
+    }
+
+
+def per_cell_docx(data, comment, date):
+    # poprzednia implementacja (cell.text na każdą komórkę) - punkt odniesienia
+    doc = Document()
+    doc.add_paragraph(f'Proszę edytować do: {date}')
+    table = doc.add_table(rows=1, cols=len(data['headers']))
+    table.style = "Table Grid"
+    hdr_cells = table.rows[0].cells
+    for i, heading in enumerate(data['headers']):
+        hdr_cells[i].text = heading
+        hdr_cells[i].paragraphs[0].runs[0].bold = True
+    for row in data["rows"]:
+        cells = table.add_row().cells
+        for i, value in enumerate(row):
+            cells[i].text = str(value)
+    doc.add_paragraph(comment)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(render, data, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(data, "komentarz", "2026-01-01")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-per-cell", action="store_true")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        data = sample(rows)
+        result = {"rows": rows, "bulk_ms_per_1000": measure(create_docx, data, args.repeat) * 1000 * 1000 / rows}
+        if not args.skip_per_cell:
+            result["per_cell_ms_per_1000"] = measure(per_cell_docx, data, args.repeat) * 1000 * 1000 / rows
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Per-endpoint benchmark: latency, peak RSS, SQL statement count and N+1 patterns.
+
+Runs the app in-process against DATABASE_URL (load data with bench.synthetic
+first) and writes a machine-readable result that later runs compare against:
+
+    cd backend && python -m bench.endpoints --save bench/baseline.json
+    cd backend && python -m bench.endpoints --compare bench/baseline.json
+
+Write endpoints (batch-update, update_budget, register, ...) modify data and
+only run with --writes. Exit code 1 when --compare finds a regression: more
+statements than the baseline, a new N+1 pattern or a p50 slowdown.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import count
+from time import perf_counter
+from typing import Callable
+
+# artefakty (xlsx/docx) do świeżego katalogu - pierwszy pomiar to zawsze zimny cache
+os.environ.setdefault("EXPORT_CACHE_DIR", tempfile.mkdtemp(prefix="bench-artifacts-"))
+os.environ["DB_SEED"] = "0"
+os.environ["DB_RESET"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from api.mapper import RowDataMapper  # noqa: E402
+from api.query_watch import watching  # noqa: E402
+from db.database import engine  # noqa: E402
+from main import app  # noqa: E402
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    body: Callable[[dict], object] | None = None
+    write: bool = False
+    params: dict = field(default_factory=dict)
+
+
+_serial = count()
+
+ENDPOINTS = [
+    Endpoint("health", "GET", "/api/health"),
+    Endpoint("user.login", "POST", "/api/user/login", lambda ctx: {"username": ctx["username"], "password": ctx["password"]}),
+    Endpoint("user.is_login", "GET", "/api/user/is_login"),
+    Endpoint("user.all_users", "GET", "/api/user/all-users"),
+    Endpoint("tables.headers", "GET", "/api/tables/headers"),
+    Endpoint("tables.hierarchy", "GET", "/api/tables/{table_id}"),
+    Endpoint("tables.hierarchy_page", "GET", "/api/tables/{table_id}", params={"limit": 100}),
+    Endpoint("tables.hierarchy_history", "GET", "/api/tables/{table_id}", params={"history": "true"}),
+    Endpoint("tables.hierarchy_ndjson", "GET", "/api/tables/{table_id}", params={"format": "ndjson"}),
+    Endpoint("tables.department", "GET", "/api/tables/{table_id}/departments/{department_id}"),
+    Endpoint("tables.department_end_date", "GET", "/api/tables/{table_id}/departments/{department_id}/endDate"),
+    Endpoint("tables.total_budget", "GET", "/api/tables/{table_id}/get_total_budget"),
+    Endpoint("tables.limits_per_department", "GET", "/api/tables/{table_id}/get_limits_per_department"),
+    Endpoint("tables.needs_per_department", "GET", "/api/tables/{table_id}/get_needs_per_department"),
+    Endpoint("tables.totals_per_department", "GET", "/api/tables/{table_id}/get_totals_per_department"),
+    Endpoint("tables.spreadsheet", "GET", "/api/tables/{table_id}/generate_spreadsheet"),
+    Endpoint("divisions.list", "GET", "/api/divisions/"),
+    Endpoint("divisions.chapters", "GET", "/api/divisions/{division}/chapters"),
+    Endpoint("chapters.paragraphs", "GET", "/api/chapters/{chapter}/paragraphs"),
+    Endpoint("departments.all", "GET", "/api/departments/get_all_departments"),
+    Endpoint("departments.dates", "GET", "/api/departments/get_department_dates"),
+    Endpoint("departments.limits_dry_run", "PUT", "/api/departments/update_expenditure_limits",
+             lambda ctx: {"tableId": ctx["table_id"], "updates": [[ctx["department"], 1000]], "dryRun": True}),
+    Endpoint("tools.docx", "POST", "/api/tools/get_docx", lambda ctx: ctx["docx"]),
+    Endpoint("tables.batch_update", "POST", "/api/tables/batch-update", lambda ctx: ctx["batch"], write=True),
+    Endpoint("tables.update_budget", "PUT", "/api/tables/{table_id}/update_budget",
+             lambda ctx: {"budget": ctx["budget"]}, write=True),
+    Endpoint("departments.limits", "PUT", "/api/departments/update_expenditure_limits",
+             lambda ctx: {"tableId": ctx["table_id"], "updates": [[ctx["department"], 1000]]}, write=True),
+    Endpoint("user.change_details", "POST", "/api/user/change-details",
+             lambda ctx: {"name": "Bench", "surname": "User"}, write=True),
+    Endpoint("user.register", "POST", "/api/user/register", lambda ctx: {
+        "username": f"bench_register_{os.getpid()}_{next(_serial)}", "name": "Bench", "surname": "User",
+        "password": "Bench-register-1!", "department": ctx["department"], "user_type": "user",
+    }, write=True),
+]
+
+
+def reset_peak_rss():
+    # Linux: "5" w clear_refs zeruje VmHWM (szczytowe RSS) procesu
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def dataset(table_id: int | None) -> dict:
+    async with engine.connect() as conn:
+        if table_id is None:
+            table_id = (await conn.execute(text("SELECT max(id) FROM tables"))).scalar()
+        department_id, department = (await conn.execute(text("""
+            SELECT d.id, d.type FROM department_tables dt JOIN departments d ON d.id = dt.department_id
+            WHERE dt.table_id = :t ORDER BY dt.id LIMIT 1
+        """), {"t": table_id})).one()
+        division, chapter = (await conn.execute(text("""
+            SELECT d.value, c.value FROM chapters c JOIN divisions d ON d.id = c.division_id
+            JOIN paragraphs p ON p.chapter_id = c.id ORDER BY c.id LIMIT 1
+        """))).one()
+        budget = (await conn.execute(text("SELECT budget FROM tables WHERE id = :t"), {"t": table_id})).scalar()
+        sizes = (await conn.execute(text("""
+            SELECT count(DISTINCT dt.id), count(DISTINCT r.id), count(rd.id)
+            FROM department_tables dt JOIN rows r ON r.department_table_id = dt.id
+            JOIN row_datas rd ON rd.row_id = r.id WHERE dt.table_id = :t
+        """), {"t": table_id})).one()
+        deltas = (await conn.execute(text("""
+            SELECT count(*) FROM department_tables dt JOIN rows r ON r.department_table_id = dt.id
+            JOIN row_data_deltas d ON d.row_id = r.id WHERE dt.table_id = :t
+        """), {"t": table_id})).scalar()
+    return {
+        "table_id": table_id,
+        "department_id": department_id,
+        "department": department,
+        "division": division,
+        "chapter": chapter,
+        "budget": str(budget),
+        "sizes": {"department_tables": sizes[0], "rows": sizes[1], "row_datas": sizes[2], "row_data_deltas": deltas},
+    }
+
+
+def row_values(data: dict) -> list:
+    # wartości w kolejności RowDataMapper.VALUE_FIELD_MAP, słowniki po wartości
+    values = [""] * len(RowDataMapper.VALUE_FIELD_MAP)
+    for field_name, index in RowDataMapper.VALUE_FIELD_MAP.items():
+        value = data.get(field_name.removesuffix("_value"))
+        if isinstance(value, dict):
+            value = value.get("value", value.get("definition"))
+        values[index] = "" if value is None else str(value)
+    return values
+
+
+def batch_payload(client: TestClient, ctx: dict, size: int) -> list:
+    department = client.get(f"/api/tables/{ctx['table_id']}/departments/{ctx['department_id']}").json()
+    updates = []
+    for department_table in department["department_tables"]:
+        for row in department_table["rows"][:size - len(updates)]:
+            data = row["row_datas"][0]
+            updates.append({
+                "tableId": ctx["table_id"],
+                "departmentTableId": department_table["id"],
+                "rowId": row["id"],
+                "values": row_values(data),
+                "lastUserId": data["last_user_id"],
+                "lastUpdate": data["last_update"],
+            })
+    return updates
+
+
+def run(args) -> dict:
+    results = {}
+    with TestClient(app) as client:
+        ctx = client.portal.call(dataset, args.table)
+        ctx.update(username=args.username, password=args.password)
+        login = client.post("/api/user/login", json={"username": args.username, "password": args.password})
+        if login.status_code != 200:
+            sys.exit(f"login as {args.username} failed ({login.status_code}): load data with python -m bench.synthetic")
+
+        ctx["docx"] = {
+            "data": {"headers": ["Dział", "Rozdział", "Paragraf", "Opis"],
+                     "rows": [[ctx["division"], ctx["chapter"], "4010", f"pozycja {i}"] for i in range(args.docx_rows)]},
+            "comment": "benchmark", "date": "2026-01-01",
+        }
+        if args.writes:
+            ctx["batch"] = batch_payload(client, ctx, args.batch_size)
+
+        for endpoint in ENDPOINTS:
+            if endpoint.write and not args.writes:
+                continue
+            if args.only and not any(endpoint.name.startswith(prefix) for prefix in args.only):
+                continue
+
+            path = endpoint.path.format(**ctx)
+            latencies, sizes, counts, n_plus_one = [], [], [], set()
+            reset_peak_rss()
+            rss_before = peak_rss_mb()
+            status = None
+            for _ in range(args.repeat + 1):
+                body = endpoint.body(ctx) if endpoint.body else None
+                with watching() as watch:
+                    started = perf_counter()
+                    response = client.request(endpoint.method, path, json=body, params=endpoint.params)
+                    latencies.append((perf_counter() - started) * 1000)
+                sizes.append(len(response.content))
+                counts.append(watch.count)
+                n_plus_one.update(g.sql for g in watch.n_plus_one())
+                status = response.status_code
+            if endpoint.name == "user.login":
+                client.cookies.update(response.cookies)
+
+            steady = latencies[1:]
+            results[endpoint.name] = {
+                "method": endpoint.method,
+                "path": endpoint.path,
+                "status": status,
+                "first_ms": round(latencies[0], 2),
+                "p50_ms": round(statistics.median(steady), 2),
+                "p95_ms": round(percentile(steady, 0.95), 2),
+                "mean_ms": round(statistics.fmean(steady), 2),
+                "statements": max(counts[1:]),
+                "n_plus_one": sorted(n_plus_one),
+                "bytes": sizes[-1],
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+            }
+            print(f"{endpoint.name:32} {status} p50 {results[endpoint.name]['p50_ms']:9.2f} ms  "
+                  f"sql {results[endpoint.name]['statements']:4}  rss {results[endpoint.name]['rss_growth_mb']:+.1f} MB"
+                  + ("  N+1" if n_plus_one else ""))
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "dataset": ctx["sizes"],
+        },
+        "endpoints": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_ms: float) -> list[str]:
+    regressions = []
+    if current["meta"]["dataset"] != baseline["meta"]["dataset"]:
+        print(f"warning: dataset differs from baseline ({current['meta']['dataset']} vs {baseline['meta']['dataset']})")
+
+    print(f"\n{'endpoint':32} {'p50 base':>10} {'p50 now':>10} {'sql base':>9} {'sql now':>8}")
+    for name, now in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if base is None:
+            continue
+        print(f"{name:32} {base['p50_ms']:10.2f} {now['p50_ms']:10.2f} {base['statements']:9} {now['statements']:8}")
+        if now["statements"] > base["statements"]:
+            regressions.append(f"{name}: SQL statements {base['statements']} -> {now['statements']}")
+        for sql in set(now.get("n_plus_one", [])) - set(base.get("n_plus_one", [])):
+            regressions.append(f"{name}: N+1 {sql[:160]}")
+        if now["p50_ms"] > base["p50_ms"] * (1 + tolerance) and now["p50_ms"] - base["p50_ms"] > min_ms:
+            regressions.append(f"{name}: p50 {base['p50_ms']} ms -> {now['p50_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", type=int, default=None, help="table id (default: newest)")
+    parser.add_argument("--username", default="bench_admin")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--writes", action="store_true", help="include endpoints that modify data")
+    parser.add_argument("--batch-size", type=int, default=50, help="rows per batch-update")
+    parser.add_argument("--docx-rows", type=int, default=1000)
+    parser.add_argument("--only", nargs="*", help="endpoint name prefixes")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative p50 slowdown")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance, args.min_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
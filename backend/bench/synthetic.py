@@ -0,0 +1,250 @@
+"""Synthetic data set for benchmarks, bulk loaded with COPY.
+
+    cd backend && python -m bench.synthetic --reset --departments 20 --rows 500 --revisions 3
+
+Sizes: departments x rows per department x revisions per row, plus the
+dictionaries (divisions x chapters x paragraphs, tasks, expense groups).
+Everything is appended after existing ids; --reset drops the schema and
+migrates it first. Older revisions are then stored as deltas, as the
+application would (db.deltas). Users: bench_admin and bench_user_<department id>,
+password --password (default "bench").
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from time import perf_counter
+
+from passlib.hash import argon2
+
+from db.database import engine, migration_engine
+from db.deltas import encode_history
+from db.migrations import migrate, reset_schema
+from db.models import RowDatas
+
+YEARS = range(4)
+ZERO = Decimal("0.00")
+
+
+async def next_id(pg, table: str) -> int:
+    return await pg.fetchval(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")
+
+
+async def get_or_create(pg, table: str, column: str, value: str) -> int:
+    found = await pg.fetchval(f"SELECT id FROM {table} WHERE {column} = $1 ORDER BY id LIMIT 1", value)
+    if found is not None:
+        return found
+    return await pg.fetchval(f"INSERT INTO {table} ({column}) VALUES ($1) RETURNING id", value)
+
+
+async def copy(pg, table: str, columns: list[str], records: list[tuple]):
+    if records:
+        await pg.copy_records_to_table(table, records=records, columns=columns)
+
+
+def row_data_record(rnd: random.Random, dictionaries: dict, row_id: int, user_id: int) -> dict:
+    """Fields shared by every revision of a row; amounts come from revision_amounts()."""
+    division_id, chapter_id, paragraph_id, expense_group_id = rnd.choice(dictionaries["paragraphs"])
+    data = {
+        "row_id": row_id,
+        "last_user_id": user_id,
+        "budget_part": str(rnd.randrange(1, 10)),
+        "division_id": division_id,
+        "chapter_id": chapter_id,
+        "paragraph_id": paragraph_id,
+        "funding_source": str(rnd.randrange(10)),
+        "expense_group_id": expense_group_id,
+        "task_budget_full_id": rnd.choice(dictionaries["actions"]),
+        "task_budget_function_id": rnd.choice(dictionaries["tasks"]),
+        "program_project_name": f"Program {rnd.randrange(1, 500)}",
+        "organizational_unit_name": f"Jednostka {rnd.randrange(1, 50)}",
+        "plan_wi": "WI",
+        "fund_distributor": "Dysponent",
+        "budget_code": str(rnd.randrange(10, 100)),
+        "task_name": f"Zadanie {row_id}",
+        "task_justification": "Uzasadnienie zadania " * rnd.randrange(1, 6),
+        "expenditure_purpose": "Cel wydatku",
+        "subsidy_agreement_party": None,
+        "legal_basis_for_subsidy": None,
+        "notes": rnd.choice([None, "uwagi"]),
+        "additionals": None,
+    }
+    for year in YEARS:
+        data[f"unallocated_task_funds_{year}"] = ZERO
+        data[f"contract_number_{year}"] = f"UM/{year}/{row_id}"
+    return data
+
+
+def revision_amounts(rnd: random.Random, data: dict):
+    for year in YEARS:
+        needs = rnd.randrange(1_000, 1_000_000)
+        data[f"financial_needs_{year}"] = Decimal(needs).scaleb(-2)
+        data[f"expenditure_limit_{year}"] = Decimal(needs * rnd.randrange(50, 101) // 100).scaleb(-2)
+        data[f"contract_amount_{year}"] = Decimal(needs // 2).scaleb(-2)
+
+
+async def generate(args) -> dict:
+    rnd = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    counts = {}
+
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection
+
+        async with pg.transaction():
+            status_id = await get_or_create(pg, "statuses", "value", "Active")
+            admin_type = await get_or_create(pg, "user_types", "type", "admin")
+            user_type = await get_or_create(pg, "user_types", "type", "user")
+
+            # słowniki - wartości wyprowadzone z id, więc unikalne także przy dopisywaniu
+            division_id, chapter_id, paragraph_id = (
+                await next_id(pg, "divisions"), await next_id(pg, "chapters"), await next_id(pg, "paragraphs")
+            )
+            group_id, task_id = await next_id(pg, "expense_groups"), await next_id(pg, "tasks")
+
+            groups = [(group_id + i, f"grupa wydatków {group_id + i}") for i in range(args.expense_groups)]
+            divisions, chapters, paragraphs, paragraph_keys = [], [], [], []
+            for _ in range(args.divisions):
+                divisions.append((division_id, f"{division_id:03d}"))
+                for c in range(args.chapters):
+                    chapters.append((chapter_id, division_id, f"{division_id:03d}{c:02d}"))
+                    for p in range(args.paragraphs):
+                        group = groups[(chapter_id + p) % len(groups)][0]
+                        paragraphs.append((paragraph_id, chapter_id, group, f"{4000 + p * 10}"))
+                        paragraph_keys.append((division_id, chapter_id, paragraph_id, group))
+                        paragraph_id += 1
+                    chapter_id += 1
+                division_id += 1
+
+            tasks = []
+            for i in range(args.tasks):
+                tid = task_id + i
+                kind = "task" if i % 2 == 0 else "action"
+                tasks.append((tid, f"{tid // 100:02d}.{tid % 100:02d}", kind, f"Opis zadania {tid}"))
+
+            await copy(pg, "expense_groups", ["id", "definition"], groups)
+            await copy(pg, "divisions", ["id", "value"], divisions)
+            await copy(pg, "chapters", ["id", "division_id", "value"], chapters)
+            await copy(pg, "paragraphs", ["id", "chapter_id", "expense_group_id", "value"], paragraphs)
+            await copy(pg, "tasks", ["id", "value", "type", "description"], tasks)
+
+            dictionaries = {
+                "paragraphs": paragraph_keys,
+                "tasks": [t[0] for t in tasks if t[2] == "task"] or [t[0] for t in tasks],
+                "actions": [t[0] for t in tasks if t[2] == "action"] or [t[0] for t in tasks],
+            }
+
+            # działy, użytkownicy (jedno hasło dla wszystkich - argon2 liczony raz)
+            password = argon2.hash(args.password)
+            department_id, auth_id, user_id = (
+                await next_id(pg, "departments"), await pg.fetchval("SELECT coalesce(max(user_id), 0) + 1 FROM authentication"),
+                await next_id(pg, "users"),
+            )
+            departments = [(department_id + i, f"Departament {department_id + i:03d}") for i in range(args.departments)]
+            auths, users = [], []
+            has_admin = await pg.fetchval("SELECT 1 FROM users WHERE user_name = 'bench_admin'")
+            people = [] if has_admin else [("bench_admin", departments[0][0], admin_type)]
+            people += [(f"bench_user_{dep_id}", dep_id, user_type) for dep_id, _ in departments]
+            for i, (user_name, dep_id, type_id) in enumerate(people):
+                auths.append((auth_id + i, password))
+                users.append((user_id + i, auth_id + i, user_name, "Bench", "User", dep_id, type_id))
+            user_by_department = {u[5]: u[0] for u in users}
+
+            await copy(pg, "departments", ["id", "type"], departments)
+            await copy(pg, "authentication", ["user_id", "password"], auths)
+            await copy(pg, "users", ["id", "auth_id", "user_name", "name", "surname", "department_id", "user_type_id"], users)
+
+            table_id = await pg.fetchval(
+                'INSERT INTO tables (year, version, "isOpen", budget) VALUES ($1, $2, true, $3) RETURNING id',
+                now.year, f"bench-{args.seed}", Decimal(10) ** 9,
+            )
+            dept_table_id = await next_id(pg, "department_tables")
+            dept_tables = [
+                (dept_table_id + i, table_id, dep_id, status_id, now, now + timedelta(days=365))
+                for i, (dep_id, _) in enumerate(departments)
+            ]
+            await copy(pg, "department_tables", ["id", "table_id", "department_id", "status_id", "start", "end"], dept_tables)
+
+            # wiersze i ich wersje - wskaźnik na bieżącą wersję ustawiany na końcu
+            row_id, revision_id = await next_id(pg, "rows"), await next_id(pg, "row_datas")
+            columns = [c.name for c in RowDatas.__table__.columns]
+            rows, revisions = [], []
+            for dt_id, _, dep_id, *_ in dept_tables:
+                for _ in range(args.rows):
+                    rows.append((row_id, dt_id, now, False))
+                    data = row_data_record(rnd, dictionaries, row_id, user_by_department[dep_id])
+                    for r in range(args.revisions):
+                        revision_amounts(rnd, data)
+                        data["id"] = revision_id
+                        data["last_update"] = now - timedelta(days=args.revisions - r)
+                        revisions.append(tuple(data[c] for c in columns))
+                        revision_id += 1
+                    row_id += 1
+
+            await copy(pg, "rows", ["id", "department_table_id", "last_update", "next_year"], rows)
+            await copy(pg, "row_datas", columns, revisions)
+            await pg.execute("""
+                UPDATE rows r SET current_row_data_id = latest.id
+                FROM (
+                    SELECT DISTINCT ON (row_id) row_id, id FROM row_datas
+                    ORDER BY row_id, last_update DESC, id DESC
+                ) latest
+                WHERE latest.row_id = r.id AND r.current_row_data_id IS NULL
+            """)
+
+            for table in ["statuses", "user_types", "expense_groups", "divisions", "chapters", "paragraphs",
+                          "tasks", "departments", "users", "tables", "department_tables", "rows", "row_datas"]:
+                await pg.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+            await pg.execute(
+                "SELECT setval(pg_get_serial_sequence('authentication', 'user_id'), (SELECT max(user_id) FROM authentication))"
+            )
+
+        await pg.execute("ANALYZE")
+        await conn.close()
+
+    counts.update({
+        "table_id": table_id,
+        "departments": len(departments),
+        "rows": len(rows),
+        "row_datas": len(revisions),
+        "paragraphs": len(paragraphs),
+        "tasks": len(tasks),
+        "users": len(users),
+    })
+    return counts
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--departments", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200, help="rows per department")
+    parser.add_argument("--revisions", type=int, default=3, help="revisions per row")
+    parser.add_argument("--divisions", type=int, default=10)
+    parser.add_argument("--chapters", type=int, default=10, help="chapters per division")
+    parser.add_argument("--paragraphs", type=int, default=10, help="paragraphs per chapter")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--expense-groups", type=int, default=5)
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="drop the schema first")
+    args = parser.parse_args()
+
+    started = perf_counter()
+    if args.reset:
+        await reset_schema(migration_engine)
+    await migrate(migration_engine)
+    counts = await generate(args)
+    # historia jak po zapisach z aplikacji: starsze wersje jako delty (REVISION_SNAPSHOT_INTERVAL)
+    counts["row_data_deltas"] = await encode_history()
+    elapsed = perf_counter() - started
+    await engine.dispose()
+    await migration_engine.dispose()
+
+    print(f"table {counts.pop('table_id')}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    print(f"loaded in {elapsed:.1f} s ({counts['row_datas'] / elapsed:.0f} revisions/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""Bytes/sec of the table read path: ORM + response_model re-validation vs Core + FastJSONResponse.
+
+Runs against DATABASE_URL (read-only):
+
+    cd backend && python -m bench.table_json --table 1 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from api.responses import FastJSONResponse
+from api.schemas import RowPageQuery, TablePageDTO
+from api.table import load_table_document, load_table_tree
+from db.database import AsyncSessionLocal, engine
+
+
+async def legacy_body(table_id: int, department_id: int | None) -> bytes:
+    # to co robiło FastAPI z response_model: DTO z ORM, dump, walidacja, dump, json.dumps
+    async with AsyncSessionLocal() as db:
+        dto = await load_table_tree(db, table_id, RowPageQuery(), department_id=department_id)
+    value = TablePageDTO.model_validate(dto.model_dump())
+    content = value.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+async def fast_body(table_id: int, department_id: int | None) -> bytes:
+    async with AsyncSessionLocal() as db:
+        document = await load_table_document(db, table_id, RowPageQuery(), department_id)
+    return FastJSONResponse(document).body
+
+
+async def measure(render, table_id: int, department_id: int | None, repeat: int) -> dict:
+    await render(table_id, department_id)  # rozgrzewka
+    size = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        size += len(await render(table_id, department_id))
+    elapsed = time.perf_counter() - start
+    return {"bytes": size // repeat, "ms": elapsed / repeat * 1000, "bytes_per_sec": size / elapsed}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--table", type=int, default=1)
+    parser.add_argument("--department", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    legacy = await measure(legacy_body, args.table, args.department, args.repeat)
+    fast = await measure(fast_body, args.table, args.department, args.repeat)
+    print(json.dumps({
+        "table": args.table,
+        "department": args.department,
+        "legacy": legacy,
+        "fast": fast,
+        "speedup": fast["bytes_per_sec"] / legacy["bytes_per_sec"],
+    }))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,373 @@
+"""History compaction: old RowDatas revisions move to row_datas_archive according to a retention policy.
+
+    cd backend && python -m db.compaction [--dry-run] [--keep-all-days 30] [--no-daily] [--vacuum]
+
+Policy (HISTORY_* env, overridable here):
+  - the current revision of every row is always kept (and the newest one,
+    should the pointer be missing),
+  - revisions younger than HISTORY_KEEP_ALL_DAYS are kept,
+  - older ones: the last revision of each day (HISTORY_KEEP_DAILY=1, days in
+    HISTORY_TIMEZONE) or none,
+  - rows of closed tables (Tables.isOpen false) keep only the current revision
+    (HISTORY_CLOSED_FINAL_ONLY=1).
+
+Works in batches of row ids, one short transaction each (rows locked like a
+save, lock_timeout HISTORY_LOCK_TIMEOUT_MS - a busy batch is skipped and
+retried on the next run). Pruned revisions are archived in full; kept
+deltas whose base was pruned are re-encoded against the next kept revision
+(or stored in full when a snapshot disappeared). With
+HISTORY_COMPACTION_INTERVAL_HOURS > 0 the application runs it in the
+background.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DBAPIError
+
+from .database import engine
+from .deltas import DELTA_COLUMNS, changed_exprs, nulled_sql, revisions_sql
+from .models import Rows
+
+HISTORY_KEEP_ALL_DAYS = int(os.getenv("HISTORY_KEEP_ALL_DAYS", "30"))
+HISTORY_KEEP_DAILY = os.getenv("HISTORY_KEEP_DAILY", "1") == "1"
+HISTORY_CLOSED_FINAL_ONLY = os.getenv("HISTORY_CLOSED_FINAL_ONLY", "1") == "1"
+HISTORY_TIMEZONE = os.getenv("HISTORY_TIMEZONE", "Europe/Warsaw")
+HISTORY_COMPACTION_BATCH = int(os.getenv("HISTORY_COMPACTION_BATCH", "500"))
+HISTORY_LOCK_TIMEOUT_MS = int(os.getenv("HISTORY_LOCK_TIMEOUT_MS", "2000"))
+# 0 - bez zadania w tle (tylko python -m db.compaction)
+HISTORY_COMPACTION_INTERVAL_HOURS = float(os.getenv("HISTORY_COMPACTION_INTERVAL_HOURS", "0"))
+
+# jedna kompakcja naraz, także przy wielu workerach (blokada transakcyjna - działa przez PgBouncera)
+COMPACTION_LOCK_KEY = 0x68697374
+
+logger = logging.getLogger("db.compaction")
+
+COLUMNS = ", ".join(DELTA_COLUMNS)
+
+# historia paczki wierszy w pełnej postaci + decyzja polityki
+COLLECT = text("CREATE TEMP TABLE history_compaction ON COMMIT DROP AS" + revisions_sql(
+    "rd.row_id BETWEEN :first_row_id AND :last_row_id"
+) + """
+    SELECT v.*, (
+        v.id IS NOT DISTINCT FROM r.current_row_data_id
+        -- najnowsza wersja zostaje także przy pustym wskaźniku (np. baza sprzed 0001a)
+        OR row_number() OVER (PARTITION BY v.row_id ORDER BY v.last_update DESC, v.id DESC) = 1
+        OR ((t."isOpen" OR NOT :closed_final_only) AND (
+            v.last_update >= :keep_all_since
+            OR (:daily AND row_number() OVER (
+                PARTITION BY v.row_id, (v.last_update AT TIME ZONE :tz)::date
+                ORDER BY v.last_update DESC, v.id DESC
+            ) = 1)
+        ))
+    ) AS keep
+    FROM revisions v
+    JOIN rows r ON r.id = v.row_id
+    JOIN department_tables dt ON dt.id = r.department_table_id
+    JOIN tables t ON t.id = dt.table_id
+""")
+
+# delta zachowanej wersji i następna zachowana wersja wiersza
+KEPT = """
+    kept AS (
+        SELECT id, row_id, base_id, lead(id) OVER (PARTITION BY row_id ORDER BY id) AS next_id
+        FROM history_compaction WHERE keep
+    )
+"""
+
+# usuwana pełna wersja między deltą a następną zachowaną - delta staje się pełną wersją
+# (przejmuje rolę migawki, łańcuchy nie wydłużają się)
+PROMOTE = text(f"""
+    WITH {KEPT},
+    promoted AS (
+        DELETE FROM row_data_deltas d
+        USING kept k
+        WHERE d.id = k.id
+          AND k.base_id IS NOT NULL
+          AND EXISTS (
+              SELECT 1 FROM history_compaction p
+              WHERE p.row_id = k.row_id AND NOT p.keep AND p.base_id IS NULL
+                AND p.id > k.id AND p.id < k.next_id
+          )
+        RETURNING d.id
+    )
+    INSERT INTO row_datas (id, row_id, last_user_id, last_update, {COLUMNS})
+    SELECT h.id, h.row_id, h.last_user_id, h.last_update, {COLUMNS}
+    FROM history_compaction h JOIN promoted p ON p.id = h.id
+""")
+
+# pozostałe delty z usuniętą bazą - kodowane od nowa względem następnej zachowanej wersji
+REBASE = text(f"""
+    WITH {KEPT}
+    UPDATE row_data_deltas d
+    SET base_id = k.next_id,
+        nulled = {nulled_sql("o", "n")},
+        {", ".join(f"{c} = {expr}" for c, expr in changed_exprs("o", "n").items())}
+    FROM kept k
+    JOIN history_compaction o ON o.id = k.id
+    JOIN history_compaction n ON n.id = k.next_id
+    WHERE d.id = k.id AND k.base_id IS NOT NULL AND k.base_id <> k.next_id
+""")
+
+ARCHIVE = text(f"""
+    WITH pruned AS (
+        SELECT * FROM history_compaction WHERE NOT keep
+    ),
+    archived AS (
+        INSERT INTO row_datas_archive (id, row_id, last_user_id, last_update, {COLUMNS})
+        SELECT id, row_id, last_user_id, last_update, {COLUMNS} FROM pruned
+        RETURNING pg_column_size(row_datas_archive.*) AS bytes
+    ),
+    full_removed AS (
+        DELETE FROM row_datas t USING pruned p
+        WHERE t.id = p.id AND p.base_id IS NULL
+        RETURNING pg_column_size(t.*) AS bytes
+    ),
+    deltas_removed AS (
+        DELETE FROM row_data_deltas t USING pruned p
+        WHERE t.id = p.id AND p.base_id IS NOT NULL
+        RETURNING pg_column_size(t.*) AS bytes
+    )
+    SELECT (SELECT count(*) FROM full_removed) + (SELECT count(*) FROM deltas_removed) AS revisions,
+           (SELECT coalesce(sum(bytes), 0) FROM full_removed)
+         + (SELECT coalesce(sum(bytes), 0) FROM deltas_removed) AS freed_bytes,
+           (SELECT coalesce(sum(bytes), 0) FROM archived) AS archived_bytes
+""")
+
+PRUNABLE = text("""
+    SELECT count(*) FILTER (WHERE NOT keep) AS revisions, count(*) AS total FROM history_compaction
+""")
+
+TABLE_SIZES = text("""
+    SELECT c.relname, pg_total_relation_size(c.oid) AS total_bytes
+    FROM pg_class c
+    WHERE c.relname IN ('row_datas', 'row_data_deltas', 'row_datas_archive')
+      AND c.relnamespace = current_schema()::regnamespace
+    ORDER BY c.relname
+""")
+
+
+@dataclass
+class RetentionPolicy:
+    keep_all_days: int = HISTORY_KEEP_ALL_DAYS
+    daily: bool = HISTORY_KEEP_DAILY
+    closed_final_only: bool = HISTORY_CLOSED_FINAL_ONLY
+    timezone: str = HISTORY_TIMEZONE
+
+
+@dataclass
+class CompactionReport:
+    dry_run: bool = False
+    batches: int = 0
+    skipped_batches: int = 0
+    revisions_scanned: int = 0
+    revisions_archived: int = 0
+    deltas_promoted: int = 0
+    deltas_rebased: int = 0
+    freed_bytes: int = 0
+    archived_bytes: int = 0
+    table_bytes_before: dict = field(default_factory=dict)
+    table_bytes_after: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+async def table_bytes(conn) -> dict:
+    return {r.relname: r.total_bytes for r in await conn.execute(TABLE_SIZES)}
+
+
+async def compact_batch(
+    first_row_id: int,
+    last_row_id: int,
+    policy: RetentionPolicy,
+    report: CompactionReport,
+    dry_run: bool = False,
+) -> bool:
+    """Compact one range of row ids in one transaction. False if another compaction holds the lock."""
+    params = {
+        "first_row_id": first_row_id,
+        "last_row_id": last_row_id,
+        "keep_all_since": datetime.now(timezone.utc) - timedelta(days=policy.keep_all_days),
+        "daily": policy.daily,
+        "closed_final_only": policy.closed_final_only,
+        "tz": policy.timezone,
+    }
+    async with engine.connect() as conn:
+        locked = (await conn.execute(
+            select(func.pg_try_advisory_xact_lock(COMPACTION_LOCK_KEY))
+        )).scalar_one()
+        if not locked:
+            await conn.rollback()
+            return False
+        await conn.execute(
+            select(func.set_config("lock_timeout", str(HISTORY_LOCK_TIMEOUT_MS), True))
+        )
+        try:
+            # te same blokady co przy zapisie (UPDATE rows) - zapis w tym czasie czeka na koniec paczki
+            await conn.execute(
+                select(Rows.id).where(Rows.id.between(first_row_id, last_row_id)).with_for_update()
+            )
+        except DBAPIError as e:
+            if "lock timeout" not in str(e):
+                raise
+            await conn.rollback()
+            logger.warning("rows %s-%s busy, skipped", first_row_id, last_row_id)
+            report.skipped_batches += 1
+            return True
+
+        await conn.execute(COLLECT, params)
+        counts = (await conn.execute(PRUNABLE)).one()
+        report.batches += 1
+        report.revisions_scanned += counts.total
+        if dry_run or not counts.revisions:
+            report.revisions_archived += counts.revisions
+            await conn.rollback()
+            return True
+
+        report.deltas_promoted += (await conn.execute(PROMOTE)).rowcount
+        report.deltas_rebased += (await conn.execute(REBASE)).rowcount
+        archived = (await conn.execute(ARCHIVE)).one()
+        report.revisions_archived += archived.revisions
+        report.freed_bytes += archived.freed_bytes
+        report.archived_bytes += archived.archived_bytes
+        await conn.commit()
+    return True
+
+
+async def compact_history(
+    policy: RetentionPolicy | None = None,
+    dry_run: bool = False,
+    batch: int = HISTORY_COMPACTION_BATCH,
+) -> CompactionReport | None:
+    """Run the policy over all rows. None if another compaction is running."""
+    policy = policy or RetentionPolicy()
+    report = CompactionReport(dry_run=dry_run)
+    started = asyncio.get_running_loop().time()
+
+    async with engine.connect() as conn:
+        last_row_id = (await conn.execute(select(func.coalesce(func.max(Rows.id), 0)))).scalar_one()
+        report.table_bytes_before = await table_bytes(conn)
+
+    for first_row_id in range(1, last_row_id + 1, batch):
+        if not await compact_batch(first_row_id, first_row_id + batch - 1, policy, report, dry_run):
+            logger.info("another history compaction is running")
+            return None
+
+    async with engine.connect() as conn:
+        report.table_bytes_after = await table_bytes(conn)
+    report.seconds = asyncio.get_running_loop().time() - started
+    return report
+
+
+async def vacuum_history():
+    """Plain VACUUM (no exclusive lock): space of archived revisions becomes reusable."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("row_datas", "row_data_deltas", "row_datas_archive"):
+            await conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+
+class HistoryCompactor:
+    """Background compaction every HISTORY_COMPACTION_INTERVAL_HOURS, with totals for /api/metrics."""
+
+    def __init__(self, interval_hours: float = HISTORY_COMPACTION_INTERVAL_HOURS):
+        self.interval_hours = interval_hours
+        self.runs = 0
+        self.archived = 0
+        self.freed_bytes = 0
+        self.last_report: CompactionReport | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self.interval_hours > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def run_once(self, policy: RetentionPolicy | None = None) -> CompactionReport | None:
+        report = await compact_history(policy)
+        if report is not None:
+            self.runs += 1
+            self.archived += report.revisions_archived
+            self.freed_bytes += report.freed_bytes
+            self.last_report = report
+            logger.info(
+                "history compaction: %d revisions archived, %d bytes freed, %d batches skipped",
+                report.revisions_archived, report.freed_bytes, report.skipped_batches,
+            )
+        return report
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_hours * 3600)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("history compaction failed")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+history_compactor = HistoryCompactor()
+
+
+def print_report(report: CompactionReport):
+    action = "do archiwizacji" if report.dry_run else "zarchiwizowano"
+    print(
+        f"{report.batches} paczek ({report.skipped_batches} pominiętych), "
+        f"{report.revisions_scanned} wersji, {action} {report.revisions_archived}"
+    )
+    if report.dry_run:
+        return
+    print(
+        f"delty: {report.deltas_promoted} zapisane w całości, {report.deltas_rebased} przekodowane; "
+        f"zwolnione {report.freed_bytes / 2**20:.2f} MiB danych, archiwum +{report.archived_bytes / 2**20:.2f} MiB"
+    )
+    for name in sorted(report.table_bytes_after):
+        before = report.table_bytes_before.get(name, 0) / 2**20
+        after = report.table_bytes_after[name] / 2**20
+        print(f"  {name:18} {before:8.2f} MiB -> {after:8.2f} MiB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Archive old RowDatas revisions according to the retention policy")
+    parser.add_argument("--keep-all-days", type=int, default=HISTORY_KEEP_ALL_DAYS)
+    parser.add_argument("--no-daily", action="store_true", help="drop old revisions instead of keeping one per day")
+    parser.add_argument(
+        "--keep-closed-history",
+        action="store_true",
+        help="apply the same policy to closed tables instead of keeping only the final revision",
+    )
+    parser.add_argument("--batch", type=int, default=HISTORY_COMPACTION_BATCH, help="rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only count revisions to archive")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the tables afterwards")
+    args = parser.parse_args()
+
+    policy = RetentionPolicy(
+        keep_all_days=args.keep_all_days,
+        daily=HISTORY_KEEP_DAILY and not args.no_daily,
+        closed_final_only=HISTORY_CLOSED_FINAL_ONLY and not args.keep_closed_history,
+    )
+    print(f"polityka: {asdict(policy)}")
+    report = await compact_history(policy, args.dry_run, args.batch)
+    if report is None:
+        print("inna kompakcja jest w toku")
+    else:
+        if args.vacuum and not args.dry_run:
+            await vacuum_history()
+            async with engine.connect() as conn:
+                report.table_bytes_after = await table_bytes(conn)
+        print_report(report)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,24 +1,263 @@
 import os
-from sqlalchemy.orm import declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from dataclasses import dataclass
+from itertools import count
+from time import monotonic, perf_counter, time
+from uuid import uuid4
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 
 DATABASE_URL = os.getenv( "DATABASE_URL")
+# bezpośrednie połączenie z Postgresem (z pominięciem PgBouncera) - migracje i blokady sesyjne
+DATABASE_DIRECT_URL = os.getenv("DATABASE_DIRECT_URL")
+# repliki tylko do odczytu, po przecinku; bez nich wszystko idzie na primary
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+# tryb transaction pooling (PgBouncer): bez cache prepared statements i parametrów startowych
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+# po zapisie odczyty klienta idą na primary tak długo (opóźnienie replikacji)
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+# niedostępna replika jest pomijana przez tyle sekund
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+PRIMARY_COOKIE = "db_primary_until"
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    timeouts: int = 0
+    connects: int = 0
+    invalidated: int = 0
+
+
+class TimedPoolMixin:
+    """Measures how long checkouts wait for a connection (including opening a new one)."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            waited = perf_counter() - started
+            self.stats.checkouts += 1
+            self.stats.wait_seconds += waited
+            self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def make_engine(
+    url: str,
+    pgbouncer: bool = DB_PGBOUNCER,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+    **kwargs,
+) -> AsyncEngine:
+    connect_args = {"timeout": DB_CONNECT_TIMEOUT}
+    pool_args = {}
+
+    if pgbouncer:
+        # nazwane prepared statements kolidują między klientami jednego połączenia serwerowego,
+        # a PgBouncer odrzuca statement_timeout w parametrach startowych - limit po stronie klienta
+        connect_args.update(
+            prepared_statement_cache_size=0,
+            statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+        if statement_timeout_ms:
+            connect_args["command_timeout"] = statement_timeout_ms / 1000
+        poolclass = TimedNullPool
+    else:
+        connect_args["prepared_statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+        connect_args["statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+        if statement_timeout_ms:
+            connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+        poolclass = TimedQueuePool
+        pool_args = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+        }
+
+    engine = create_async_engine(
+        url,
+        echo=False,
+        pool_pre_ping=True,
+        poolclass=poolclass,
+        connect_args=connect_args,
+        **pool_args,
+        **kwargs,
+    )
+    engine.pool.stats = stats = PoolStats()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine.sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidated += 1
+
+    return engine
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    stats: PoolStats = pool.stats
+    status = {
+        "checkouts_total": stats.checkouts,
+        "wait_seconds_total": stats.wait_seconds,
+        "max_wait_seconds": stats.max_wait_seconds,
+        "timeouts_total": stats.timeouts,
+        "connects_total": stats.connects,
+        "invalidated_total": stats.invalidated,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return status
+
+
+engine = make_engine(DATABASE_URL)
 
-engine = create_async_engine( 
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
+# migracje trzymają pg_advisory_lock między transakcjami - nie przez PgBouncera
+migration_engine = (
+    make_engine(DATABASE_DIRECT_URL, pgbouncer=False, pool_size=1, max_overflow=1, statement_timeout_ms=0)
+    if DATABASE_DIRECT_URL else engine
 )
 
-AsyncSessionLocal = async_sessionmaker(  
+replica_engines = [make_engine(url) for url in DATABASE_REPLICA_URLS]
+
+
+def all_engines() -> dict[str, AsyncEngine]:
+    return {"primary": engine, **{f"replica{i}": e for i, e in enumerate(replica_engines)}}
+
+
+class ReplicaRouter:
+    """Round-robin over replicas; one that fails to connect is skipped for DB_REPLICA_RETRY_SECONDS."""
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self.down_until = [0.0] * len(engines)
+        self._next = count()
+
+    def candidates(self) -> list[AsyncEngine]:
+        if not self.engines:
+            return []
+        start = next(self._next) % len(self.engines)
+        now = monotonic()
+        order = self.engines[start:] + self.engines[:start]
+        return [e for e in order if self.down_until[self.engines.index(e)] <= now]
+
+    def mark_down(self, engine: AsyncEngine):
+        self.down_until[self.engines.index(engine)] = monotonic() + DB_REPLICA_RETRY_SECONDS
+        print(f"Replica {engine.url.render_as_string(hide_password=True)} unavailable, reading from primary")
+
+
+replica_router = ReplicaRouter(replica_engines)
+
+AsyncSessionLocal = async_sessionmaker(
     bind=engine,
-    autoflush=False,  
-    expire_on_commit=False, 
+    autoflush=False,
+    expire_on_commit=False,
     class_=AsyncSession,
 )
 
-Base = declarative_base()  
+Base = declarative_base()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_bulk_write(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
 
-async def get_db(): 
+
+@event.listens_for(Session, "after_flush")
+def track_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def pin_reads_to_primary(session):
+    # read-your-writes: kolejne odczyty tego klienta omijają repliki, dopóki mogą być opóźnione
+    response = session.info.get("response")
+    if session.info.pop("wrote", False) and response is not None and replica_engines:
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            f"{time() + DB_READ_YOUR_WRITES_SECONDS:.3f}",
+            max_age=max(int(DB_READ_YOUR_WRITES_SECONDS), 1),
+            httponly=True,
+            samesite="lax",
+        )
+
+
+def prefers_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, "0")) > time()
+    except ValueError:
+        return False
+
+
+async def open_read_session(prefer_primary: bool = False) -> AsyncSession:
+    """Session on a healthy replica, or on the primary (no replicas, all down, or prefer_primary)."""
+    if not prefer_primary:
+        for replica in replica_router.candidates():
+            session = AsyncSessionLocal(bind=replica)
+            try:
+                await session.connection()
+            except (OSError, SQLAlchemyError):
+                await session.close()
+                replica_router.mark_down(replica)
+                continue
+            session.info["replica"] = True
+            return session
+    return AsyncSessionLocal()
+
+
+async def get_db(response: Response):
+    """Read-write session on the primary."""
     async with AsyncSessionLocal() as session:
+        session.info["response"] = response
+        yield session
+
+
+async def get_read_db(request: Request):
+    """Read-only session, routed to a replica unless this client has just written."""
+    async with await open_read_session(prefers_primary(request)) as session:
         yield session
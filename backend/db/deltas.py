@@ -0,0 +1,361 @@
+"""Delta-encoded revision history.
+
+The current revision of a row is always a full row_datas row, so current-state
+reads do not change. When a save supersedes it, the old revision moves to
+row_data_deltas as the columns that differ from the next newer revision, unless
+it would make a run of more than REVISION_SNAPSHOT_INTERVAL - 1 deltas - then it
+stays a full snapshot, which bounds the reconstruction chain.
+
+    cd backend && python -m db.deltas [--vacuum]
+
+encodes history saved in full (before the migration, or with the interval
+disabled), in batches of rows, and reports the table sizes.
+"""
+import argparse
+import asyncio
+import os
+from types import SimpleNamespace
+
+from sqlalchemy import ARRAY, Integer, Numeric, bindparam, case, func, literal_column, or_, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .database import engine
+from .models import (
+    REVISION_KEYS, RowDatas, RowDataDeltas, Rows, row_data_deltas, Divisions, Chapters, Paragraphs, ExpenseGroups, Tasks,
+)
+
+# co która wersja wiersza zostaje pełna; 1 (lub mniej) - bez delt, każda wersja w całości
+REVISION_SNAPSHOT_INTERVAL = int(os.getenv("REVISION_SNAPSHOT_INTERVAL", "10"))
+REVISION_ENCODE_BATCH = int(os.getenv("REVISION_ENCODE_BATCH", "1000"))
+
+DELTA_COLUMNS = [name for name in RowDatas.__table__.columns.keys() if name not in REVISION_KEYS]
+# JSON null ('null'::jsonb - tak ORM zapisuje None w additionals) w delcie jest zapisywany
+# jak SQL NULL + wpis w nulled; odczytany w Pythonie byłby nie do odróżnienia od "bez zmian"
+JSON_COLUMNS = {name for name in DELTA_COLUMNS if isinstance(RowDatas.__table__.c[name].type, JSONB)}
+# relacja -> (klucz obcy, model); przy zmienionym kluczu obiekt jest dociągany osobno
+RELATIONSHIPS = {
+    "division": ("division_id", Divisions),
+    "chapter": ("chapter_id", Chapters),
+    "paragraph": ("paragraph_id", Paragraphs),
+    "expense_group": ("expense_group_id", ExpenseGroups),
+    "task_budget_full": ("task_budget_full_id", Tasks),
+    "task_budget_function": ("task_budget_function_id", Tasks),
+}
+
+def value_sql(alias: str, column: str) -> str:
+    if column in JSON_COLUMNS:
+        return f"nullif({alias}.{column}, 'null'::jsonb)"
+    return f"{alias}.{column}"
+
+
+def changed_exprs(old: str, new: str) -> dict[str, str]:
+    """Delta column -> SQL value of revision old against the next revision new."""
+    return {
+        c: f"CASE WHEN {value_sql(old, c)} IS DISTINCT FROM {value_sql(new, c)} THEN {value_sql(old, c)} END"
+        for c in DELTA_COLUMNS
+    }
+
+
+def changed_sql(old: str, new: str) -> str:
+    return ", ".join(changed_exprs(old, new).values())
+
+
+def nulled_sql(old: str, new: str) -> str:
+    cases = ", ".join(
+        f"CASE WHEN {value_sql(old, c)} IS NULL AND {value_sql(new, c)} IS NOT NULL THEN '{c}' END"
+        for c in DELTA_COLUMNS
+    )
+    return f"nullif(array_remove(ARRAY[{cases}], NULL), '{{}}')"
+
+
+def rebuilt_sql(delta: str, base: str) -> str:
+    """Full columns of a delta applied to its (already full) base revision (SQL select list)."""
+    return ", ".join(
+        f"CASE WHEN {delta}.{c} IS NOT NULL THEN {delta}.{c} "
+        f"WHEN '{c}' = ANY(coalesce({delta}.nulled, '{{}}')) THEN NULL ELSE {base}.{c} END AS {c}"
+        for c in DELTA_COLUMNS
+    )
+
+
+# stara wersja (o) względem następnej (n): wartość tylko w zmienionych kolumnach,
+# NULL w pozostałych (jeden bit w nagłówku krotki), zmiany na NULL wypisane w nulled
+def encode_sql(pairs: str) -> str:
+    return f"""
+    WITH pairs AS ({pairs}),
+    encoded AS (
+        INSERT INTO row_data_deltas (id, row_id, base_id, last_user_id, last_update, nulled, {", ".join(DELTA_COLUMNS)})
+        SELECT o.id, o.row_id, n.id, o.last_user_id, o.last_update, {nulled_sql("o", "n")}, {changed_sql("o", "n")}
+        FROM pairs p
+        JOIN row_datas o ON o.id = p.old_id
+        JOIN row_datas n ON n.id = p.new_id AND n.row_id = o.row_id
+        RETURNING id
+    )
+    DELETE FROM row_datas WHERE id IN (SELECT id FROM encoded)
+"""
+
+
+# pełna historia wierszy z filtra row_filter (na row_datas rd): pełne wersje i delty
+# odtworzone po łańcuchu base_id; base_id NULL = wersja zapisana w całości
+# (numeric(15,2) rzutowane na numeric - CASE w części rekurencyjnej gubi precyzję typu)
+def revisions_sql(row_filter: str) -> str:
+    full = ", ".join(
+        f"rd.{c}::numeric AS {c}" if isinstance(RowDatas.__table__.c[c].type, Numeric) else f"rd.{c}"
+        for c in DELTA_COLUMNS
+    )
+    return f"""
+    WITH RECURSIVE revisions AS (
+        SELECT rd.id, rd.row_id, rd.last_user_id, rd.last_update, NULL::integer AS base_id,
+               {full}
+        FROM row_datas rd
+        WHERE {row_filter}
+        UNION ALL
+        SELECT d.id, d.row_id, d.last_user_id, d.last_update, d.base_id, {rebuilt_sql("d", "n")}
+        FROM row_data_deltas d
+        JOIN revisions n ON n.id = d.base_id
+    )
+"""
+
+
+# zapis: poprzednia bieżąca wersja -> delta, chyba że przed nią jest już interval - 1 delt
+# od ostatniej pełnej wersji (wtedy zostaje pełna i zamyka łańcuch)
+SUPERSEDE = text(encode_sql("""
+    SELECT u.old_id, u.new_id
+    FROM unnest(:old_ids, :new_ids) AS u(old_id, new_id)
+    JOIN row_datas o ON o.id = u.old_id
+    WHERE (
+        SELECT count(*) FROM row_data_deltas d
+        WHERE d.row_id = o.row_id
+          AND d.id < o.id
+          AND d.id > coalesce((
+              SELECT max(f.id) FROM row_datas f WHERE f.row_id = o.row_id AND f.id < o.id
+          ), 0)
+    ) < :interval - 1
+""")).bindparams(
+    bindparam("old_ids", type_=ARRAY(Integer)),
+    bindparam("new_ids", type_=ARRAY(Integer)),
+)
+
+# historia zapisana w całości: ten sam układ co przy zapisie - pełna co interval-ta wersja
+# (licząc od najstarszej) i bieżąca; wiersze mające już delty są pomijane
+BACKFILL = text(encode_sql("""
+    SELECT o.id AS old_id, o.next_id AS new_id
+    FROM (
+        SELECT rd.id, rd.row_id,
+               lead(rd.id) OVER w AS next_id,
+               row_number() OVER w - 1 AS position
+        FROM row_datas rd
+        WHERE rd.row_id BETWEEN :first_row_id AND :last_row_id
+          AND NOT EXISTS (SELECT 1 FROM row_data_deltas d WHERE d.row_id = rd.row_id)
+        WINDOW w AS (PARTITION BY rd.row_id ORDER BY rd.id)
+    ) o
+    JOIN rows r ON r.id = o.row_id
+    WHERE o.next_id IS NOT NULL
+      AND o.id IS DISTINCT FROM r.current_row_data_id
+      AND o.position % :interval <> :interval - 1
+"""))
+
+TABLE_SIZES = text("""
+    SELECT 'row_datas' AS relname, count(*) AS n_rows, pg_total_relation_size('row_datas') AS total_bytes
+    FROM row_datas
+    UNION ALL
+    SELECT 'row_data_deltas', count(*), pg_total_relation_size('row_data_deltas')
+    FROM row_data_deltas
+""")
+
+# rozmiar samych danych (bez martwych krotek i wolnego miejsca w plikach)
+LIVE_BYTES = text("""
+    SELECT (SELECT coalesce(sum(pg_column_size(t.*)), 0) FROM row_datas t)
+         + (SELECT coalesce(sum(pg_column_size(t.*)), 0) FROM row_data_deltas t)
+""")
+
+
+async def encode_superseded(db: AsyncSession, superseded: dict[int, int]):
+    """Store revisions that stopped being current ({old id: next revision id}) as deltas."""
+    if REVISION_SNAPSHOT_INTERVAL <= 1 or not superseded:
+        return
+    await db.execute(
+        SUPERSEDE,
+        {
+            "old_ids": list(superseded),
+            "new_ids": list(superseded.values()),
+            "interval": REVISION_SNAPSHOT_INTERVAL,
+        },
+    )
+
+
+async def preserve_delta_bases(db: AsyncSession, base_ids, columns: list[str]):
+    """Copy the given columns into deltas based on these revisions before they are updated in place.
+
+    Otherwise the older revisions would be reconstructed with the new values.
+    base_ids may be a list or a select of row_datas ids. One statement per column.
+    """
+    base = RowDatas.__table__
+    for name in columns:
+        value = base.c[name]
+        if name in JSON_COLUMNS:
+            value = func.nullif(value, literal_column("'null'::jsonb"))
+        await db.execute(
+            update(RowDataDeltas)
+            .where(
+                RowDataDeltas.base_id == base.c.id,
+                base.c.id.in_(base_ids),
+                # tylko kolumny dziedziczone z bazy
+                RowDataDeltas.__table__.c[name].is_(None),
+                or_(RowDataDeltas.nulled.is_(None), ~RowDataDeltas.nulled.any(name)),
+            )
+            .values({
+                name: value,
+                "nulled": case(
+                    (value.is_(None), func.array_append(RowDataDeltas.nulled, name)),
+                    else_=RowDataDeltas.nulled,
+                ),
+            })
+            .execution_options(synchronize_session=False)
+        )
+
+
+class RebuiltRevision(SimpleNamespace):
+    """Revision rebuilt from a delta: the attributes of RowDatas (with relationships), not mapped."""
+
+
+async def load_related(db: AsyncSession, deltas: list) -> dict:
+    """Dictionary objects referenced by foreign keys that differ in the deltas, by (model, id)."""
+    wanted: dict[type, set[int]] = {}
+    for delta in deltas:
+        for foreign_key, model in RELATIONSHIPS.values():
+            if getattr(delta, foreign_key) is not None:
+                wanted.setdefault(model, set()).add(getattr(delta, foreign_key))
+
+    related = {}
+    for model, ids in wanted.items():
+        stmt = select(model).where(model.id.in_(ids))
+        if model is Paragraphs:
+            stmt = stmt.options(joinedload(Paragraphs.expense_group))
+        for obj in (await db.execute(stmt)).scalars():
+            related[model, obj.id] = obj
+    return related
+
+
+async def attach_delta_revisions(db: AsyncSession, rows: list[Rows]):
+    """Add revisions stored as deltas to row.row_datas of rows loaded with their full history.
+
+    Deltas are applied newest first, so every base is either a loaded full
+    revision or a delta rebuilt a moment earlier. Rebuilt revisions are
+    RebuiltRevision objects (read-only, outside the session).
+    """
+    by_id = {row.id: row for row in rows}
+    if not by_id:
+        return
+    # wiersze Core, nie obiekty ORM - delty są tylko odczytywane
+    result = await db.execute(
+        select(row_data_deltas)
+        .where(row_data_deltas.c.row_id.in_(by_id))
+        .order_by(row_data_deltas.c.id.desc())
+    )
+    deltas = result.all()
+    if not deltas:
+        return
+
+    related = await load_related(db, deltas)
+    known = {revision.id: revision for row in rows for revision in row.row_datas}
+    rebuilt: dict[int, list] = {}
+    for delta in deltas:
+        base = known.get(delta.base_id)
+        if base is None:
+            continue
+        nulled = set(delta.nulled or ())
+        values = {}
+        for name in DELTA_COLUMNS:
+            value = getattr(delta, name)
+            values[name] = value if value is not None or name in nulled else getattr(base, name)
+        for name, (foreign_key, model) in RELATIONSHIPS.items():
+            changed = getattr(delta, foreign_key)
+            values[name] = getattr(base, name) if changed is None else related.get((model, changed))
+        revision = RebuiltRevision(
+            id=delta.id,
+            row_id=delta.row_id,
+            last_user_id=delta.last_user_id,
+            last_update=delta.last_update,
+            **values,
+        )
+        known[revision.id] = revision
+        rebuilt.setdefault(delta.row_id, []).append(revision)
+
+    for row_id, revisions in rebuilt.items():
+        row = by_id[row_id]
+        set_committed_value(row, "row_datas", sorted(row.row_datas + revisions, key=lambda r: r.id))
+
+
+async def table_sizes(conn) -> dict:
+    sizes = {r.relname: {"rows": r.n_rows, "total_bytes": r.total_bytes} for r in await conn.execute(TABLE_SIZES)}
+    sizes["live_bytes"] = (await conn.execute(LIVE_BYTES)).scalar_one()
+    return sizes
+
+
+def print_sizes(label: str, sizes: dict):
+    tables = ", ".join(
+        f"{name} {s['rows']} wierszy / {s['total_bytes'] / 2**20:.1f} MiB"
+        for name, s in sizes.items() if name != "live_bytes"
+    )
+    print(f"{label}: {tables}; dane {sizes['live_bytes'] / 2**20:.1f} MiB")
+
+
+async def encode_history(batch: int = REVISION_ENCODE_BATCH) -> int:
+    """Encode full-stored history, one transaction per batch of row ids. Returns encoded revisions."""
+    async with engine.connect() as conn:
+        last_row_id = (await conn.execute(select(func.coalesce(func.max(Rows.id), 0)))).scalar_one()
+
+    encoded = 0
+    for first_row_id in range(1, last_row_id + 1, batch):
+        last = first_row_id + batch - 1
+        async with engine.begin() as conn:
+            # te same blokady co przy zapisie (UPDATE rows) - równoległy zapis czeka na koniec paczki
+            await conn.execute(
+                select(Rows.id).where(Rows.id.between(first_row_id, last)).with_for_update()
+            )
+            result = await conn.execute(
+                BACKFILL,
+                {"first_row_id": first_row_id, "last_row_id": last, "interval": REVISION_SNAPSHOT_INTERVAL},
+            )
+            encoded += result.rowcount
+    return encoded
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Encode full-stored revision history as deltas")
+    parser.add_argument("--batch", type=int, default=REVISION_ENCODE_BATCH, help="rows per transaction")
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="VACUUM FULL row_datas afterwards (exclusive lock) to return the space to the OS",
+    )
+    args = parser.parse_args()
+
+    if REVISION_SNAPSHOT_INTERVAL <= 1:
+        print("REVISION_SNAPSHOT_INTERVAL <= 1 - delty wyłączone")
+        return
+
+    async with engine.connect() as conn:
+        before = await table_sizes(conn)
+    print_sizes("przed", before)
+
+    encoded = await encode_history(args.batch)
+    print(f"zakodowano {encoded} wersji (pełna co {REVISION_SNAPSHOT_INTERVAL}.)")
+
+    async with engine.connect() as conn:
+        if args.vacuum:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM FULL ANALYZE row_datas"))
+            await conn.execute(text("ANALYZE row_data_deltas"))
+        after = await table_sizes(conn)
+    print_sizes("po", after)
+    if before["live_bytes"]:
+        print(f"dane: {100 * (1 - after['live_bytes'] / before['live_bytes']):.1f}% mniej")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Raport indeksów: brakujące, nieużywane, zdublowane oraz klucze obce bez indeksu.
+
+    cd backend && python -m db.index_check [--json]
+
+Kod wyjścia 1, gdy w bazie brakuje indeksu zadeklarowanego w db/models.py
+(czyli migracje nie zostały zastosowane) albo gdy indeksy się dublują.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .database import Base, engine
+from . import models  # noqa: F401 - rejestruje tabele w Base.metadata
+
+EXISTING_INDEXES = text("""
+    SELECT tablename, indexname FROM pg_indexes WHERE schemaname = current_schema()
+""")
+
+UNINDEXED_FOREIGN_KEYS = text("""
+    SELECT c.conrelid::regclass::text AS table_name,
+           c.conname AS constraint_name,
+           array_agg(a.attname ORDER BY k.ord) AS columns
+    FROM pg_constraint c
+    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.contype = 'f'
+      AND c.connamespace = current_schema()::regnamespace
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_index i
+          WHERE i.indrelid = c.conrelid
+            AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] @> c.conkey
+            AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] <@ c.conkey
+      )
+    GROUP BY c.conrelid, c.conname
+    ORDER BY 1, 2
+""")
+
+# indeksy unikalne/PK wymuszają ograniczenia - nieużywane w zapytaniach nadal są potrzebne
+UNUSED_INDEXES = text("""
+    SELECT s.relname AS table_name, s.indexrelname AS index_name,
+           pg_relation_size(s.indexrelid) AS size_bytes
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.schemaname = current_schema()
+      AND s.idx_scan = 0
+      AND NOT i.indisunique
+    ORDER BY size_bytes DESC, 1, 2
+""")
+
+DUPLICATE_INDEXES = text("""
+    SELECT t.relname AS table_name,
+           array_agg(ix.relname ORDER BY i.indisprimary DESC, ix.relname) AS indexes
+    FROM pg_index i
+    JOIN pg_class ix ON ix.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    WHERE t.relnamespace = current_schema()::regnamespace
+    GROUP BY t.relname, i.indkey::text, i.indclass::text,
+             coalesce(pg_get_expr(i.indexprs, i.indrelid), ''),
+             coalesce(pg_get_expr(i.indpred, i.indrelid), '')
+    HAVING count(*) > 1
+    ORDER BY 1
+""")
+
+STATS_RESET = text("SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()")
+
+
+def declared_indexes() -> set[tuple[str, str]]:
+    return {
+        (table.name, index.name)
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    }
+
+
+async def check_indexes(conn: AsyncConnection) -> dict:
+    existing = {(r.tablename, r.indexname) for r in await conn.execute(EXISTING_INDEXES)}
+    stats_reset = (await conn.execute(STATS_RESET)).scalar()
+
+    return {
+        "missing": [
+            {"table": table, "index": index}
+            for table, index in sorted(declared_indexes() - existing)
+        ],
+        "unindexed_foreign_keys": [
+            {"table": r.table_name, "constraint": r.constraint_name, "columns": list(r.columns)}
+            for r in await conn.execute(UNINDEXED_FOREIGN_KEYS)
+        ],
+        "unused": [
+            {"table": r.table_name, "index": r.index_name, "size_bytes": r.size_bytes}
+            for r in await conn.execute(UNUSED_INDEXES)
+        ],
+        "duplicates": [
+            {"table": r.table_name, "indexes": list(r.indexes)}
+            for r in await conn.execute(DUPLICATE_INDEXES)
+        ],
+        "stats_since": stats_reset.isoformat() if stats_reset else None,
+    }
+
+
+def print_report(report: dict):
+    print("Brakujące indeksy (zadeklarowane w modelach):")
+    for item in report["missing"] or [None]:
+        print(f"  {item['table']}.{item['index']}" if item else "  brak")
+
+    print("Klucze obce bez indeksu:")
+    for item in report["unindexed_foreign_keys"] or [None]:
+        print(f"  {item['table']}({', '.join(item['columns'])}) [{item['constraint']}]" if item else "  brak")
+
+    print(f"Nieużywane indeksy (idx_scan = 0 od {report['stats_since'] or 'początku statystyk'}):")
+    for item in report["unused"] or [None]:
+        print(f"  {item['table']}.{item['index']} ({item['size_bytes']} B)" if item else "  brak")
+
+    print("Zdublowane indeksy (te same kolumny):")
+    for item in report["duplicates"] or [None]:
+        print(f"  {item['table']}: {', '.join(item['indexes'])}" if item else "  brak")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    async with engine.connect() as conn:
+        report = await check_indexes(conn)
+    await engine.dispose()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    sys.exit(1 if report["missing"] or report["duplicates"] else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,38 +1,67 @@
+import argparse
 import asyncio
+import os
+from time import perf_counter
 from datetime import datetime, time, date, timedelta
 from decimal import Decimal
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from passlib.hash import argon2
 
-from .database import engine, Base, AsyncSessionLocal
+from .database import migration_engine, AsyncSessionLocal
+from .migrations import migrate, migration_lock, reset_schema, schema_revision
+from .revisions import refresh_current_revisions
 from .models import (
     Authentication, Tasks, Users, Departments, UserTypes, Tables, 
     Statuses, DepartmentTables, Rows, Divisions, Chapters, 
     Paragraphs, ExpenseGroups, RowDatas
 )
 
-async def init_db():
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") == "1"
+DB_SEED = os.getenv("DB_SEED", "0") == "1"
+DB_RESET = os.getenv("DB_RESET", "0") == "1"
+
+async def init_db(seed_data: bool = DB_SEED, reset: bool = DB_RESET):
     print("--- Starting Database Initialization ---")
-    
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
-        print("Schema recreated successfully.")
+    started = perf_counter()
+
+    if reset:
+        await reset_schema(migration_engine)
+        print("Schema dropped (DB_RESET).")
+
+    if DB_MIGRATE_ON_STARTUP or reset:
+        before, after = await migrate(migration_engine)
+        if before != after:
+            print(f"Schema migrated {before} -> {after}.")
+    else:
+        current, head = await schema_revision(migration_engine)
+        if current != head:
+            raise RuntimeError(f"Database schema is at {current}, application expects {head}: run alembic upgrade head")
+
+    if seed_data:
+        # pod tą samą blokadą co migracje - kilka workerów nie zaseeduje bazy dwa razy
+        async with migration_lock(migration_engine):
+            await seed_if_empty()
 
+    print(f"--- Database ready in {(perf_counter() - started) * 1000:.0f} ms ---")
+
+async def seed_if_empty():
     async with AsyncSessionLocal() as session:
+        if (await session.execute(select(Tables.id).limit(1))).first() is not None:
+            print("Database already contains data, skipping seed.")
+            return
+
         try:
             await seed(session)
             await seed_history_test(session)
             await seed_like_a_boss(session)
+            await refresh_current_revisions(session)
+            await session.commit()
         except Exception as e:
             print(f"!!! Error during seeding: {e}")
             await session.rollback()
             raise e
 
-if __name__ == "__main__":
-    asyncio.run(init_db())
-
 
 async def seed(session):
     try:
@@ -336,14 +365,17 @@ async def seed_like_a_boss(session):
         session.add(u_type)
         dept = Departments(type="Departament B")
         session.add(dept)
-        task_full = Tasks(value="22.01.01.01", type="action", description="Koordynacja działalności oraz obsługa administracyjna i techniczna")
-        session.add(task_full)
-        task = Tasks(value="22.01", type="task", description="Koordynacja działalności oraz obsługa administracyjna i techniczna")
-        session.add(task)
-        task_full2 = Tasks(value="21.12.01.01", type="action", description="Inna Koordynacja działalności oraz obsługa administracyjna i techniczna")
-        session.add(task_full2)
-        task12 = Tasks(value="21.12", type="task", description="Inna Koordynacja działalności oraz obsługa administracyjna i techniczna")
-        session.add(task12)
+        # zadania są słownikiem (unikalne value) - używamy tych z seed()
+        tasks = {
+            t.value: t
+            for t in (await session.execute(
+                select(Tasks).where(Tasks.value.in_(["22.01.01.01", "22.01", "21.12.01.01", "21.12"]))
+            )).scalars()
+        }
+        task_full = tasks["22.01.01.01"]
+        task = tasks["22.01"]
+        task_full2 = tasks["21.12.01.01"]
+        task12 = tasks["21.12"]
         stat = Statuses(value="Active")
         session.add(stat)
         exp_group = ExpenseGroups(definition="wydatki bieżące jednostek budżetowych")
@@ -503,3 +535,10 @@ async def seed_like_a_boss(session):
         raise e
     
 
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the database schema and optionally seed it.")
+    parser.add_argument("--seed", action="store_true", default=DB_SEED, help="seed demo data into an empty database")
+    parser.add_argument("--reset", action="store_true", default=DB_RESET, help="drop all tables first (development only)")
+    args = parser.parse_args()
+    asyncio.run(init_db(seed_data=args.seed, reset=args.reset))
@@ -0,0 +1,115 @@
+import os
+from contextlib import asynccontextmanager
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .database import Base
+from . import models  # noqa: F401 - rejestruje tabele w Base.metadata
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+
+# stały klucz pg_advisory_lock - wspólny dla wszystkich workerów i instancji
+MIGRATION_LOCK_KEY = int(os.getenv("DB_MIGRATION_LOCK_KEY", "720150016"))
+
+# schemat z czasów create_all (bez alembic_version): z indeksami -> 0002, poza tym 0001
+# (stan bazowy; 0001a dodaje current_row_data_id albo tylko uzupełnia puste wskaźniki)
+LEGACY_INDEX_MARKER = ("rows", "ix_rows_department_table_id")
+LEGACY_POINTER_MARKER = ("rows", "current_row_data_id")
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    # logowanie zostaje takie, jak ustawił uvicorn
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection: Connection) -> str | None:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def _stamp_legacy(connection: Connection, config: Config):
+    inspector = inspect(connection)
+    if not inspector.has_table("tables"):
+        return
+
+    table, index = LEGACY_INDEX_MARKER
+    indexed = any(ix["name"] == index for ix in inspector.get_indexes(table))
+    table, column = LEGACY_POINTER_MARKER
+    pointer = any(c["name"] == column for c in inspector.get_columns(table))
+    revision = "0002" if indexed and pointer else "0001"
+    print(f"Schema without version table, stamping {revision}")
+    command.stamp(config, revision)
+
+
+def _upgrade(connection: Connection, head: str) -> tuple[str | None, str]:
+    current = current_revision(connection)
+    if current == head:
+        return current, head
+
+    config = alembic_config(connection)
+    if current is None:
+        _stamp_legacy(connection, config)
+    command.upgrade(config, "head")
+    return current, current_revision(connection)
+
+
+async def schema_revision(engine: AsyncEngine) -> tuple[str | None, str]:
+    async with engine.connect() as conn:
+        current = await conn.run_sync(current_revision)
+    return current, head_revision()
+
+
+@asynccontextmanager
+async def migration_lock(engine: AsyncEngine):
+    """Hold the migration advisory lock on a dedicated connection (yields it)."""
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        # DDL i scalanie duplikatów mogą trwać dłużej niż DB_STATEMENT_TIMEOUT_MS
+        await conn.execute(text("SET statement_timeout = 0"))
+        await conn.commit()
+        try:
+            yield conn
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            await conn.execute(text("RESET statement_timeout"))
+            await conn.commit()
+
+
+async def migrate(engine: AsyncEngine) -> tuple[str | None, str]:
+    """Apply pending migrations under an advisory lock, returns (before, after).
+
+    Without pending migrations it costs one query and takes no lock, so many
+    workers can start at once; the first one to get the lock migrates and the
+    rest find the schema already at head.
+    """
+    current, head = await schema_revision(engine)
+    if current == head:
+        return current, head
+
+    async with migration_lock(engine) as conn:
+        result = await conn.run_sync(_upgrade, head)
+        await conn.commit()
+    return result
+
+
+async def reset_schema(engine: AsyncEngine):
+    """Drop every table (including alembic_version) - development only."""
+    async with migration_lock(engine) as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        await conn.commit()
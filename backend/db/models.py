@@ -3,9 +3,9 @@ import datetime
 import enum
 from datetime import time, date
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Enum, String, Integer, SmallInteger, Time, Date, Numeric, Text, ForeignKey, Boolean
+from sqlalchemy import Enum, String, Integer, SmallInteger, Time, Date, Numeric, Text, ForeignKey, Boolean, Index, Table, Column
 from .database import Base
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy import text
 from sqlalchemy import DateTime
 
@@ -15,12 +15,12 @@ class UserRole(str, enum.Enum):
 
 class Authentication(Base):
     __tablename__ = "authentication"
-    user_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
     password: Mapped[str] = mapped_column(String, nullable=False)
 
 class Users(Base):
     __tablename__ = "users"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     auth_id: Mapped[int] = mapped_column(ForeignKey("authentication.user_id"), nullable=False, unique=True)
     user_name: Mapped[str] = mapped_column(String, nullable=False)
     name: Mapped[str] = mapped_column(String, nullable=False)
@@ -34,17 +34,17 @@ class Users(Base):
 
 class Departments(Base):
     __tablename__ = "departments"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     type: Mapped[str] = mapped_column(String, nullable=False)
 
 class UserTypes(Base):
     __tablename__ = "user_types"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     type: Mapped[str] = mapped_column(String, nullable=False)
 
 class Tables(Base):
     __tablename__ = "tables"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     year: Mapped[float] = mapped_column(Numeric(4, 0), nullable=False)
     version: Mapped[str] = mapped_column(String, nullable=False)
     isOpen: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
@@ -52,12 +52,12 @@ class Tables(Base):
 
 class Statuses(Base):
     __tablename__ = "statuses"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     value: Mapped[str] = mapped_column(String, nullable=False)
 
 class DepartmentTables(Base):
     __tablename__ = "department_tables"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     table_id: Mapped[int] = mapped_column(ForeignKey("tables.id"), nullable=False)
     department_id: Mapped[int] = mapped_column(ForeignKey("departments.id"), nullable=False)
     status_id: Mapped[int] = mapped_column(ForeignKey("statuses.id"), nullable=False)
@@ -70,21 +70,31 @@ class DepartmentTables(Base):
 
 class Rows(Base):
     __tablename__ = "rows"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     department_table_id: Mapped[int] = mapped_column(ForeignKey("department_tables.id"), nullable=False)
     last_update: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     next_year: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # wskaźnik na aktualną wersję RowDatas, ustawiany razem z zapisem nowej wersji
+    current_row_data_id: Mapped[int] = mapped_column(
+        ForeignKey("row_datas.id", use_alter=True, name="fk_rows_current_row_data_id"),
+        nullable=True,
+    )
 
     department_table: Mapped["DepartmentTables"] = relationship("DepartmentTables", backref="rows")
+    current_row_data: Mapped["RowDatas"] = relationship(
+            "RowDatas",
+            foreign_keys=[current_row_data_id],
+            post_update=True,
+        )
 
 class Divisions(Base):
     __tablename__ = "divisions"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     value: Mapped[str] = mapped_column(String, nullable=False)
 
 class Chapters(Base):
     __tablename__ = "chapters"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     division_id: Mapped[int] = mapped_column(ForeignKey("divisions.id"), nullable=False)
     value: Mapped[str] = mapped_column(String, nullable=False)
 
@@ -92,14 +102,14 @@ class Chapters(Base):
 
 class Tasks(Base):
     __tablename__ = "tasks"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     value: Mapped[str] = mapped_column(String, nullable=False)
     type: Mapped[str] = mapped_column(String, nullable=False) 
     description: Mapped[str] = mapped_column(Text, nullable=True)
 
 class Paragraphs(Base):
     __tablename__ = "paragraphs"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     chapter_id: Mapped[int] = mapped_column(ForeignKey("chapters.id"), nullable=False)
     expense_group_id: Mapped[int] = mapped_column(ForeignKey("expense_groups.id"), nullable=False)
     value: Mapped[str] = mapped_column(String, nullable=False)
@@ -109,12 +119,12 @@ class Paragraphs(Base):
 
 class ExpenseGroups(Base):
     __tablename__ = "expense_groups"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     definition: Mapped[str] = mapped_column(String, nullable=False)
 
 class RowDatas(Base):
     __tablename__ = "row_datas"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     row_id: Mapped[int] = mapped_column(ForeignKey("rows.id"), nullable=False)
     last_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     last_update: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -162,7 +172,7 @@ class RowDatas(Base):
     notes: Mapped[str] = mapped_column(String, nullable=True)
     additionals: Mapped[dict] = mapped_column(JSONB, nullable=True)
 
-    row: Mapped["Rows"] = relationship("Rows", backref="row_datas")
+    row: Mapped["Rows"] = relationship("Rows", foreign_keys=[row_id], backref="row_datas")
     division: Mapped["Divisions"] = relationship("Divisions", backref="row_datas")
     chapter: Mapped["Chapters"] = relationship("Chapters", backref="row_datas")
     paragraph: Mapped["Paragraphs"] = relationship("Paragraphs", backref="row_datas")
@@ -178,3 +188,70 @@ class RowDatas(Base):
             foreign_keys=[task_budget_function_id],
             backref="row_datas_function" 
         )
+
+
+# kolumny wersji (poza kluczami) - w row_data_deltas wszystkie opcjonalne
+REVISION_KEYS = ("id", "row_id", "last_user_id", "last_update")
+
+row_data_deltas = Table(
+    "row_data_deltas",
+    Base.metadata,
+    # id zachowane z row_datas - identyfikatory wersji się nie zmieniają
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("row_id", ForeignKey("rows.id"), nullable=False),
+    # następna wersja wiersza: pełna w row_datas albo kolejna delta
+    Column("base_id", Integer, nullable=False),
+    Column("last_user_id", ForeignKey("users.id"), nullable=False),
+    Column("last_update", DateTime(timezone=True), nullable=False),
+    # kolumny zmienione na NULL (NULL w pozostałych = wartość z wersji base_id)
+    Column("nulled", ARRAY(String), nullable=True),
+    *[
+        Column(column.name, column.type, nullable=True)
+        for column in RowDatas.__table__.columns
+        if column.name not in REVISION_KEYS
+    ],
+)
+
+
+class RowDataDeltas(Base):
+    """Superseded revision holding only the columns that differ from the next newer revision (base_id)."""
+    __table__ = row_data_deltas
+
+
+row_datas_archive = Table(
+    "row_datas_archive",
+    Base.metadata,
+    # wersje usunięte przez kompakcję historii (db.compaction) - w pełnej postaci, bez kluczy obcych
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    *[
+        Column(column.name, column.type, nullable=column.nullable)
+        for column in RowDatas.__table__.columns
+        if column.name != "id"
+    ],
+    Column("archived_at", DateTime(timezone=True), nullable=False, server_default=text("now()")),
+)
+
+
+class RowDatasArchive(Base):
+    """Revision moved out of the history by compaction, stored in full."""
+    __table__ = row_datas_archive
+
+
+# Indeksy poza kluczami głównymi - zarządzane migracjami (migrations/versions/0002_*, 0003_*, 0004_*),
+# nazwy muszą zgadzać się z migracją; sprawdzenie: python -m db.index_check
+Index("ix_department_tables_table_id_department_id", DepartmentTables.table_id, DepartmentTables.department_id)
+Index("ix_department_tables_department_id", DepartmentTables.department_id)
+Index("ix_rows_department_table_id", Rows.department_table_id)
+Index("ix_rows_current_row_data_id", Rows.current_row_data_id)
+# najnowsza wersja wiersza: DISTINCT ON (row_id) ORDER BY row_id, last_update DESC, id DESC
+Index("ix_row_datas_row_id_last_update", RowDatas.row_id, RowDatas.last_update.desc(), RowDatas.id.desc())
+Index("ix_row_data_deltas_row_id", RowDataDeltas.row_id)
+Index("ix_row_data_deltas_base_id", RowDataDeltas.base_id)
+Index("ix_row_datas_archive_row_id", RowDatasArchive.row_id)
+Index("ix_users_user_name", Users.user_name, unique=True)
+Index("ix_divisions_value", Divisions.value, unique=True)
+Index("ix_chapters_division_id_value", Chapters.division_id, Chapters.value, unique=True)
+Index("ix_chapters_value", Chapters.value)
+Index("ix_paragraphs_chapter_id_value", Paragraphs.chapter_id, Paragraphs.value, unique=True)
+Index("ix_paragraphs_value", Paragraphs.value)
+Index("ix_tasks_value", Tasks.value, unique=True)
@@ -0,0 +1,60 @@
+"""Stan primary i replik z DATABASE_REPLICA_URLS: dostępność, tryb recovery, opóźnienie replikacji.
+
+    cd backend && python -m db.replicas
+
+Kod wyjścia 1, gdy któraś baza jest niedostępna albo "replika" nie jest w trybie recovery.
+"""
+import asyncio
+import sys
+
+from sqlalchemy import text
+
+from .database import all_engines
+
+REPLICATION_STATUS = text("""
+    SELECT pg_is_in_recovery() AS in_recovery,
+           extract(epoch FROM now() - pg_last_xact_replay_timestamp()) AS replay_lag,
+           pg_last_wal_replay_lsn() = pg_last_wal_receive_lsn() AS caught_up
+""")
+
+
+async def replication_status() -> dict:
+    status = {}
+    for name, engine in all_engines().items():
+        try:
+            async with engine.connect() as conn:
+                row = (await conn.execute(REPLICATION_STATUS)).one()
+            status[name] = {
+                "reachable": True,
+                "in_recovery": row.in_recovery,
+                "replay_lag_seconds": float(row.replay_lag) if row.replay_lag is not None else None,
+                "caught_up": row.caught_up,
+            }
+        except Exception as e:
+            status[name] = {"reachable": False, "error": str(e).splitlines()[0]}
+    return status
+
+
+async def main():
+    status = await replication_status()
+    for engine in all_engines().values():
+        await engine.dispose()
+
+    ok = True
+    for name, s in status.items():
+        if not s["reachable"]:
+            ok = False
+            print(f"{name:10} niedostępna: {s['error']}")
+            continue
+        expected = name != "primary"
+        ok = ok and s["in_recovery"] == expected
+        lag = s["replay_lag_seconds"]
+        print(
+            f"{name:10} recovery={s['in_recovery']}"
+            + (f" lag={lag:.1f} s caught_up={s['caught_up']}" if expected and lag is not None else "")
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import Tables, DepartmentTables, Rows, RowDatas
+
+
+def latest_revisions(table_id: int | None = None):
+    """Newest RowDatas revision of every row, optionally limited to one table."""
+    stmt = (
+        select(RowDatas)
+        .distinct(RowDatas.row_id)
+        .order_by(RowDatas.row_id, RowDatas.last_update.desc(), RowDatas.id.desc())
+    )
+    if table_id is not None:
+        stmt = (
+            stmt.join(Rows, Rows.id == RowDatas.row_id)
+            .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+            .where(DepartmentTables.table_id == table_id)
+        )
+    return stmt.subquery("latest_row_datas")
+
+
+async def refresh_current_revisions(db: AsyncSession, table_id: int | None = None):
+    """Rebuild Rows.current_row_data_id from the revision history (backfill / repair)."""
+    latest = latest_revisions(table_id)
+    await db.execute(
+        update(Rows)
+        .where(Rows.id == latest.c.row_id)
+        .values(current_row_data_id=latest.c.id)
+    )
+
+
+def row_data_options():
+    return (
+        joinedload(RowDatas.division),
+        joinedload(RowDatas.chapter),
+        joinedload(RowDatas.paragraph),
+        joinedload(RowDatas.expense_group),
+        joinedload(RowDatas.task_budget_full),
+        joinedload(RowDatas.task_budget_function),
+    )
+
+
+def table_tree_options(history: bool = False):
+    """Loader options for Tables -> DepartmentTables -> Rows -> RowDatas.
+
+    By default only the current revision of each row is loaded; pass
+    history=True to load every full revision and add the delta-encoded ones
+    with db.deltas.attach_delta_revisions(). Call expose_current_revisions()
+    on the result before serializing it without history.
+    """
+    if history:
+        revisions = selectinload(Rows.row_datas).options(*row_data_options())
+    else:
+        revisions = selectinload(Rows.current_row_data).options(*row_data_options())
+
+    return selectinload(Tables.department_tables).options(
+        joinedload(DepartmentTables.department),
+        joinedload(DepartmentTables.status),
+        selectinload(DepartmentTables.rows).options(revisions),
+    )
+
+
+def expose_current_revisions(table: Tables) -> Tables:
+    # row_datas = [aktualna wersja], bez dociągania historii z bazy
+    for dept_table in table.department_tables:
+        for row in dept_table.rows:
+            current = row.current_row_data
+            set_committed_value(row, "row_datas", [current] if current is not None else [])
+    return table
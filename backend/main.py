@@ -1,10 +1,12 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import uvicorn
 
 from db.init_db import init_db
+from db.database import all_engines, PoolTimeoutError
 from api.user import router as user_router
 from api.table import router as table_router
 from api.chapters import router as chapters_router
@@ -12,18 +14,34 @@ from api.divisions import router as divisions_router
 from api.department import router as department_router
 from api.department import router as department_router
 from api.tools import router as tools_router
+from api.metrics import router as metrics_router, MetricsMiddleware, instrument_engine
+from api.query_watch import QueryWatchMiddleware, N_PLUS_ONE_WARN
+from api.responses import TimedJSONResponse
+from api.notifications import change_hub
+from api.dictionaries import dictionary_cache
+from db.compaction import history_compactor
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("--- Startup: Inicjalizacja bazy danych ---")
     await init_db()
+    # migracje i seed mogły zmienić słowniki
+    dictionary_cache.invalidate()
+    history_compactor.start()
+    # unieważnienia cache użytkowników z innych workerów przychodzą przez LISTEN
+    change_hub.start()
     
     yield  
     
     print("--- Shutdown: Zamykanie aplikacji ---")
+    await history_compactor.close()
+    await change_hub.close()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
+
+for pool, pool_engine in all_engines().items():
+    instrument_engine(pool_engine, pool)
 
 origins_raw = os.getenv("CORS_ORIGINS")
 origins = origins_raw.split(",") if origins_raw else ["http://localhost:5173"]
@@ -35,6 +53,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if N_PLUS_ONE_WARN:
+    app.add_middleware(QueryWatchMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # wszystkie połączenia zajęte dłużej niż DB_POOL_TIMEOUT - klient może ponowić
+    return JSONResponse(status_code=503, content={"detail": "Database busy, try again"}, headers={"Retry-After": "1"})
 
 @app.get("/api/health")
 def health():
@@ -51,3 +77,4 @@ app.include_router(divisions_router)
 app.include_router(department_router)
 app.include_router(department_router)
 app.include_router(tools_router)
+app.include_router(metrics_router)
@@ -0,0 +1,218 @@
+"""initial schema (stan sprzed migracji, odpowiada dawnemu create_all)
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 12:55:32.954048
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('authentication',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_authentication_user_id'), 'authentication', ['user_id'], unique=False)
+    op.create_table('departments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_departments_id'), 'departments', ['id'], unique=False)
+    op.create_table('divisions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_divisions_id'), 'divisions', ['id'], unique=False)
+    op.create_table('expense_groups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('definition', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_expense_groups_id'), 'expense_groups', ['id'], unique=False)
+    op.create_table('statuses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_statuses_id'), 'statuses', ['id'], unique=False)
+    op.create_table('tables',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Numeric(precision=4, scale=0), nullable=False),
+    sa.Column('version', sa.String(), nullable=False),
+    sa.Column('isOpen', sa.Boolean(), nullable=False),
+    sa.Column('budget', sa.Numeric(precision=15, scale=2), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tables_id'), 'tables', ['id'], unique=False)
+    op.create_table('tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tasks_id'), 'tasks', ['id'], unique=False)
+    op.create_table('user_types',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_types_id'), 'user_types', ['id'], unique=False)
+    op.create_table('chapters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chapters_id'), 'chapters', ['id'], unique=False)
+    op.create_table('department_tables',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_id', sa.Integer(), nullable=False),
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('status_id', sa.Integer(), nullable=False),
+    sa.Column('start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['status_id'], ['statuses.id'], ),
+    sa.ForeignKeyConstraint(['table_id'], ['tables.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_department_tables_id'), 'department_tables', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('auth_id', sa.Integer(), nullable=False),
+    sa.Column('user_name', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('surname', sa.String(), nullable=False),
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('user_type_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['auth_id'], ['authentication.user_id'], ),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['user_type_id'], ['user_types.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('auth_id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('paragraphs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('expense_group_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ),
+    sa.ForeignKeyConstraint(['expense_group_id'], ['expense_groups.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_paragraphs_id'), 'paragraphs', ['id'], unique=False)
+    op.create_table('rows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('department_table_id', sa.Integer(), nullable=False),
+    sa.Column('last_update', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('next_year', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['department_table_id'], ['department_tables.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rows_id'), 'rows', ['id'], unique=False)
+    op.create_table('row_datas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('last_update', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('budget_part', sa.String(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('paragraph_id', sa.Integer(), nullable=False),
+    sa.Column('funding_source', sa.String(), nullable=True),
+    sa.Column('expense_group_id', sa.Integer(), nullable=False),
+    sa.Column('task_budget_full_id', sa.Integer(), nullable=False),
+    sa.Column('task_budget_function_id', sa.Integer(), nullable=False),
+    sa.Column('program_project_name', sa.String(), nullable=True),
+    sa.Column('organizational_unit_name', sa.String(), nullable=True),
+    sa.Column('plan_wi', sa.String(), nullable=True),
+    sa.Column('fund_distributor', sa.String(), nullable=True),
+    sa.Column('budget_code', sa.String(), nullable=False),
+    sa.Column('task_name', sa.String(), nullable=True),
+    sa.Column('task_justification', sa.String(), nullable=True),
+    sa.Column('expenditure_purpose', sa.String(), nullable=True),
+    sa.Column('financial_needs_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_0', sa.String(), nullable=False),
+    sa.Column('financial_needs_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_1', sa.String(), nullable=False),
+    sa.Column('financial_needs_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_2', sa.String(), nullable=False),
+    sa.Column('financial_needs_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_3', sa.String(), nullable=False),
+    sa.Column('subsidy_agreement_party', sa.String(), nullable=True),
+    sa.Column('legal_basis_for_subsidy', sa.String(), nullable=True),
+    sa.Column('notes', sa.String(), nullable=True),
+    sa.Column('additionals', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ),
+    sa.ForeignKeyConstraint(['division_id'], ['divisions.id'], ),
+    sa.ForeignKeyConstraint(['expense_group_id'], ['expense_groups.id'], ),
+    sa.ForeignKeyConstraint(['last_user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['paragraph_id'], ['paragraphs.id'], ),
+    sa.ForeignKeyConstraint(['row_id'], ['rows.id'], ),
+    sa.ForeignKeyConstraint(['task_budget_full_id'], ['tasks.id'], ),
+    sa.ForeignKeyConstraint(['task_budget_function_id'], ['tasks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_row_datas_id'), 'row_datas', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_row_datas_id'), table_name='row_datas')
+    op.drop_table('row_datas')
+    op.drop_index(op.f('ix_rows_id'), table_name='rows')
+    op.drop_table('rows')
+    op.drop_index(op.f('ix_paragraphs_id'), table_name='paragraphs')
+    op.drop_table('paragraphs')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_department_tables_id'), table_name='department_tables')
+    op.drop_table('department_tables')
+    op.drop_index(op.f('ix_chapters_id'), table_name='chapters')
+    op.drop_table('chapters')
+    op.drop_index(op.f('ix_user_types_id'), table_name='user_types')
+    op.drop_table('user_types')
+    op.drop_index(op.f('ix_tasks_id'), table_name='tasks')
+    op.drop_table('tasks')
+    op.drop_index(op.f('ix_tables_id'), table_name='tables')
+    op.drop_table('tables')
+    op.drop_index(op.f('ix_statuses_id'), table_name='statuses')
+    op.drop_table('statuses')
+    op.drop_index(op.f('ix_expense_groups_id'), table_name='expense_groups')
+    op.drop_table('expense_groups')
+    op.drop_index(op.f('ix_divisions_id'), table_name='divisions')
+    op.drop_table('divisions')
+    op.drop_index(op.f('ix_departments_id'), table_name='departments')
+    op.drop_table('departments')
+    op.drop_index(op.f('ix_authentication_user_id'), table_name='authentication')
+    op.drop_table('authentication')
@@ -0,0 +1,44 @@
+"""rows current revision: wskaźnik Rows.current_row_data_id z uzupełnieniem
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 12:57:02.118733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # bazy z create_all sprzed migracji mogą już mieć kolumnę i klucz (bez wypełnionych wskaźników)
+    op.execute("ALTER TABLE rows ADD COLUMN IF NOT EXISTS current_row_data_id INTEGER")
+    foreign_keys = sa.inspect(op.get_bind()).get_foreign_keys('rows')
+    if not any(fk['constrained_columns'] == ['current_row_data_id'] for fk in foreign_keys):
+        op.create_foreign_key('fk_rows_current_row_data_id', 'rows', 'row_datas', ['current_row_data_id'], ['id'])
+
+    # najnowsza wersja każdego wiersza (jak db.revisions.refresh_current_revisions)
+    op.execute("""
+        UPDATE rows r SET current_row_data_id = latest.id
+        FROM (
+            SELECT DISTINCT ON (row_id) id, row_id
+            FROM row_datas
+            ORDER BY row_id, last_update DESC, id DESC
+        ) latest
+        WHERE r.id = latest.row_id AND r.current_row_data_id IS NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_rows_current_row_data_id', 'rows', type_='foreignkey')
+    op.drop_column('rows', 'current_row_data_id')
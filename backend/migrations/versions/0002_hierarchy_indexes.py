@@ -0,0 +1,73 @@
+"""hierarchy indexes: klucze obce, najnowsza wersja wiersza, unikalne wartości słowników
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 13:02:11.418204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def merge_duplicates(table: str, key: list[str], references: list[tuple[str, str]]) -> None:
+    """Scal duplikaty słownika przed indeksem unikalnym - zostaje najmniejsze id, odwołania są przepinane."""
+    op.execute(f"""
+        CREATE TEMP TABLE duplicate_map AS
+        SELECT id, min(id) OVER (PARTITION BY {", ".join(key)}) AS keep_id FROM {table}
+    """)
+    op.execute("DELETE FROM duplicate_map WHERE id = keep_id")
+    for ref_table, ref_column in references:
+        op.execute(f"""
+            UPDATE {ref_table} t SET {ref_column} = m.keep_id
+            FROM duplicate_map m WHERE t.{ref_column} = m.id
+        """)
+    op.execute(f"DELETE FROM {table} t USING duplicate_map m WHERE t.id = m.id")
+    op.execute("DROP TABLE duplicate_map")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # kolejność ma znaczenie: scalenie działów może zdublować rozdziały, a te paragrafy
+    merge_duplicates("divisions", ["value"], [("chapters", "division_id"), ("row_datas", "division_id")])
+    merge_duplicates("chapters", ["division_id", "value"], [("paragraphs", "chapter_id"), ("row_datas", "chapter_id")])
+    merge_duplicates("paragraphs", ["chapter_id", "value"], [("row_datas", "paragraph_id")])
+    merge_duplicates("tasks", ["value"], [("row_datas", "task_budget_full_id"), ("row_datas", "task_budget_function_id")])
+
+    op.create_index('ix_department_tables_table_id_department_id', 'department_tables', ['table_id', 'department_id'], unique=False)
+    op.create_index('ix_department_tables_department_id', 'department_tables', ['department_id'], unique=False)
+    op.create_index('ix_rows_department_table_id', 'rows', ['department_table_id'], unique=False)
+    op.create_index('ix_rows_current_row_data_id', 'rows', ['current_row_data_id'], unique=False)
+    op.create_index('ix_row_datas_row_id_last_update', 'row_datas', ['row_id', sa.literal_column('last_update DESC'), sa.literal_column('id DESC')], unique=False)
+    # zduplikowane loginy nie są scalane - migracja zatrzyma się na błędzie indeksu
+    op.create_index('ix_users_user_name', 'users', ['user_name'], unique=True)
+    op.create_index('ix_divisions_value', 'divisions', ['value'], unique=True)
+    op.create_index('ix_chapters_division_id_value', 'chapters', ['division_id', 'value'], unique=True)
+    op.create_index('ix_chapters_value', 'chapters', ['value'], unique=False)
+    op.create_index('ix_paragraphs_chapter_id_value', 'paragraphs', ['chapter_id', 'value'], unique=True)
+    op.create_index('ix_paragraphs_value', 'paragraphs', ['value'], unique=False)
+    op.create_index('ix_tasks_value', 'tasks', ['value'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_value', table_name='tasks')
+    op.drop_index('ix_paragraphs_value', table_name='paragraphs')
+    op.drop_index('ix_paragraphs_chapter_id_value', table_name='paragraphs')
+    op.drop_index('ix_chapters_value', table_name='chapters')
+    op.drop_index('ix_chapters_division_id_value', table_name='chapters')
+    op.drop_index('ix_divisions_value', table_name='divisions')
+    op.drop_index('ix_users_user_name', table_name='users')
+    op.drop_index('ix_row_datas_row_id_last_update', table_name='row_datas')
+    op.drop_index('ix_rows_current_row_data_id', table_name='rows')
+    op.drop_index('ix_rows_department_table_id', table_name='rows')
+    op.drop_index('ix_department_tables_department_id', table_name='department_tables')
+    op.drop_index('ix_department_tables_table_id_department_id', table_name='department_tables')
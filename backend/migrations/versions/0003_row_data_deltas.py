@@ -0,0 +1,104 @@
+"""row data deltas: starsze wersje wierszy zapisane jako różnice względem następnej wersji
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 13:41:05.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NUMERIC = sa.Numeric(precision=15, scale=2)
+
+# kolumny row_datas poza kluczami wersji; w delcie NULL = bez zmian względem wersji base_id
+DELTA_COLUMNS = [
+    ('budget_part', sa.String()),
+    ('division_id', sa.Integer()),
+    ('chapter_id', sa.Integer()),
+    ('paragraph_id', sa.Integer()),
+    ('funding_source', sa.String()),
+    ('expense_group_id', sa.Integer()),
+    ('task_budget_full_id', sa.Integer()),
+    ('task_budget_function_id', sa.Integer()),
+    ('program_project_name', sa.String()),
+    ('organizational_unit_name', sa.String()),
+    ('plan_wi', sa.String()),
+    ('fund_distributor', sa.String()),
+    ('budget_code', sa.String()),
+    ('task_name', sa.String()),
+    ('task_justification', sa.String()),
+    ('expenditure_purpose', sa.String()),
+    *[
+        column
+        for year in range(4)
+        for column in (
+            (f'financial_needs_{year}', NUMERIC),
+            (f'expenditure_limit_{year}', NUMERIC),
+            (f'unallocated_task_funds_{year}', NUMERIC),
+            (f'contract_amount_{year}', NUMERIC),
+            (f'contract_number_{year}', sa.String()),
+        )
+    ],
+    ('subsidy_agreement_party', sa.String()),
+    ('legal_basis_for_subsidy', sa.String()),
+    ('notes', sa.String()),
+    ('additionals', postgresql.JSONB(astext_type=sa.Text())),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # istniejąca historia zostaje w pełnej postaci - kodowanie: python -m db.deltas
+    op.create_table('row_data_deltas',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('base_id', sa.Integer(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('last_update', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('nulled', postgresql.ARRAY(sa.String()), nullable=True),
+    *[sa.Column(name, type_, nullable=True) for name, type_ in DELTA_COLUMNS],
+    sa.ForeignKeyConstraint(['last_user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['row_id'], ['rows.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_row_data_deltas_row_id', 'row_data_deltas', ['row_id'], unique=False)
+    op.create_index('ix_row_data_deltas_base_id', 'row_data_deltas', ['base_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # zakodowane wersje wracają do row_datas w pełnej postaci (od najnowszych, po łańcuchu base_id)
+    names = [name for name, _ in DELTA_COLUMNS]
+
+    def rebuilt(base: str) -> str:
+        return ", ".join(
+            f"CASE WHEN d.{n} IS NOT NULL THEN d.{n} "
+            f"WHEN '{n}' = ANY(coalesce(d.nulled, '{{}}')) THEN NULL ELSE {base}.{n} END AS {n}"
+            for n in names
+        )
+
+    op.execute(f"""
+        WITH RECURSIVE chain AS (
+            SELECT d.id, d.row_id, d.last_user_id, d.last_update, {rebuilt("b")}
+            FROM row_data_deltas d JOIN row_datas b ON b.id = d.base_id
+            UNION ALL
+            SELECT d.id, d.row_id, d.last_user_id, d.last_update, {rebuilt("c")}
+            FROM row_data_deltas d JOIN chain c ON c.id = d.base_id
+        )
+        INSERT INTO row_datas (id, row_id, last_user_id, last_update, {", ".join(names)})
+        SELECT id, row_id, last_user_id, last_update, {", ".join(names)} FROM chain
+    """)
+    op.drop_index('ix_row_data_deltas_base_id', table_name='row_data_deltas')
+    op.drop_index('ix_row_data_deltas_row_id', table_name='row_data_deltas')
+    op.drop_table('row_data_deltas')
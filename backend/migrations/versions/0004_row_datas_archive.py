@@ -0,0 +1,79 @@
+"""row datas archive: wersje usunięte z historii przez kompakcję
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:05:37.118942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # kolumny jak w row_datas, bez kluczy obcych - archiwum nie blokuje zmian w słownikach
+    op.create_table('row_datas_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('last_update', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('budget_part', sa.String(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('paragraph_id', sa.Integer(), nullable=False),
+    sa.Column('funding_source', sa.String(), nullable=True),
+    sa.Column('expense_group_id', sa.Integer(), nullable=False),
+    sa.Column('task_budget_full_id', sa.Integer(), nullable=False),
+    sa.Column('task_budget_function_id', sa.Integer(), nullable=False),
+    sa.Column('program_project_name', sa.String(), nullable=True),
+    sa.Column('organizational_unit_name', sa.String(), nullable=True),
+    sa.Column('plan_wi', sa.String(), nullable=True),
+    sa.Column('fund_distributor', sa.String(), nullable=True),
+    sa.Column('budget_code', sa.String(), nullable=False),
+    sa.Column('task_name', sa.String(), nullable=True),
+    sa.Column('task_justification', sa.String(), nullable=True),
+    sa.Column('expenditure_purpose', sa.String(), nullable=True),
+    sa.Column('financial_needs_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_0', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_0', sa.String(), nullable=False),
+    sa.Column('financial_needs_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_1', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_1', sa.String(), nullable=False),
+    sa.Column('financial_needs_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_2', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_2', sa.String(), nullable=False),
+    sa.Column('financial_needs_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('expenditure_limit_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('unallocated_task_funds_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_amount_3', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('contract_number_3', sa.String(), nullable=False),
+    sa.Column('subsidy_agreement_party', sa.String(), nullable=True),
+    sa.Column('legal_basis_for_subsidy', sa.String(), nullable=True),
+    sa.Column('notes', sa.String(), nullable=True),
+    sa.Column('additionals', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_row_datas_archive_row_id', 'row_datas_archive', ['row_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_row_datas_archive_row_id', table_name='row_datas_archive')
+    op.drop_table('row_datas_archive')
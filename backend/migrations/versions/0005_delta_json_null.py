@@ -0,0 +1,34 @@
+"""delta json null: JSON null w deltach zapisany jak SQL NULL z wpisem w nulled
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:02:47.530911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 'null'::jsonb w delcie czytany przez ORM jako None = "bez zmian" - odtworzona wersja dostawała nowsze additionals
+    op.execute("""
+        UPDATE row_data_deltas
+        SET additionals = NULL,
+            nulled = array_append(coalesce(nulled, '{}'), 'additionals')
+        WHERE additionals = 'null'::jsonb
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # obie postaci są poprawne dla odtwarzania w SQL - nic do cofnięcia
+    pass
@@ -0,0 +1,48 @@
+"""drop pk duplicate indexes: ix_<tabela>_id dublujące klucze główne
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:21:09.114382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, kolumna klucza) - indeks ix_<tabela>_<kolumna> pochodzi z index=True przy primary_key
+PK_INDEXES = [
+    ('authentication', 'user_id'),
+    ('departments', 'id'),
+    ('divisions', 'id'),
+    ('expense_groups', 'id'),
+    ('statuses', 'id'),
+    ('tables', 'id'),
+    ('tasks', 'id'),
+    ('user_types', 'id'),
+    ('chapters', 'id'),
+    ('department_tables', 'id'),
+    ('users', 'id'),
+    ('paragraphs', 'id'),
+    ('rows', 'id'),
+    ('row_datas', 'id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # klucz główny ma już własny unikalny btree - drugi indeks tylko spowalnia każdy INSERT
+    for table, column in PK_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_{column}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in PK_INDEXES:
+        op.create_index(f'ix_{table}_{column}', table, [column], unique=False)
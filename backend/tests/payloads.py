@@ -0,0 +1,13 @@
+"""Request bodies shared by the tests."""
+
+
+def row_values(limit: str, purpose: str, additionals: str) -> list[str]:
+    return [
+        "12", "750", "75001", "400", "1", "wydatki bieżące jednostek budżetowych", "22.01.01.01", "22.01",
+        "p", "u", "w", "f", "WB", "t", "j", purpose,
+        "10", limit, "0", "0", "x",
+        "1", "1", "0", "0", "x",
+        "1", "1", "0", "0", "x",
+        "1", "1", "0", "0", "x",
+        "s", "l", "n", additionals,
+    ]
@@ -0,0 +1,20 @@
+from decimal import Decimal
+
+
+def test_limits_per_department_is_the_assigned_limit(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    response = client.put(
+        "/api/departments/update_expenditure_limits",
+        json={"tableId": 1, "updates": [["Departament A", 1234.5]]},
+    )
+    assert response.status_code == 200
+    [department] = response.json()["departments"]
+    assert department["affected_rows"] > 1
+
+    limits = client.get("/api/tables/1/get_limits_per_department").json()
+    assert Decimal(str(limits["Departament A"])) == Decimal("1234.5")
+
+
+def test_total_budget_of_missing_table_is_404(client):
+    assert client.get("/api/tables/999999/get_total_budget").status_code == 404
+    assert client.get("/api/tables/1/get_total_budget").status_code == 200
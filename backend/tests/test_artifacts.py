@@ -0,0 +1,45 @@
+from api.artifacts import ArtifactCache
+
+
+def test_open_entry_survives_eviction(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10)
+    cache.put_bytes("a", b"0123456789").close()
+
+    cached = cache.get("a")
+    # nowy wpis wypycha "a" i usuwa jego plik, zanim odpowiedź go odczyta
+    cache.put_bytes("b", b"abcdefghij").close()
+    assert cache.get("a") is None
+
+    with cached:
+        assert cached.read() == b"0123456789"
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=100)
+    cache.put_bytes("a", b"data").close()
+    (tmp_path / cache.digest("a")).unlink()
+
+    assert cache.get("a") is None
+    assert cache.total_bytes == 0
+
+
+def test_spreadsheet_etag_follows_table_changes(client):
+    from tests.payloads import row_values
+
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    first = client.get("/api/tables/1/generate_spreadsheet")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/tables/1/generate_spreadsheet")
+    assert cached.headers["ETag"] == etag and cached.content == first.content
+    assert client.get("/api/tables/1/generate_spreadsheet", headers={"If-None-Match": etag}).status_code == 304
+
+    response = client.post("/api/tables/batch-update", json=[{
+        "tableId": 1, "departmentTableId": 1, "rowId": 1, "values": row_values("77", "eksport", ""),
+        "lastUserId": 1, "lastUpdate": "2026-01-01T00:00:00Z",
+    }])
+    assert response.status_code == 200, response.text
+    changed = client.get("/api/tables/1/generate_spreadsheet", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,65 @@
+from tests.payloads import row_values
+
+TABLE_ID = 1
+DEPARTMENT_TABLE_ID = 1
+ROW_ID = 2
+
+
+def item(row_id, limit):
+    return {
+        "tableId": TABLE_ID,
+        "departmentTableId": DEPARTMENT_TABLE_ID,
+        "rowId": row_id,
+        "values": row_values(limit, "opis", ""),
+        "lastUserId": 1,
+        "lastUpdate": "2026-01-01T00:00:00Z",
+    }
+
+
+def current_limits(client) -> dict[int, str]:
+    document = client.get(f"/api/tables/{TABLE_ID}").json()
+    return {
+        row["id"]: row["row_datas"][0]["expenditure_limit_0"]
+        for dept_table in document["department_tables"]
+        for row in dept_table["rows"]
+    }
+
+
+def test_statement_count_does_not_grow_with_the_batch(client):
+    from api.query_watch import watching
+
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    # pierwszy zapis ładuje słowniki i użytkownika do cache - nie liczy się
+    client.post("/api/tables/batch-update", json=[item(ROW_ID, "100")])
+    counts = []
+    for size in (1, 5):
+        batch = [item(ROW_ID, str(100 + i)) for i in range(size)] + [item(None, "7") for _ in range(size)]
+        with watching() as watch:
+            response = client.post("/api/tables/batch-update", json=batch)
+        assert response.status_code == 200, response.text
+        watch.assert_no_n_plus_one()
+        counts.append(watch.count)
+
+    assert counts[0] == counts[1]
+
+
+def test_batch_returns_row_ids_and_keeps_the_last_revision(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    response = client.post("/api/tables/batch-update", json=[
+        item(ROW_ID, "201"), item(None, "301"), item(ROW_ID, "202"),
+    ])
+    assert response.status_code == 200, response.text
+    processed = response.json()["processed_row_ids"]
+    assert processed[0] == processed[2] == ROW_ID
+    assert processed[1] not in (None, ROW_ID)
+
+    limits = current_limits(client)
+    # ten sam wiersz dwa razy w paczce - bieżąca jest ostatnia wersja
+    assert float(limits[ROW_ID]) == 202
+    assert float(limits[processed[1]]) == 301
+
+
+def test_unknown_row_is_404(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    response = client.post("/api/tables/batch-update", json=[item(999999, "1")])
+    assert response.status_code == 404
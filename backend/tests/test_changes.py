@@ -0,0 +1,38 @@
+from tests.payloads import row_values
+
+TABLE_ID = 1
+DEPARTMENT_TABLE_ID = 1
+ROW_ID = 3
+
+
+def changes(client, since=None):
+    query = f"?since={since}" if since is not None else ""
+    response = client.get(f"/api/tables/{TABLE_ID}/changes{query}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_changes_since_watermark(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    full = changes(client)
+    assert full["full"] is True
+    assert ROW_ID in {row["id"] for row in full["rows"]}
+
+    watermark = changes(client, full["watermark"])["watermark"]
+    assert changes(client, watermark)["rows"] == []
+
+    response = client.post("/api/tables/batch-update", json=[{
+        "tableId": TABLE_ID, "departmentTableId": DEPARTMENT_TABLE_ID, "rowId": ROW_ID,
+        "values": row_values("55", "zmiana", ""), "lastUserId": 1, "lastUpdate": "2026-01-01T00:00:00Z",
+    }])
+    assert response.status_code == 200, response.text
+
+    delta = changes(client, watermark)
+    assert delta["full"] is False
+    assert [row["id"] for row in delta["rows"]] == [ROW_ID]
+    assert float(delta["rows"][0]["row_datas"][0]["expenditure_limit_0"]) == 55
+
+
+def test_invalid_watermark_is_400(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    assert client.get(f"/api/tables/{TABLE_ID}/changes?since=abc").status_code == 400
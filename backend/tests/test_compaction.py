@@ -0,0 +1,99 @@
+from sqlalchemy import text
+
+from tests.payloads import row_values
+
+TABLE_ID = 1
+DEPARTMENT_TABLE_ID = 1
+
+
+def save(client, row_id, limit):
+    response = client.post("/api/tables/batch-update", json=[{
+        "tableId": TABLE_ID, "departmentTableId": DEPARTMENT_TABLE_ID, "rowId": row_id,
+        "values": row_values(limit, "kompakcja", ""), "lastUserId": 1,
+        "lastUpdate": "2026-01-01T00:00:00Z",
+    }])
+    assert response.status_code == 200, response.text
+    return response.json()["processed_row_ids"][0]
+
+
+def old_row(client, run, limits) -> int:
+    """A new row with one revision per limit, all of them 60 days old."""
+    from db.database import engine
+
+    row_id = save(client, None, limits[0])
+    for limit in limits[1:]:
+        save(client, row_id, limit)
+
+    async def backdate():
+        async with engine.begin() as conn:
+            for table in ("row_datas", "row_data_deltas"):
+                await conn.execute(
+                    text(f"UPDATE {table} SET last_update = last_update - interval '60 days' WHERE row_id = :id"),
+                    {"id": row_id},
+                )
+
+    run(backdate)
+    return row_id
+
+
+def history(client, row_id) -> dict[int, float]:
+    response = client.get(f"/api/tables/{TABLE_ID}/rows/{row_id}/history")
+    assert response.status_code == 200, response.text
+    return {r["id"]: float(r["expenditure_limit_0"]) for r in response.json()["row_datas"]}
+
+
+def compact(run, row_id):
+    from db.compaction import CompactionReport, RetentionPolicy, compact_batch
+
+    report = CompactionReport()
+    policy = RetentionPolicy(keep_all_days=30, daily=False)
+    assert run(compact_batch, row_id, row_id, policy, report)
+    return report
+
+
+def archived(run, row_id) -> dict[int, float]:
+    from db.database import engine
+
+    async def select():
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT id, expenditure_limit_0 FROM row_datas_archive WHERE row_id = :id"), {"id": row_id}
+            )
+            return {r.id: float(r.expenditure_limit_0) for r in result}
+
+    return run(select)
+
+
+def test_old_revisions_are_archived_and_current_kept(client, run):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    row_id = old_row(client, run, ["1", "2", "3", "4"])
+    before = history(client, row_id)
+    current = max(before)
+
+    report = compact(run, row_id)
+
+    assert report.revisions_archived == len(before) - 1
+    assert history(client, row_id) == {current: 4.0}
+    assert archived(run, row_id) == {i: v for i, v in before.items() if i != current}
+
+
+def test_newest_revision_kept_without_current_pointer(client, run):
+    from db.database import engine
+
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    row_id = old_row(client, run, ["5", "6", "7"])
+    newest = max(history(client, row_id))
+
+    async def set_pointer(value):
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("UPDATE rows SET current_row_data_id = :value WHERE id = :id"), {"value": value, "id": row_id}
+            )
+
+    run(set_pointer, None)
+    try:
+        compact(run, row_id)
+    finally:
+        run(set_pointer, newest)
+
+    assert history(client, row_id) == {newest: 7.0}
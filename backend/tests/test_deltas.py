@@ -0,0 +1,73 @@
+import pytest
+
+from tests.payloads import row_values
+
+# wiersz 1 z danych demonstracyjnych (Departament A, tabela 1)
+TABLE_ID = 1
+DEPARTMENT_TABLE_ID = 1
+ROW_ID = 1
+
+
+@pytest.fixture
+def admin(client):
+    response = client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    assert response.status_code == 200
+    return client
+
+
+def table_row(document: dict) -> dict:
+    return next(
+        row
+        for department_table in document["department_tables"]
+        for row in department_table["rows"]
+        if row["id"] == ROW_ID
+    )
+
+
+def test_history_rebuilt_from_deltas_matches_full_revisions(admin):
+    edits = [
+        ("100", "opis 1", ""),
+        ("101", "opis 1", '{"a": 1}'),
+        ("101", "opis 2", ""),
+        ("102", "opis 2", ""),
+        ("102", "opis 3", '{"b": 2}'),
+        ("103", "opis 3", '{"b": 2}'),
+    ]
+    saved = {}
+    for limit, purpose, additionals in edits:
+        response = admin.post("/api/tables/batch-update", json=[{
+            "tableId": TABLE_ID,
+            "departmentTableId": DEPARTMENT_TABLE_ID,
+            "rowId": ROW_ID,
+            "values": row_values(limit, purpose, additionals),
+            "lastUserId": 1,
+            "lastUpdate": "2026-01-01T00:00:00Z",
+        }])
+        assert response.status_code == 200, response.text
+        # bieżąca wersja jest zawsze zapisana w całości
+        [current] = table_row(admin.get(f"/api/tables/{TABLE_ID}").json())["row_datas"]
+        saved[current["id"]] = current
+
+    history = {
+        revision["id"]: revision
+        for revision in table_row(admin.get(f"/api/tables/{TABLE_ID}?history=true").json())["row_datas"]
+    }
+    assert {i: history.get(i) for i in saved} == saved
+
+
+def test_row_history_matches_table_history(admin):
+    table_history = table_row(admin.get(f"/api/tables/{TABLE_ID}?history=true").json())["row_datas"]
+
+    response = admin.get(f"/api/tables/{TABLE_ID}/rows/{ROW_ID}/history")
+    assert response.status_code == 200, response.text
+    row_history = response.json()["row_datas"]
+
+    assert sorted(r["id"] for r in row_history) == sorted(r["id"] for r in table_history)
+    assert {r["id"]: r for r in row_history} == {r["id"]: r for r in table_history}
+    # najnowsza wersja jako pierwsza - to ona jest pokazywana w tabeli
+    [current] = table_row(admin.get(f"/api/tables/{TABLE_ID}").json())["row_datas"]
+    assert row_history[0] == current
+
+
+def test_row_history_of_unknown_row_is_404(admin):
+    assert admin.get(f"/api/tables/{TABLE_ID}/rows/999999/history").status_code == 404
@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+TABLE_ID = 1
+DEPARTMENTS = ["Departament A", "Departament B"]
+
+
+def department_limits(client) -> dict[str, list[Decimal]]:
+    document = client.get(f"/api/tables/{TABLE_ID}").json()
+    return {
+        dept_table["department"]["type"]: [
+            Decimal(str(row["row_datas"][0]["expenditure_limit_0"])) for row in dept_table["rows"]
+        ]
+        for dept_table in document["department_tables"]
+    }
+
+
+def update_limits(client, updates, dry_run=False):
+    response = client.put("/api/departments/update_expenditure_limits", json={
+        "tableId": TABLE_ID, "updates": updates, "dryRun": dry_run,
+    })
+    assert response.status_code == 200, response.text
+    return {d["department"]: d for d in response.json()["departments"]}
+
+
+def test_dry_run_reports_without_writing(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    before = department_limits(client)
+
+    report = update_limits(client, [["Departament A", 42], ["nie ma takiego", 1]], dry_run=True)
+
+    assert list(report) == ["Departament A"]
+    assert report["Departament A"]["affected_rows"] == len(before["Departament A"])
+    assert Decimal(str(report["Departament A"]["old_total"])) == sum(before["Departament A"])
+    assert department_limits(client) == before
+
+
+def test_one_update_per_department(client):
+    from api.query_watch import watching
+
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    with watching() as watch:
+        report = update_limits(client, [[name, 500 + i] for i, name in enumerate(DEPARTMENTS)])
+    watch.assert_no_n_plus_one()
+
+    updates = [g for g in watch.groups.values() if g.sql.upper().startswith("WITH")]
+    assert sum(g.count for g in updates) == len(DEPARTMENTS)
+
+    limits = department_limits(client)
+    for i, name in enumerate(DEPARTMENTS):
+        assert limits[name] and set(limits[name]) == {Decimal(500 + i)}
+        assert report[name]["affected_rows"] == len(limits[name])
@@ -0,0 +1,30 @@
+from tests.payloads import row_values
+
+
+def test_forced_reload_is_rate_limited(run):
+    from api.dictionaries import dictionary_cache
+    from db.database import AsyncSessionLocal
+
+    async def snapshots():
+        async with AsyncSessionLocal() as db:
+            cached = await dictionary_cache.get(db)
+            forced = await dictionary_cache.get(db, force=True)
+            dictionary_cache.invalidate()
+            invalidated = await dictionary_cache.get(db)
+            return cached, forced, invalidated
+
+    cached, forced, invalidated = run(snapshots)
+    assert forced is cached
+    assert invalidated is not cached
+
+
+def test_unknown_dictionary_value_is_400(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    values = row_values("1", "opis", "")
+    values[1] = "nie ma takiego działu"
+    for _ in range(2):
+        response = client.post("/api/tables/batch-update", json=[{
+            "tableId": 1, "departmentTableId": 1, "rowId": 1, "values": values,
+            "lastUserId": 1, "lastUpdate": "2026-01-01T00:00:00Z",
+        }])
+        assert response.status_code == 400
@@ -0,0 +1,49 @@
+from io import BytesIO
+
+from docx import Document
+
+from api.pdf import create_docx
+
+DATA = {
+    "headers": ["a", "b", "c"],
+    "rows": [
+        ["x & <y>", 2, "linia 1\nlinia 2\tpo tabulatorze"],
+        ["krótki"],
+        ["bez\x01sterujących", "", None],
+    ],
+}
+
+
+def cells(doc) -> list[list[str]]:
+    return [[cell.text for cell in row.cells] for row in doc.tables[0].rows]
+
+
+def test_report_table_matches_the_data():
+    doc = Document(BytesIO(create_docx(DATA, "komentarz", "2026-12-31")))
+
+    assert [p.text for p in doc.paragraphs] == ["Proszę edytować do: 2026-12-31", "komentarz"]
+    assert cells(doc) == [
+        ["a", "b", "c"],
+        ["x & <y>", "2", "linia 1\nlinia 2\tpo tabulatorze"],
+        ["krótki", "", ""],
+        ["bezsterujących", "", "None"],
+    ]
+    assert all(cell.paragraphs[0].runs[0].bold for cell in doc.tables[0].rows[0].cells)
+
+
+def test_cached_template_is_not_modified():
+    create_docx(DATA, "pierwszy", "2026-12-31")
+    doc = Document(BytesIO(create_docx({"headers": ["h"], "rows": []}, "drugi", "2027-01-01")))
+
+    assert len(doc.tables) == 1
+    assert [p.text for p in doc.paragraphs] == ["Proszę edytować do: 2027-01-01", "drugi"]
+
+
+def test_get_docx_is_cached_with_etag(client):
+    payload = {"data": DATA, "comment": "komentarz", "date": "2026-12-31"}
+    first = client.post("/api/tools/get_docx", json=payload)
+    assert first.status_code == 200
+    assert cells(Document(BytesIO(first.content)))[0] == ["a", "b", "c"]
+
+    again = client.post("/api/tools/get_docx", json=payload, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+from openpyxl import load_workbook
+from sqlalchemy import func, select
+
+from api.schemas import HEADERS
+
+TABLE_ID = 1
+NUMBERING = tuple(range(len(HEADERS)))
+
+
+def test_export_is_one_query_for_any_number_of_departments(run):
+    from api.excel import generete_excel
+    from api.query_watch import watching
+    from db.database import AsyncSessionLocal
+    from db.models import DepartmentTables, Rows
+
+    async def export():
+        async with AsyncSessionLocal() as db:
+            template = await db.scalar(
+                select(DepartmentTables).where(DepartmentTables.table_id == TABLE_ID).limit(1)
+            )
+            # dwie puste tabele działu - tylko w tej transakcji
+            now = datetime.now(timezone.utc)
+            for _ in range(2):
+                db.add(DepartmentTables(
+                    table_id=TABLE_ID, department_id=template.department_id,
+                    status_id=template.status_id, start=now, end=now,
+                ))
+            await db.flush()
+            departments = await db.scalar(
+                select(func.count()).where(DepartmentTables.table_id == TABLE_ID)
+            )
+            rows = await db.scalar(
+                select(func.count(Rows.id))
+                .join(DepartmentTables, DepartmentTables.id == Rows.department_table_id)
+                .where(DepartmentTables.table_id == TABLE_ID)
+            )
+            with watching() as watch:
+                out = await generete_excel(TABLE_ID, db, chunk_size=2)
+            await db.rollback()
+        return out, departments, rows, watch.count
+
+    out, departments, rows, statements = run(export)
+    sheet = [tuple(cell.value for cell in row) for row in load_workbook(out).active.iter_rows()]
+
+    assert statements == 2
+    assert sheet[0] == tuple(HEADERS)
+    assert sheet.count(NUMBERING) == departments
+    assert len(sheet) == 1 + departments + 2 * rows
+    # puste tabele działów (najwyższe id) na końcu - same wiersze numeracji
+    assert sheet[-2:] == [NUMBERING, NUMBERING]
@@ -0,0 +1,11 @@
+def test_migrated_schema_has_no_missing_or_duplicate_indexes(run):
+    from db.database import engine
+    from db.index_check import check_indexes
+
+    async def report():
+        async with engine.connect() as conn:
+            return await check_indexes(conn)
+
+    result = run(report)
+    assert result["missing"] == []
+    assert result["duplicates"] == []
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+
+def test_metrics_require_admin(client):
+    client.cookies.clear()
+    assert client.get("/api/metrics").status_code == 401
+
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+
+def test_failed_statement_does_not_leave_a_timer(run):
+    from db.database import engine
+
+    async def failing():
+        async with engine.connect() as conn:
+            with pytest.raises(DBAPIError):
+                await conn.execute(text("SELECT 1 / 0"))
+            return list(conn.sync_connection.info.get("query_started", []))
+
+    assert run(failing) == []
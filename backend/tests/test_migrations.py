@@ -0,0 +1,96 @@
+"""Startup migrations against a scratch database next to the test database."""
+import asyncio
+import os
+
+import asyncpg
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+
+pytestmark = pytest.mark.db
+
+SCRATCH_DATABASE = "migrations_scratch"
+
+
+def dsn(database: str) -> str:
+    url = make_url(os.environ["DATABASE_URL"]).set(database=database)
+    return url.render_as_string(hide_password=False)
+
+
+async def maintenance(*statements: str):
+    url = make_url(os.environ["DATABASE_URL"]).set(drivername="postgresql", database="postgres")
+    connection = await asyncpg.connect(url.render_as_string(hide_password=False))
+    try:
+        for statement in statements:
+            await connection.execute(statement)
+    finally:
+        await connection.close()
+
+
+@pytest.fixture
+def scratch():
+    """Run a coroutine function with an engine on an empty scratch database."""
+    from db.database import make_engine
+
+    def run(test):
+        async def body():
+            drop = f"DROP DATABASE IF EXISTS {SCRATCH_DATABASE} WITH (FORCE)"
+            await maintenance(drop, f"CREATE DATABASE {SCRATCH_DATABASE}")
+            engine = make_engine(dsn(SCRATCH_DATABASE), pool_size=1, max_overflow=0)
+            try:
+                return await test(engine)
+            finally:
+                await engine.dispose()
+                await maintenance(drop)
+        return asyncio.run(body())
+
+    return run
+
+
+async def legacy_schema(engine, revision: str):
+    """Schema from before migrations: the tables of `revision`, no alembic_version."""
+    from alembic import command
+    from db.migrations import alembic_config
+
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: command.upgrade(alembic_config(c), revision))
+        await conn.execute(text("DROP TABLE alembic_version"))
+
+
+async def schema_report(engine):
+    from db.index_check import check_indexes
+
+    async with engine.connect() as conn:
+        report = await check_indexes(conn)
+        columns = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns("rows")})
+    return report, columns
+
+
+def test_empty_database_is_migrated_to_head_once(scratch):
+    from db.migrations import head_revision, migrate
+
+    async def test(engine):
+        first = await migrate(engine)
+        second = await migrate(engine)
+        return first, second, await schema_report(engine)
+
+    first, second, (report, columns) = scratch(test)
+    assert first == (None, head_revision())
+    assert second == (head_revision(), head_revision())
+    assert report["missing"] == report["duplicates"] == []
+    assert "current_row_data_id" in columns
+
+
+@pytest.mark.parametrize("legacy_revision", ["0001", "0002"])
+def test_legacy_schema_is_stamped_and_upgraded(scratch, legacy_revision):
+    from db.migrations import head_revision, migrate
+
+    async def test(engine):
+        await legacy_schema(engine, legacy_revision)
+        migrated = await migrate(engine)
+        return migrated, await schema_report(engine)
+
+    (before, after), (report, columns) = scratch(test)
+    assert (before, after) == (None, head_revision())
+    assert report["missing"] == report["duplicates"] == []
+    assert "current_row_data_id" in columns
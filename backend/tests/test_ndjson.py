@@ -0,0 +1,33 @@
+import json
+
+TABLE_ID = 1
+
+
+def test_ndjson_matches_the_json_document(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    document = client.get(f"/api/tables/{TABLE_ID}").json()
+
+    response = client.get(f"/api/tables/{TABLE_ID}?format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [r["type"] for r in records[:1]] == ["table"]
+    table = {k: v for k, v in records[0].items() if k != "type"}
+    assert table == {k: v for k, v in document.items() if k not in ("department_tables", "next_cursor")}
+
+    department_tables = {
+        r["id"]: {k: v for k, v in r.items() if k != "type"} | {"rows": []}
+        for r in records if r["type"] == "department_table"
+    }
+    for record in records:
+        if record.pop("type") == "row":
+            department_tables[record.pop("department_table_id")]["rows"].append(record)
+    assert list(department_tables.values()) == document["department_tables"]
+
+
+def test_ndjson_rejects_paging_and_history(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    headers = {"Accept": "application/x-ndjson"}
+    assert client.get(f"/api/tables/{TABLE_ID}?history=true", headers=headers).status_code == 400
+    assert client.get(f"/api/tables/{TABLE_ID}?limit=1", headers=headers).status_code == 400
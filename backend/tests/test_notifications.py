@@ -0,0 +1,54 @@
+import pytest
+
+from tests.payloads import row_values
+
+TABLE_ID = 1
+DEPARTMENT_TABLE_ID = 1
+ROW_ID = 4
+
+
+@pytest.mark.db
+def test_subscription_filters_by_table_and_department():
+    from api.notifications import Subscription
+
+    subscription = Subscription(TABLE_ID, department_id=1)
+    assert subscription.matches({"table_id": TABLE_ID, "department_id": 1})
+    assert subscription.matches({"table_id": TABLE_ID, "department_id": None})
+    assert not subscription.matches({"table_id": TABLE_ID, "department_id": 2})
+    assert not subscription.matches({"table_id": TABLE_ID + 1, "department_id": 1})
+
+
+@pytest.mark.db
+def test_slow_subscriber_gets_one_resync():
+    from api.notifications import NOTIFY_QUEUE_SIZE, Subscription
+
+    subscription = Subscription(TABLE_ID)
+    for i in range(NOTIFY_QUEUE_SIZE + 5):
+        subscription.push({"kind": "rows", "table_id": TABLE_ID, "row_ids": [i]})
+
+    queued = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+    assert len(queued) < NOTIFY_QUEUE_SIZE
+    assert {"kind": "resync", "table_id": TABLE_ID} in queued
+
+
+def test_websocket_receives_row_changes(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    with client.websocket_connect(f"/api/tables/{TABLE_ID}/ws") as websocket:
+        assert websocket.receive_json() == {"kind": "ready", "table_id": TABLE_ID}
+
+        response = client.post("/api/tables/batch-update", json=[{
+            "tableId": TABLE_ID, "departmentTableId": DEPARTMENT_TABLE_ID, "rowId": ROW_ID,
+            "values": row_values("12", "powiadomienie", ""), "lastUserId": 1,
+            "lastUpdate": "2026-01-01T00:00:00Z",
+        }])
+        assert response.status_code == 200, response.text
+
+        event = websocket.receive_json()
+        assert event["kind"] == "rows"
+        assert event["table_id"] == TABLE_ID
+        assert event["row_ids"] == [ROW_ID]
+
+
+def test_events_require_login(client):
+    client.cookies.clear()
+    assert client.get(f"/api/tables/{TABLE_ID}/events").status_code == 401
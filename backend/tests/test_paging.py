@@ -0,0 +1,40 @@
+TABLE_ID = 1
+
+
+def row_ids(document: dict) -> list[int]:
+    return [row["id"] for dept_table in document["department_tables"] for row in dept_table["rows"]]
+
+
+def test_keyset_pages_cover_the_table_once(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    everything = sorted(row_ids(client.get(f"/api/tables/{TABLE_ID}").json()))
+
+    seen, cursor = [], None
+    while True:
+        query = f"?limit=2&cursor={cursor}" if cursor is not None else "?limit=2"
+        page = client.get(f"/api/tables/{TABLE_ID}{query}").json()
+        ids = row_ids(page)
+        assert 0 < len(ids) <= 2
+        seen += ids
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert cursor == max(ids)
+
+    assert sorted(seen) == everything
+
+
+def test_filters_and_department_scope_apply_to_the_page(client):
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    document = client.get(f"/api/tables/{TABLE_ID}").json()
+    department = document["department_tables"][0]
+    division = department["rows"][0]["row_datas"][0]["division"]["value"]
+
+    page = client.get(f"/api/tables/{TABLE_ID}?limit=1000&division={division}").json()
+    revisions = [row["row_datas"][0] for dept_table in page["department_tables"] for row in dept_table["rows"]]
+    assert revisions and all(r["division"]["value"] == division for r in revisions)
+
+    department_id = department["department"]["id"]
+    page = client.get(f"/api/tables/{TABLE_ID}/departments/{department_id}?limit=1000").json()
+    assert sorted(row_ids(page)) == sorted(row["id"] for row in department["rows"])
+    assert {t["department"]["id"] for t in page["department_tables"] if t["rows"]} == {department_id}
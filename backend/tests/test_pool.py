@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+pytestmark = pytest.mark.db
+
+
+def with_engine(test, **options):
+    from db.database import make_engine
+
+    async def body():
+        engine = make_engine(os.environ["DATABASE_URL"], **options)
+        try:
+            return await test(engine)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(body())
+
+
+def test_statement_timeout_is_set_on_connect():
+    async def test(engine):
+        async with engine.connect() as conn:
+            setting = (await conn.execute(text("SHOW statement_timeout"))).scalar()
+            with pytest.raises(DBAPIError, match="statement timeout"):
+                await conn.execute(text("SELECT pg_sleep(2)"))
+        return setting
+
+    assert with_engine(test, statement_timeout_ms=100) == "100ms"
+
+
+def test_pool_reuses_connections_and_counts_checkouts():
+    from db.database import pool_status
+
+    async def test(engine):
+        for _ in range(3):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        return pool_status(engine)
+
+    status = with_engine(test, pool_size=1, max_overflow=0)
+    assert status["checkouts_total"] == 3
+    assert status["connects_total"] == 1
+    assert status["size"] == 1 and status["checked_out"] == 0
+
+
+def test_pgbouncer_mode_without_prepared_statement_cache():
+    from db.database import pool_status
+
+    async def test(engine):
+        async with engine.connect() as conn:
+            # to samo zapytanie dwa razy - przy PgBouncerze bez nazwanych prepared statements
+            values = [(await conn.execute(text("SELECT CAST(:v AS integer)"), {"v": v})).scalar() for v in (1, 2)]
+            # limit po stronie klienta (command_timeout), PgBouncer nie przyjmuje statement_timeout
+            with pytest.raises(TimeoutError):
+                await conn.execute(text("SELECT pg_sleep(2)"))
+        return values, pool_status(engine)
+
+    values, status = with_engine(test, pgbouncer=True, statement_timeout_ms=100)
+    assert values == [1, 2]
+    # NullPool: bez stałego rozmiaru puli
+    assert "size" not in status
@@ -0,0 +1,82 @@
+import time
+
+import jwt
+
+from api.principals import Principal, PrincipalType, principal_cache
+
+USER_ID = 1
+
+
+def cached_principal() -> Principal:
+    return Principal(
+        id=USER_ID, user_name="admin", name="Admin", surname="Admin",
+        department_id=1, user_type_id=1, user_type=PrincipalType(id=1, type="admin"),
+    )
+
+
+def test_principal_notification_invalidates_cache(client, run):
+    from api.notifications import change_hub, notify_principal
+    from db.database import AsyncSessionLocal
+
+    # LISTEN startuje razem z aplikacją, bez żadnej subskrypcji
+    run(change_hub._ready.wait)
+
+    principal_cache.put(USER_ID, 0, cached_principal(), principal_cache.generation(USER_ID))
+    assert principal_cache.get(USER_ID, 0) is not None
+
+    async def publish():
+        async with AsyncSessionLocal() as db:
+            await notify_principal(db, USER_ID)
+            await db.commit()
+
+    run(publish)
+    deadline = time.monotonic() + 5
+    while principal_cache.get(USER_ID, 0) is not None:
+        assert time.monotonic() < deadline, "invalidation was not delivered"
+        time.sleep(0.05)
+
+
+def test_principal_notification_is_not_sent_to_table_subscribers(client, run):
+    from api.notifications import change_hub
+
+    async def deliver():
+        subscription = await change_hub.subscribe(1)
+        try:
+            change_hub._on_notification(None, 0, change_hub.channel, '{"kind": "principal", "table_id": null, "user_id": 1}')
+            return subscription.queue.qsize()
+        finally:
+            change_hub.unsubscribe(subscription)
+
+    assert run(deliver) == 0
+
+
+def test_put_skips_entry_invalidated_during_load():
+    generation = principal_cache.generation(USER_ID)
+    principal_cache.invalidate_user(USER_ID)
+    principal_cache.put(USER_ID, 1, cached_principal(), generation)
+    assert principal_cache.get(USER_ID, 1) is None
+
+
+def test_invalidation_during_user_load_is_not_cached(run):
+    from api.user import create_access_token, get_current_user
+    from db.database import AsyncSessionLocal
+
+    token = create_access_token(USER_ID)
+
+    async def load_with_invalidation():
+        async with AsyncSessionLocal() as db:
+            execute = db.execute
+
+            async def racing_execute(*args, **kwargs):
+                result = await execute(*args, **kwargs)
+                # zdarzenie "principal" z innego workera dociera w trakcie SELECT Users
+                principal_cache.invalidate_user(USER_ID)
+                return result
+
+            db.execute = racing_execute
+            principal = await get_current_user(token, db)
+        return principal
+
+    issued_at = jwt.decode(token, options={"verify_signature": False})["iat"]
+    assert run(load_with_invalidation).id == USER_ID
+    assert principal_cache.get(USER_ID, issued_at) is None
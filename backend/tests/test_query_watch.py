@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import select
+
+from api.query_watch import NPlusOneError, normalize_sql, watching
+
+
+def test_normalize_sql_collapses_binds_and_in_lists():
+    assert normalize_sql(
+        "SELECT users.id FROM users WHERE users.id = $1::INTEGER AND users.department_id IN ($2::INTEGER, $3::INTEGER)"
+    ) == normalize_sql(
+        "SELECT users.id FROM users WHERE users.id = $7::INTEGER AND users.department_id IN ($8::INTEGER)"
+    ) == "SELECT users.id FROM users WHERE users.id = ? AND users.department_id IN (?)"
+
+
+def test_normalize_sql_replaces_literals():
+    assert normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b = 12.5 AND c = :c") == (
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c = ?"
+    )
+
+
+def test_detects_per_row_select_loop(run):
+    from db.database import AsyncSessionLocal
+    from db.models import Departments
+
+    async def per_row():
+        async with AsyncSessionLocal() as db:
+            ids = (await db.execute(select(Departments.id))).scalars().all()
+            for department_id in ids:
+                await db.execute(select(Departments).where(Departments.id == department_id))
+            return len(ids)
+
+    async def watched():
+        with watching(threshold=2) as watch:
+            count = await per_row()
+        return count, watch
+
+    count, watch = run(watched)
+    assert count >= 2
+    assert watch.n_plus_one()
+    with pytest.raises(NPlusOneError):
+        watch.assert_no_n_plus_one()
+
+
+def test_department_dates_single_statement(client, query_watch):
+    response = client.get("/api/departments/get_department_dates")
+    assert response.status_code == 200
+    assert response.json()
+    query_watch.assert_max_statements(1)
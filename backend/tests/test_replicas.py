@@ -0,0 +1,93 @@
+"""Replica routing against a second engine on the test database (the same
+data, so only the engine tells where a read went)."""
+import os
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+TABLE_ID = 1
+
+
+def replica_url(**query) -> str:
+    return make_url(os.environ["DATABASE_URL"]).update_query_dict(query).render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def route_to(run, monkeypatch):
+    """Install the given replica engines in db.database for one test."""
+    from db import database
+
+    installed = []
+
+    def install(*engines):
+        installed.extend(engines)
+        monkeypatch.setattr(database, "replica_engines", list(engines))
+        monkeypatch.setattr(database, "replica_router", database.ReplicaRouter(list(engines)))
+        return database.replica_router
+
+    yield install
+    for engine in installed:
+        run(engine.dispose)
+
+
+@pytest.fixture
+def replica(route_to):
+    from db.database import make_engine
+
+    replica = SimpleNamespace(engine=make_engine(replica_url(), pool_size=1, max_overflow=0), statements=0)
+
+    @event.listens_for(replica.engine.sync_engine, "before_cursor_execute")
+    def count(*args):
+        replica.statements += 1
+
+    route_to(replica.engine)
+    return replica
+
+
+def test_reads_go_to_the_replica(run, replica):
+    from db.database import engine, open_read_session
+
+    async def bound(prefer_primary):
+        async with await open_read_session(prefer_primary) as session:
+            return session.bind, session.info.get("replica", False)
+
+    assert run(bound, False) == (replica.engine, True)
+    assert run(bound, True) == (engine, False)
+
+
+def test_unavailable_replica_falls_back_to_primary(run, route_to):
+    from db.database import engine, make_engine, open_read_session
+
+    broken = make_engine(replica_url(host="/nonexistent"), pool_size=1, max_overflow=0)
+    router = route_to(broken)
+
+    async def bound():
+        async with await open_read_session() as session:
+            return session.bind
+
+    assert run(bound) is engine
+    # pominięta do czasu DB_REPLICA_RETRY_SECONDS
+    assert router.candidates() == []
+
+
+def test_reads_after_a_write_stay_on_primary(client, replica):
+    from db.database import PRIMARY_COOKIE
+
+    client.cookies.delete(PRIMARY_COOKIE)
+    budget = client.get(f"/api/tables/{TABLE_ID}/get_total_budget").json()
+    assert replica.statements > 0
+
+    response = client.put(f"/api/tables/{TABLE_ID}/update_budget", json={"budget": budget})
+    assert response.status_code == 200
+    assert PRIMARY_COOKIE in response.cookies
+
+    before = replica.statements
+    assert client.get(f"/api/tables/{TABLE_ID}/get_total_budget").status_code == 200
+    assert replica.statements == before
+
+    # poza oknem read-your-writes odczyty wracają na replikę
+    client.cookies.delete(PRIMARY_COOKIE)
+    assert client.get(f"/api/tables/{TABLE_ID}/get_total_budget").status_code == 200
+    assert replica.statements > before
@@ -0,0 +1,26 @@
+import pytest
+
+from api.schemas import TablePageDTO
+
+TABLE_ID = 1
+
+
+@pytest.mark.parametrize("query", ["", "?history=true", "?limit=2"])
+def test_table_response_is_what_the_dto_would_render(client, query):
+    # odpowiedź nie przechodzi przez response_model - musi mimo to być zgodna z TablePageDTO
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    response = client.get(f"/api/tables/{TABLE_ID}{query}")
+    assert response.status_code == 200
+    document = response.json()
+
+    assert TablePageDTO.model_validate(document).model_dump(mode="json") == document
+
+
+def test_fast_response_records_serialization_time(client):
+    from api.metrics import metrics
+
+    client.post("/api/user/login", json={"username": "admin", "password": "123"})
+    route = metrics.routes[("GET", "/api/tables/{table_id}")]
+    before = route.serialize_seconds
+    assert client.get(f"/api/tables/{TABLE_ID}?history=true").status_code == 200
+    assert route.serialize_seconds > before
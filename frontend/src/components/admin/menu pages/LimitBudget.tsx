@@ -92,7 +92,7 @@ async function updateDepartmentLimits(updates: DepartmentUpdate[]) {
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ updates }),
+      body: JSON.stringify({ tableId: 1, updates }),
     });
 
     if (!res.ok) {
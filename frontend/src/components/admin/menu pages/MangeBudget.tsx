@@ -71,7 +71,6 @@ interface BudgetData {
 
 interface DisplayRow {
     row: EnrichedRow;
-    history: EnrichedRow[];
 }
 
 interface ChangeRecord {
@@ -229,6 +228,23 @@ async function get_table_data(tableId: number): Promise<EnrichedRow[]> {
     }
 }
 
+// tabela ładuje tylko bieżące wersje, historię wiersza pobieramy dopiero po kliknięciu "H"
+async function get_row_history(
+    tableId: number,
+    departmentTableId: number | null,
+    rowId: number
+): Promise<EnrichedRow[]> {
+    try {
+        const res = await fetch(`/api/tables/${tableId}/rows/${rowId}/history`);
+        if (!res.ok) return [];
+        const data: Row = await res.json();
+        // wersje od najnowszej - pierwsza to bieżąca, widoczna już w tabeli
+        return extractRowData(data, tableId, departmentTableId ?? 0).slice(1);
+    } catch {
+        return [];
+    }
+}
+
 async function get_divisions(): Promise<Division[]> {
     try {
         const res = await fetch('/api/divisions/');
@@ -626,45 +642,15 @@ function MangeBudget() {
             </div>
         );
 
-    const displayRows: DisplayRow[] = (() => {
-        const groups = new Map<string, EnrichedRow[]>();
-        let uniqueCounter = 0;
-
-        for (const r of tableRows) {
-            const key =
-                r.rowId != null ? `id_${r.rowId}` : `u_${uniqueCounter++}`;
-            const arr = groups.get(key);
-            if (arr) arr.push(r);
-            else groups.set(key, [r]);
-        }
-
-        const out: DisplayRow[] = [];
-
-        for (const [key, rows] of groups.entries()) {
-            if (rows.length === 1 || key.startsWith('u_')) {
-                out.push({ row: rows[0], history: [] });
-            } else {
-                const sorted = [...rows].sort((a, b) => {
-                    if (!a.versionDate && !b.versionDate) return 0;
-                    if (!a.versionDate) return 1;
-                    if (!b.versionDate) return -1;
-                    return (
-                        new Date(b.versionDate).getTime() -
-                        new Date(a.versionDate).getTime()
-                    );
-                });
-
-                const latest = sorted[0];
-                const history = sorted.slice(1);
-                out.push({ row: latest, history });
-            }
-        }
+    const displayRows: DisplayRow[] = tableRows.map(row => ({ row }));
 
-        return out;
-    })();
-
-    const openHistory = (rows: EnrichedRow[]) => {
-        if (!rows || rows.length === 0) return;
+    const openHistory = async (row: EnrichedRow) => {
+        if (row.rowId == null) return;
+        const rows = await get_row_history(
+            row.tableId,
+            row.departmentTableId,
+            row.rowId
+        );
         setHistoryRows(rows);
         setHistoryModalOpen(true);
     };
@@ -711,16 +697,16 @@ function MangeBudget() {
                     </TableHeader>
 
                     <TableBody>
-                        {displayRows.map(({ row, history }, displayRowIndex) => (
+                        {displayRows.map(({ row }, displayRowIndex) => (
                             <TableRow
                                 key={displayRowIndex}
                                 className="hover:bg-gray-50"
                             >
                                 <TableCell className="px-1 py-1 text-center border-x border-y align-middle whitespace-normal break-words">
-                                    {history.length > 0 && (
+                                    {row.rowId != null && (
                                         <button
                                             type="button"
-                                            onClick={() => openHistory(history)}
+                                            onClick={() => openHistory(row)}
                                             className="h-6 w-6 rounded-full bg-blue-600 text-white text-xs font-bold flex items-center justify-center hover:bg-blue-700"
                                             aria-label="Historia zmian"
                                         >
@@ -987,6 +973,16 @@ function MangeBudget() {
                                     </TableRow>
                                 </TableHeader>
                                 <TableBody>
+                                    {historyRows.length === 0 && (
+                                        <TableRow>
+                                            <TableCell
+                                                colSpan={headers.length + 2}
+                                                className="px-2 py-2 text-left border-x border-y"
+                                            >
+                                                Brak wcześniejszych wersji
+                                            </TableCell>
+                                        </TableRow>
+                                    )}
                                     {historyRows.map((hr, idx) => (
                                         <TableRow
                                             key={idx}